@@ -18,10 +18,13 @@ from src.main import app, db  # garante que app.config e db.metadata existam
 # (isso registra as tabelas no metadata do SQLAlchemy)
 from src.models.user import User
 from src.models.franchise import Franchise
-from src.models.material import Material
+from src.models.material import Material, MaterialImportStaging
 from src.models.difficulty import DifficultyFactor
 from src.models.client import Client
 from src.models.project import Project, ProjectItem
+from src.models.franchise_stats import FranchiseStats, FranchiseMonthlyStats
+from src.models.pricing_rule import PricingRuleSet, PricingEmployeeRate, PricingDifficultyRule, PricingRulesVersion
+from src.models.cache_version import ResponseCacheVersion
 
 # Alembic config
 config = context.config
@@ -38,6 +41,13 @@ SQLALCHEMY_DATABASE_URI = app.config.get("SQLALCHEMY_DATABASE_URI")
 if not SQLALCHEMY_DATABASE_URI:
     raise RuntimeError("SQLALCHEMY_DATABASE_URI não definido no app.config")
 
+def include_object(object, name, type_, reflected, compare_to):
+    # clients_fts* é o índice FTS5 da busca de clientes (migrations 0007/0011), criado
+    # por SQL e mantido por triggers: não tem model, o autogenerate deve ignorá-lo
+    if type_ == "table" and reflected and compare_to is None and name.startswith("clients_fts"):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     url = SQLALCHEMY_DATABASE_URI
     context.configure(
@@ -45,7 +55,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         compare_type=True,          # detecta mudanças de tipo
-        compare_server_default=True # detecta defaults
+        compare_server_default=True, # detecta defaults
+        include_object=include_object,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -67,6 +78,7 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             compare_type=True,
             compare_server_default=True,
+            include_object=include_object,
             render_as_batch=connection.dialect.name == "sqlite",
         )
 
@@ -0,0 +1,38 @@
+"""project item labor inputs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('project_items') as batch_op:
+        batch_op.add_column(sa.Column('nivel_funcionario', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('dias_estimados', sa.Numeric(precision=10, scale=2), nullable=True))
+        batch_op.add_column(sa.Column('num_envelopadores', sa.Numeric(precision=10, scale=2), nullable=True))
+        batch_op.create_index('ix_project_items_id_material', ['id_material'])
+        batch_op.create_index('ix_project_items_id_projeto', ['id_projeto'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('project_items') as batch_op:
+        batch_op.drop_index('ix_project_items_id_projeto')
+        batch_op.drop_index('ix_project_items_id_material')
+        batch_op.drop_column('num_envelopadores')
+        batch_op.drop_column('dias_estimados')
+        batch_op.drop_column('nivel_funcionario')
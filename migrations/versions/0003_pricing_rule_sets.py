@@ -0,0 +1,68 @@
+"""pricing rule sets
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pricing_rule_sets',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('id_franqueado', sa.String(length=36), nullable=True),
+    sa.Column('nome', sa.String(length=200), nullable=False),
+    sa.Column('vigente_desde', sa.DateTime(), nullable=False),
+    sa.Column('vigente_ate', sa.DateTime(), nullable=True),
+    sa.Column('margem_min', sa.Numeric(precision=6, scale=4), nullable=False),
+    sa.Column('margem_padrao', sa.Numeric(precision=6, scale=4), nullable=True),
+    sa.Column('margem_max', sa.Numeric(precision=6, scale=4), nullable=True),
+    sa.Column('data_criacao', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_pricing_rule_sets_id_franqueado', 'pricing_rule_sets', ['id_franqueado'])
+    op.create_table('pricing_employee_rates',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('id_regra', sa.String(length=36), nullable=False),
+    sa.Column('nivel_funcionario', sa.String(length=50), nullable=False),
+    sa.Column('taxa_diaria', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['id_regra'], ['pricing_rule_sets.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id_regra', 'nivel_funcionario')
+    )
+    op.create_table('pricing_difficulty_rules',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('id_regra', sa.String(length=36), nullable=False),
+    sa.Column('nivel', sa.String(length=50), nullable=False),
+    sa.Column('multiplicador_material', sa.Numeric(precision=6, scale=4), nullable=False),
+    sa.Column('taxa_imposto', sa.Numeric(precision=6, scale=4), nullable=False),
+    sa.ForeignKeyConstraint(['id_regra'], ['pricing_rule_sets.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id_regra', 'nivel')
+    )
+    op.create_table('pricing_rules_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('pricing_rules_version')
+    op.drop_table('pricing_difficulty_rules')
+    op.drop_table('pricing_employee_rates')
+    op.drop_index('ix_pricing_rule_sets_id_franqueado', table_name='pricing_rule_sets')
+    op.drop_table('pricing_rule_sets')
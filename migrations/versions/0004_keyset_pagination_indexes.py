@@ -0,0 +1,35 @@
+"""keyset pagination indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # linhas sem data ficariam fora da paginação por cursor
+    op.execute(sa.text("UPDATE clients SET data_cadastro = CURRENT_TIMESTAMP WHERE data_cadastro IS NULL"))
+    op.execute(sa.text("UPDATE projects SET data_criacao = CURRENT_TIMESTAMP WHERE data_criacao IS NULL"))
+    op.create_index('ix_clients_franqueado_cadastro_id', 'clients', ['id_franqueado', 'data_cadastro', 'id'])
+    op.create_index('ix_projects_franqueado_criacao_id', 'projects', ['id_franqueado', 'data_criacao', 'id'])
+    op.create_index('ix_projects_cliente_criacao_id', 'projects', ['id_cliente', 'data_criacao', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_cliente_criacao_id', table_name='projects')
+    op.drop_index('ix_projects_franqueado_criacao_id', table_name='projects')
+    op.drop_index('ix_clients_franqueado_cadastro_id', table_name='clients')
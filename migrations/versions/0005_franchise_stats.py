@@ -0,0 +1,56 @@
+"""franchise stats rollup
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('franchise_stats',
+    sa.Column('id_franqueado', sa.String(length=36), nullable=False),
+    sa.Column('total_clientes', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_rascunho', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_enviado', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_aprovado', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_rejeitado', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_outros', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('receita_aprovada', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+    sa.Column('data_atualizacao', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id_franqueado')
+    )
+    # carga inicial a partir dos dados existentes (mesmo cálculo de `flask crm reconcile-stats`)
+    op.execute(sa.text("""
+        INSERT INTO franchise_stats (id_franqueado, total_clientes, projetos_rascunho, projetos_enviado,
+                                     projetos_aprovado, projetos_rejeitado, projetos_outros,
+                                     receita_aprovada, data_atualizacao)
+        SELECT f.id_franqueado,
+               COALESCE((SELECT COUNT(*) FROM clients c WHERE c.id_franqueado = f.id_franqueado), 0),
+               COALESCE((SELECT COUNT(*) FROM projects p WHERE p.id_franqueado = f.id_franqueado AND p.status = 'Rascunho'), 0),
+               COALESCE((SELECT COUNT(*) FROM projects p WHERE p.id_franqueado = f.id_franqueado AND p.status = 'Enviado'), 0),
+               COALESCE((SELECT COUNT(*) FROM projects p WHERE p.id_franqueado = f.id_franqueado AND p.status = 'Aprovado'), 0),
+               COALESCE((SELECT COUNT(*) FROM projects p WHERE p.id_franqueado = f.id_franqueado AND p.status = 'Rejeitado'), 0),
+               COALESCE((SELECT COUNT(*) FROM projects p WHERE p.id_franqueado = f.id_franqueado
+                         AND (p.status IS NULL OR p.status NOT IN ('Rascunho', 'Enviado', 'Aprovado', 'Rejeitado'))), 0),
+               COALESCE((SELECT SUM(p.preco_venda_sugerido) FROM projects p WHERE p.id_franqueado = f.id_franqueado AND p.status = 'Aprovado'), 0),
+               CURRENT_TIMESTAMP
+        FROM (SELECT id_franqueado FROM clients UNION SELECT id_franqueado FROM projects) f
+    """))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('franchise_stats')
@@ -0,0 +1,39 @@
+"""franchise monthly stats rollup
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+
+Depois de aplicar, preencha o histórico com `flask crm backfill-monthly-stats`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('franchise_monthly_stats',
+    sa.Column('id_franqueado', sa.String(length=36), nullable=False),
+    sa.Column('mes', sa.Date(), nullable=False),
+    sa.Column('total_projetos', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_aprovados', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('projetos_rejeitados', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('receita_aprovada', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'),
+    sa.Column('soma_margem', sa.Numeric(precision=14, scale=4), nullable=False, server_default='0'),
+    sa.Column('data_atualizacao', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id_franqueado', 'mes')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('franchise_monthly_stats')
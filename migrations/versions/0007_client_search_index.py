@@ -0,0 +1,93 @@
+"""client search index (pg_trgm / FTS5)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:00:00.000000
+
+PostgreSQL: extensões pg_trgm, unaccent e btree_gin, função IMMUTABLE f_unaccent
+(unaccent() sozinha não pode ser usada em índice) e índice GIN por franquia +
+trigramas da expressão usada em src/services/client_search.py (SEARCH_EXPRESSION).
+
+SQLite: tabela FTS5 contentless clients_fts (rowid = clients.rowid) mantida por
+triggers, tokenizer unicode61 sem diacríticos e índices de prefixo.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Precisa ser idêntica a SEARCH_EXPRESSION em src/services/client_search.py
+SEARCH_EXPRESSION = (
+    "f_unaccent(lower(coalesce(nome, '') || ' ' || coalesce(email, '') || ' ' || "
+    "coalesce(telefone, '') || ' ' || regexp_replace(coalesce(telefone, ''), '[^0-9]', '', 'g')))"
+)
+
+# valores gravados no FTS (os mesmos no INSERT e no 'delete' de um contentless)
+SQLITE_DIGITS = ("replace(replace(replace(replace(replace(replace(coalesce({row}.telefone, ''), "
+                 "'(', ''), ')', ''), '-', ''), ' ', ''), '+', ''), '.', '')")
+
+
+def _sqlite_values(row):
+    return (f"{row}.rowid, coalesce({row}.nome, ''), coalesce({row}.email, ''), "
+            f"coalesce({row}.telefone, ''), {SQLITE_DIGITS.format(row=row)}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        op.execute("""
+            CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+        """)
+        op.execute(f"CREATE INDEX ix_clients_search_trgm ON clients "
+                   f"USING gin (id_franqueado, ({SEARCH_EXPRESSION}) gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE clients_fts USING fts5(
+                nome, email, telefone, telefone_digitos,
+                content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+            )
+        """)
+        columns = "rowid, nome, email, telefone, telefone_digitos"
+        op.execute(f"INSERT INTO clients_fts ({columns}) SELECT {_sqlite_values('clients')} FROM clients")
+        op.execute(f"""
+            CREATE TRIGGER clients_fts_ai AFTER INSERT ON clients BEGIN
+                INSERT INTO clients_fts ({columns}) VALUES ({_sqlite_values('new')});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER clients_fts_ad AFTER DELETE ON clients BEGIN
+                INSERT INTO clients_fts (clients_fts, {columns}) VALUES ('delete', {_sqlite_values('old')});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER clients_fts_au AFTER UPDATE ON clients BEGIN
+                INSERT INTO clients_fts (clients_fts, {columns}) VALUES ('delete', {_sqlite_values('old')});
+                INSERT INTO clients_fts ({columns}) VALUES ({_sqlite_values('new')});
+            END
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_clients_search_trgm")
+        op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS clients_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS clients_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS clients_fts_ai")
+        op.execute("DROP TABLE IF EXISTS clients_fts")
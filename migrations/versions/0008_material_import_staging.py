@@ -0,0 +1,43 @@
+"""material import staging table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00.000000
+
+Tabela de trabalho da importação de planilhas de fornecedor
+(src/services/material_import.py): as linhas de cada lote ficam nela só
+durante a transação da importação.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('material_import_staging',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('lote', sa.String(length=36), nullable=False),
+    sa.Column('linha', sa.Integer(), nullable=False),
+    sa.Column('novo_id', sa.String(length=36), nullable=False),
+    sa.Column('nome', sa.String(length=200), nullable=False),
+    sa.Column('unidade_medida', sa.String(length=10), nullable=True),
+    sa.Column('custo_unitario_base', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('descricao', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_material_import_staging_lote_nome', 'material_import_staging', ['lote', 'nome'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_material_import_staging_lote_nome', table_name='material_import_staging')
+    op.drop_table('material_import_staging')
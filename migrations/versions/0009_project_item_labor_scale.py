@@ -0,0 +1,37 @@
+"""project item labor inputs with 4 decimal places
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 09:00:00.000000
+
+O motor de preços aceita dias e envelopadores com até 4 casas; com
+Numeric(10, 2) o PostgreSQL arredondava o valor gravado (1.3333 -> 1.33) e o
+recálculo dos rascunhos mudava o preço sem mudança de custo ou de regra.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('project_items') as batch_op:
+        for column in ('dias_estimados', 'num_envelopadores'):
+            batch_op.alter_column(column, existing_type=sa.Numeric(precision=10, scale=2),
+                                  type_=sa.Numeric(precision=12, scale=4), existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('project_items') as batch_op:
+        for column in ('dias_estimados', 'num_envelopadores'):
+            batch_op.alter_column(column, existing_type=sa.Numeric(precision=12, scale=4),
+                                  type_=sa.Numeric(precision=10, scale=2), existing_nullable=True)
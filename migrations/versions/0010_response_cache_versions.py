@@ -0,0 +1,33 @@
+"""response cache versions shared by the workers
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('response_cache_versions',
+    sa.Column('tabela', sa.String(length=64), nullable=False),
+    sa.Column('id_franqueado', sa.String(length=36), nullable=False),
+    sa.Column('versao', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('tabela', 'id_franqueado')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('response_cache_versions')
@@ -0,0 +1,164 @@
+"""client search: explicit FTS5 doc ids and a trigram table (SQLite)
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-20 12:00:00.000000
+
+SQLite: o FTS de 0007 usava o rowid implícito de clients, que o VACUUM pode
+renumerar. Agora clients_fts_docs (docid INTEGER PRIMARY KEY, client_id) dá a
+cada cliente um id inteiro estável, usado como rowid das tabelas FTS5:
+
+- clients_fts: como em 0007 (unicode61 sem diacríticos, prefixos por termo);
+- clients_fts_trgm: tokenizer trigram sobre nome/email e os dígitos do
+  telefone, para trechos no meio da palavra ("99990" em "(11) 9999-0000");
+- clients_fts_names (só o nome, detail=none) e seu vocabulário
+  clients_fts_names_vocab (fts5vocab): palavras conhecidas para corrigir
+  erros de digitação. Fica separado de clients_fts porque lá o vocabulário
+  inclui cada email e telefone, grande demais para varrer.
+
+PostgreSQL: nada muda (o índice pg_trgm de 0007 já cobre trechos e erros).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# valores gravados no FTS (os mesmos no INSERT e no 'delete' de um contentless)
+SQLITE_DIGITS = ("replace(replace(replace(replace(replace(replace(coalesce({row}.telefone, ''), "
+                 "'(', ''), ')', ''), '-', ''), ' ', ''), '+', ''), '.', '')")
+DOCID = "(SELECT docid FROM clients_fts_docs WHERE client_id = {row}.id)"
+PREFIX_COLUMNS = "rowid, nome, email, telefone, telefone_digitos"
+TRIGRAM_COLUMNS = "rowid, texto, telefone_digitos"
+NAMES_COLUMNS = "rowid, nome"
+
+
+def _prefix_values(row, docid):
+    return (f"{docid}, coalesce({row}.nome, ''), coalesce({row}.email, ''), "
+            f"coalesce({row}.telefone, ''), {SQLITE_DIGITS.format(row=row)}")
+
+
+def _trigram_values(row, docid):
+    return f"{docid}, coalesce({row}.nome, '') || ' ' || coalesce({row}.email, ''), {SQLITE_DIGITS.format(row=row)}"
+
+
+def _names_values(row, docid):
+    return f"{docid}, coalesce({row}.nome, '')"
+
+
+def _drop_0007_index():
+    op.execute("DROP TRIGGER IF EXISTS clients_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS clients_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS clients_fts_ai")
+    op.execute("DROP TABLE IF EXISTS clients_fts")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _drop_0007_index()
+    op.execute("""
+        CREATE TABLE clients_fts_docs (
+            docid INTEGER PRIMARY KEY,
+            client_id VARCHAR(36) NOT NULL UNIQUE
+        )
+    """)
+    op.execute("""
+        CREATE VIRTUAL TABLE clients_fts USING fts5(
+            nome, email, telefone, telefone_digitos,
+            content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+        )
+    """)
+    op.execute("""
+        CREATE VIRTUAL TABLE clients_fts_trgm USING fts5(
+            texto, telefone_digitos, content='', tokenize='trigram'
+        )
+    """)
+    op.execute("""
+        CREATE VIRTUAL TABLE clients_fts_names USING fts5(
+            nome, content='', tokenize='unicode61 remove_diacritics 2', detail='none'
+        )
+    """)
+    op.execute("CREATE VIRTUAL TABLE clients_fts_names_vocab USING fts5vocab('clients_fts_names', 'row')")
+    op.execute("INSERT INTO clients_fts_docs (client_id) SELECT id FROM clients ORDER BY rowid")
+    source = "FROM clients JOIN clients_fts_docs d ON d.client_id = clients.id"
+    op.execute(f"INSERT INTO clients_fts ({PREFIX_COLUMNS}) SELECT {_prefix_values('clients', 'd.docid')} {source}")
+    op.execute(f"INSERT INTO clients_fts_trgm ({TRIGRAM_COLUMNS}) SELECT {_trigram_values('clients', 'd.docid')} {source}")
+    op.execute(f"INSERT INTO clients_fts_names ({NAMES_COLUMNS}) SELECT {_names_values('clients', 'd.docid')} {source}")
+
+    new_docid, old_docid = DOCID.format(row='new'), DOCID.format(row='old')
+    op.execute(f"""
+        CREATE TRIGGER clients_fts_ai AFTER INSERT ON clients BEGIN
+            INSERT INTO clients_fts_docs (client_id) VALUES (new.id);
+            INSERT INTO clients_fts ({PREFIX_COLUMNS}) VALUES ({_prefix_values('new', new_docid)});
+            INSERT INTO clients_fts_trgm ({TRIGRAM_COLUMNS}) VALUES ({_trigram_values('new', new_docid)});
+            INSERT INTO clients_fts_names ({NAMES_COLUMNS}) VALUES ({_names_values('new', new_docid)});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER clients_fts_ad AFTER DELETE ON clients BEGIN
+            INSERT INTO clients_fts (clients_fts, {PREFIX_COLUMNS})
+                VALUES ('delete', {_prefix_values('old', old_docid)});
+            INSERT INTO clients_fts_trgm (clients_fts_trgm, {TRIGRAM_COLUMNS})
+                VALUES ('delete', {_trigram_values('old', old_docid)});
+            INSERT INTO clients_fts_names (clients_fts_names, {NAMES_COLUMNS})
+                VALUES ('delete', {_names_values('old', old_docid)});
+            DELETE FROM clients_fts_docs WHERE client_id = old.id;
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER clients_fts_au AFTER UPDATE ON clients BEGIN
+            INSERT INTO clients_fts (clients_fts, {PREFIX_COLUMNS})
+                VALUES ('delete', {_prefix_values('old', old_docid)});
+            INSERT INTO clients_fts_trgm (clients_fts_trgm, {TRIGRAM_COLUMNS})
+                VALUES ('delete', {_trigram_values('old', old_docid)});
+            INSERT INTO clients_fts_names (clients_fts_names, {NAMES_COLUMNS})
+                VALUES ('delete', {_names_values('old', old_docid)});
+            UPDATE clients_fts_docs SET client_id = new.id WHERE client_id = old.id;
+            INSERT INTO clients_fts ({PREFIX_COLUMNS}) VALUES ({_prefix_values('new', new_docid)});
+            INSERT INTO clients_fts_trgm ({TRIGRAM_COLUMNS}) VALUES ({_trigram_values('new', new_docid)});
+            INSERT INTO clients_fts_names ({NAMES_COLUMNS}) VALUES ({_names_values('new', new_docid)});
+        END
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _drop_0007_index()
+    op.execute("DROP TABLE IF EXISTS clients_fts_names_vocab")
+    op.execute("DROP TABLE IF EXISTS clients_fts_names")
+    op.execute("DROP TABLE IF EXISTS clients_fts_trgm")
+    op.execute("DROP TABLE IF EXISTS clients_fts_docs")
+    # índice de 0007, pelo rowid de clients
+    op.execute("""
+        CREATE VIRTUAL TABLE clients_fts USING fts5(
+            nome, email, telefone, telefone_digitos,
+            content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+        )
+    """)
+    op.execute(f"INSERT INTO clients_fts ({PREFIX_COLUMNS}) SELECT {_prefix_values('clients', 'clients.rowid')} FROM clients")
+    op.execute(f"""
+        CREATE TRIGGER clients_fts_ai AFTER INSERT ON clients BEGIN
+            INSERT INTO clients_fts ({PREFIX_COLUMNS}) VALUES ({_prefix_values('new', 'new.rowid')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER clients_fts_ad AFTER DELETE ON clients BEGIN
+            INSERT INTO clients_fts (clients_fts, {PREFIX_COLUMNS}) VALUES ('delete', {_prefix_values('old', 'old.rowid')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER clients_fts_au AFTER UPDATE ON clients BEGIN
+            INSERT INTO clients_fts (clients_fts, {PREFIX_COLUMNS}) VALUES ('delete', {_prefix_values('old', 'old.rowid')});
+            INSERT INTO clients_fts ({PREFIX_COLUMNS}) VALUES ({_prefix_values('new', 'new.rowid')});
+        END
+    """)
@@ -0,0 +1,50 @@
+"""franchise stats revenue by status
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-20 15:00:00.000000
+
+Receita (soma de preco_venda_sugerido) por status em franchise_stats, para o
+revenue_by_status do dashboard; receita_aprovada já existia.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, Sequence[str], None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REVENUE_COLUMNS = {
+    'receita_rascunho': "p.status = 'Rascunho'",
+    'receita_enviado': "p.status = 'Enviado'",
+    'receita_rejeitado': "p.status = 'Rejeitado'",
+    'receita_outros': "(p.status IS NULL OR p.status NOT IN ('Rascunho', 'Enviado', 'Aprovado', 'Rejeitado'))",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('franchise_stats') as batch_op:
+        for column in REVENUE_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.Numeric(precision=14, scale=2), nullable=False,
+                                          server_default='0'))
+    # carga inicial a partir dos projetos (mesmo cálculo de `flask crm reconcile-stats`)
+    for column, condition in REVENUE_COLUMNS.items():
+        op.execute(sa.text(f"""
+            UPDATE franchise_stats SET {column} = COALESCE((
+                SELECT SUM(p.preco_venda_sugerido) FROM projects p
+                WHERE p.id_franqueado = franchise_stats.id_franqueado AND {condition}
+            ), 0)
+        """))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('franchise_stats') as batch_op:
+        for column in reversed(list(REVENUE_COLUMNS)):
+            batch_op.drop_column(column)
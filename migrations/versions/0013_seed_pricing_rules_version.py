@@ -0,0 +1,34 @@
+"""seed the pricing rules version row
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-20 16:00:00.000000
+
+A migração 0003 criou pricing_rules_version vazia; sem a linha, dois bumps
+concorrentes (rule_sets.bump_rules_version) podiam tentar o mesmo INSERT.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, Sequence[str], None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text("""
+        INSERT INTO pricing_rules_version (id, versao)
+        SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM pricing_rules_version WHERE id = 1)
+    """))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # a linha continua válida no schema anterior
+    pass
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card.jsx'
 import { Input } from '@/components/ui/input.jsx'
@@ -9,6 +9,51 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs.jsx'
 import { Loader2, Bot, Lightbulb, TrendingUp, MessageCircle, Sparkles } from 'lucide-react'
 
+// Lê uma resposta text/event-stream (POST não funciona com EventSource) e chama
+// onToken com o texto acumulado a cada trecho; devolve o texto final. Abortar
+// `signal` fecha a conexão, e o servidor para de gerar (e de cobrar) tokens.
+const streamCompletion = async (url, body, onToken, signal) => {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(body),
+    signal
+  })
+
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}))
+    throw new Error(data.error || `HTTP ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let text = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const events = buffer.split('\n\n')
+    buffer = events.pop()
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1]
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}')
+      if (event === 'token') {
+        text += data.text
+        onToken(text)
+      } else if (event === 'done') {
+        text = data.text
+        onToken(text)
+      } else if (event === 'error') {
+        throw new Error(data.error)
+      }
+    }
+  }
+  return text
+}
+
 const AIAssistant = () => {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
@@ -35,12 +80,35 @@ const AIAssistant = () => {
 
   const franchiseeId = '2dc82321-5f18-46f6-af0f-2b9a0f84e136'
 
+  // Um AbortController por painel com streaming: um novo pedido cancela o
+  // anterior do mesmo painel, e sair da página cancela todos.
+  const streams = useRef({})
+
+  const startStream = (panel) => {
+    streams.current[panel]?.abort()
+    const controller = new AbortController()
+    streams.current[panel] = controller
+    return controller
+  }
+
+  const finishStream = (panel, controller) => {
+    if (streams.current[panel] !== controller) return false // substituído por um pedido mais novo
+    delete streams.current[panel]
+    return true
+  }
+
+  useEffect(() => () => {
+    Object.values(streams.current).forEach(controller => controller.abort())
+    streams.current = {}
+  }, [])
+
   const generateProjectDescription = async () => {
     if (!projectMaterials.trim()) {
       setError('Informe os materiais do projeto')
       return
     }
 
+    const controller = startStream('description')
     try {
       setLoading(true)
       setError('')
@@ -55,28 +123,16 @@ const AIAssistant = () => {
         }
       }).filter(m => m.name)
 
-      const response = await fetch('/api/ai/generate-project-description', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          materials,
-          client_info: { name: clientName },
-          project_type: projectType || 'decoração'
-        })
-      })
-
-      if (!response.ok) {
-        throw new Error('Erro ao gerar descrição')
-      }
-
-      const data = await response.json()
-      setGeneratedDescription(data.description)
+      setGeneratedDescription('')
+      await streamCompletion('/api/ai/generate-project-description/stream', {
+        materials,
+        client_info: { name: clientName },
+        project_type: projectType || 'decoração'
+      }, setGeneratedDescription, controller.signal)
     } catch (err) {
-      setError('Erro ao gerar descrição: ' + err.message)
+      if (err.name !== 'AbortError') setError('Erro ao gerar descrição: ' + err.message)
     } finally {
-      setLoading(false)
+      if (finishStream('description', controller)) setLoading(false)
     }
   }
 
@@ -122,31 +178,20 @@ const AIAssistant = () => {
       return
     }
 
+    const controller = startStream('assistant')
     try {
       setLoading(true)
       setError('')
 
-      const response = await fetch('/api/ai/virtual-assistant', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          question: question,
-          context: {}
-        })
-      })
-
-      if (!response.ok) {
-        throw new Error('Erro ao consultar assistente')
-      }
-
-      const data = await response.json()
-      setAssistantResponse(data.response)
+      setAssistantResponse('')
+      await streamCompletion('/api/ai/virtual-assistant/stream', {
+        question: question,
+        context: {}
+      }, setAssistantResponse, controller.signal)
     } catch (err) {
-      setError('Erro ao consultar assistente: ' + err.message)
+      if (err.name !== 'AbortError') setError('Erro ao consultar assistente: ' + err.message)
     } finally {
-      setLoading(false)
+      if (finishStream('assistant', controller)) setLoading(false)
     }
   }
 
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card.jsx'
 import { Input } from '@/components/ui/input.jsx'
@@ -6,11 +6,20 @@ import { Label } from '@/components/ui/label.jsx'
 import { Alert, AlertDescription } from '@/components/ui/alert.jsx'
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '@/components/ui/dialog.jsx'
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table.jsx'
-import { Loader2, Users, Plus, Edit, Trash2, Phone, Mail, MapPin } from 'lucide-react'
+import { Loader2, Users, Plus, Edit, Trash2, Phone, Mail, MapPin, Search, Upload } from 'lucide-react'
+
+const PAGE_SIZE = 50
 
 const ClientManagement = () => {
   const [clients, setClients] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [searchQuery, setSearchQuery] = useState('')
+  const [searchResults, setSearchResults] = useState(null)
+  const [importing, setImporting] = useState(false)
+  const [importSummary, setImportSummary] = useState('')
+  const importInputRef = useRef(null)
   const [error, setError] = useState('')
   const [isDialogOpen, setIsDialogOpen] = useState(false)
   const [editingClient, setEditingClient] = useState(null)
@@ -28,17 +37,50 @@ const ClientManagement = () => {
     fetchClients()
   }, [])
 
+  // Busca no servidor (índice de texto), com debounce; abaixo de 2 caracteres volta para a lista paginada
+  useEffect(() => {
+    const query = searchQuery.trim()
+    if (query.length < 2) {
+      setSearchResults(null)
+      return
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ franchisee_id: franchiseeId, q: query, limit: 50 })
+        const response = await fetch(`/api/clients/search?${params}`)
+        if (!response.ok) {
+          throw new Error('Erro ao buscar clientes')
+        }
+        const data = await response.json()
+        setSearchResults(data.items)
+      } catch (err) {
+        setError('Erro ao buscar clientes: ' + err.message)
+      }
+    }, 250)
+    return () => clearTimeout(timer)
+  }, [searchQuery, clients])  // refaz a busca quando a lista é recarregada (cadastro/edição/exclusão)
+
+  const visibleClients = searchResults ?? clients
+
+  // Paginação por cursor: a primeira página substitui a lista, as seguintes são anexadas
+  const fetchClientsPage = async (cursor = null) => {
+    const params = new URLSearchParams({ franchisee_id: franchiseeId, limit: PAGE_SIZE })
+    if (cursor) params.set('cursor', cursor)
+    const response = await fetch(`/api/clients?${params}`)
+
+    if (!response.ok) {
+      throw new Error('Erro ao carregar clientes')
+    }
+
+    return response.json()
+  }
+
   const fetchClients = async () => {
     try {
       setLoading(true)
-      const response = await fetch(`/api/clients?franchisee_id=${franchiseeId}`)
-      
-      if (!response.ok) {
-        throw new Error('Erro ao carregar clientes')
-      }
-
-      const data = await response.json()
-      setClients(data)
+      const data = await fetchClientsPage()
+      setClients(data.items)
+      setNextCursor(data.next_cursor)
     } catch (err) {
       setError('Erro ao carregar clientes: ' + err.message)
     } finally {
@@ -46,6 +88,19 @@ const ClientManagement = () => {
     }
   }
 
+  const loadMoreClients = async () => {
+    try {
+      setLoadingMore(true)
+      const data = await fetchClientsPage(nextCursor)
+      setClients((current) => [...current, ...data.items])
+      setNextCursor(data.next_cursor)
+    } catch (err) {
+      setError('Erro ao carregar clientes: ' + err.message)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleSubmit = async (e) => {
     e.preventDefault()
     
@@ -113,6 +168,42 @@ const ClientManagement = () => {
     }
   }
 
+  const handleImport = async (e) => {
+    const file = e.target.files[0]
+    e.target.value = ''
+    if (!file) {
+      return
+    }
+
+    try {
+      setError('')
+      setImportSummary('')
+      setImporting(true)
+      const body = new FormData()
+      body.append('file', file)
+      const response = await fetch(`/api/clients/import?franchisee_id=${franchiseeId}`, {
+        method: 'POST',
+        body
+      })
+      const data = await response.json()
+
+      if (!response.ok) {
+        throw new Error(data.error || 'Erro ao importar clientes')
+      }
+
+      const problems = data.errors.slice(0, 5).map((row) => `linha ${row.line}: ${row.errors.join(', ')}`)
+      setImportSummary(
+        `${data.imported} cliente(s) importado(s), ${data.duplicates} duplicado(s), ${data.invalid} inválido(s)` +
+        (problems.length ? ` — ${problems.join('; ')}${data.errors.length > 5 ? '…' : ''}` : '')
+      )
+      await fetchClients()
+    } catch (err) {
+      setError('Erro ao importar clientes: ' + err.message)
+    } finally {
+      setImporting(false)
+    }
+  }
+
   const resetForm = () => {
     setFormData({
       nome: '',
@@ -151,6 +242,18 @@ const ClientManagement = () => {
                 Gerencie seus clientes e suas informações de contato
               </CardDescription>
             </div>
+            <div className="flex items-center gap-2">
+            <input
+              ref={importInputRef}
+              type="file"
+              accept=".csv,text/csv"
+              className="hidden"
+              onChange={handleImport}
+            />
+            <Button variant="outline" onClick={() => importInputRef.current?.click()} disabled={importing}>
+              {importing ? <Loader2 className="h-4 w-4 mr-2 animate-spin" /> : <Upload className="h-4 w-4 mr-2" />}
+              Importar CSV
+            </Button>
             <Dialog open={isDialogOpen} onOpenChange={setIsDialogOpen}>
               <DialogTrigger asChild>
                 <Button onClick={() => setIsDialogOpen(true)}>
@@ -217,6 +320,7 @@ const ClientManagement = () => {
                 </form>
               </DialogContent>
             </Dialog>
+            </div>
           </div>
         </CardHeader>
         <CardContent>
@@ -226,7 +330,27 @@ const ClientManagement = () => {
             </Alert>
           )}
 
-          {clients.length === 0 ? (
+          {importSummary && (
+            <Alert className="mb-4">
+              <AlertDescription>{importSummary}</AlertDescription>
+            </Alert>
+          )}
+
+          <div className="relative mb-4">
+            <Search className="h-4 w-4 text-gray-400 absolute left-3 top-1/2 -translate-y-1/2" />
+            <Input
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              placeholder="Buscar por nome, email ou telefone"
+              className="pl-9"
+            />
+          </div>
+
+          {searchResults && searchResults.length === 0 ? (
+            <div className="text-center py-8 text-gray-500">
+              Nenhum cliente encontrado para "{searchQuery.trim()}"
+            </div>
+          ) : visibleClients.length === 0 ? (
             <div className="text-center py-8">
               <Users className="h-12 w-12 text-gray-400 mx-auto mb-4" />
               <h3 className="text-lg font-medium text-gray-900 mb-2">Nenhum cliente cadastrado</h3>
@@ -249,7 +373,7 @@ const ClientManagement = () => {
                   </TableRow>
                 </TableHeader>
                 <TableBody>
-                  {clients.map((client) => (
+                  {visibleClients.map((client) => (
                     <TableRow key={client.id}>
                       <TableCell className="font-medium">{client.nome}</TableCell>
                       <TableCell>
@@ -302,6 +426,14 @@ const ClientManagement = () => {
                   ))}
                 </TableBody>
               </Table>
+              {nextCursor && !searchResults && (
+                <div className="flex justify-center mt-4">
+                  <Button variant="outline" onClick={loadMoreClients} disabled={loadingMore}>
+                    {loadingMore && <Loader2 className="h-4 w-4 mr-2 animate-spin" />}
+                    Carregar mais
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
@@ -180,30 +180,21 @@ const Dashboard = () => {
               <div className="flex items-center justify-between">
                 <span className="font-medium">Taxa de Aprovação</span>
                 <span className="text-2xl font-bold text-green-600">
-                  {stats?.total_projects > 0 
-                    ? ((stats.approved_projects_count / stats.total_projects) * 100).toFixed(1)
-                    : '0'
-                  }%
+                  {(stats?.approval_rate || 0).toFixed(1)}%
                 </span>
               </div>
               
               <div className="flex items-center justify-between">
                 <span className="font-medium">Ticket Médio</span>
                 <span className="text-2xl font-bold text-blue-600">
-                  R$ {stats?.approved_projects_count > 0 
-                    ? (stats.total_revenue / stats.approved_projects_count).toFixed(2)
-                    : '0.00'
-                  }
+                  R$ {(stats?.average_ticket || 0).toFixed(2)}
                 </span>
               </div>
 
               <div className="flex items-center justify-between">
                 <span className="font-medium">Projetos por Cliente</span>
                 <span className="text-2xl font-bold text-purple-600">
-                  {stats?.total_clients > 0 
-                    ? (stats.total_projects / stats.total_clients).toFixed(1)
-                    : '0'
-                  }
+                  {(stats?.projects_per_client || 0).toFixed(1)}
                 </span>
               </div>
             </div>
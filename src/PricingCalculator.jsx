@@ -121,6 +121,59 @@ const PricingCalculator = () => {
     }
   };
 
+  const calculateAll = async () => {
+    const pending = items.filter(i => i.materialId && i.quantity && i.difficultyId && i.employeeLevel && i.estimatedDays && i.numEnvelopers);
+    if (pending.length === 0) {
+      setError('Preencha todos os campos de pelo menos um item');
+      return;
+    }
+
+    try {
+      setCalculating(true);
+      setError(null);
+
+      const response = await fetch('/api/calculate-price/batch', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          items: pending.map(item => ({
+            material_id: item.materialId,
+            quantity: parseFloat(item.quantity),
+            difficulty_id: item.difficultyId,
+            employee_level: item.employeeLevel,
+            estimated_days: parseFloat(item.estimatedDays),
+            num_envelopers: parseFloat(item.numEnvelopers)
+          }))
+        })
+      });
+
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || 'Erro ao calcular preços');
+      }
+
+      // resultados vêm na mesma ordem (campo index) dos itens enviados
+      const resultsById = {};
+      data.items.forEach(r => {
+        resultsById[pending[r.index].id] = r.error ? null : r;
+      });
+      setItems(items.map(i =>
+        i.id in resultsById ? { ...i, result: resultsById[i.id] } : i
+      ));
+
+      const failed = data.items.filter(r => r.error);
+      if (failed.length > 0) {
+        setError(failed.map(r => `Item ${items.indexOf(pending[r.index]) + 1}: ${r.error}`).join('; '));
+      }
+    } catch (err) {
+      setError('Erro ao calcular preços: ' + err.message);
+    } finally {
+      setCalculating(false);
+    }
+  };
+
   const getTotalProject = () => {
     const itemsWithResults = items.filter(item => item.result);
     if (itemsWithResults.length === 0) return null;
@@ -336,6 +389,14 @@ const PricingCalculator = () => {
               <Plus className="h-4 w-4" />
               Adicionar Item
             </Button>
+            <Button
+              onClick={calculateAll}
+              disabled={calculating || items.length < 2}
+              className="flex items-center gap-2"
+            >
+              <Calculator className="h-4 w-4" />
+              Calcular Todos
+            </Button>
           </div>
 
           {projectTotal && (
@@ -7,12 +7,18 @@ import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select.jsx'
 import { Loader2, FolderOpen, Eye, Trash2, Calendar, DollarSign, User } from 'lucide-react'
 
+const PAGE_SIZE = 50
+
 const ProjectManagement = () => {
   const [projects, setProjects] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState('')
   const [selectedProject, setSelectedProject] = useState(null)
   const [projectItems, setProjectItems] = useState([])
+  const [selectedIds, setSelectedIds] = useState([])
+  const [bulkUpdating, setBulkUpdating] = useState(false)
 
   // Mock franchisee ID - in real app this would come from authentication
   const franchiseeId = '2dc82321-5f18-46f6-af0f-2b9a0f84e136'
@@ -21,17 +27,25 @@ const ProjectManagement = () => {
     fetchProjects()
   }, [])
 
+  // Paginação por cursor: a primeira página substitui a lista, as seguintes são anexadas
+  const fetchProjectsPage = async (cursor = null) => {
+    const params = new URLSearchParams({ franchisee_id: franchiseeId, limit: PAGE_SIZE })
+    if (cursor) params.set('cursor', cursor)
+    const response = await fetch(`/api/projects?${params}`)
+
+    if (!response.ok) {
+      throw new Error('Erro ao carregar projetos')
+    }
+
+    return response.json()
+  }
+
   const fetchProjects = async () => {
     try {
       setLoading(true)
-      const response = await fetch(`/api/projects?franchisee_id=${franchiseeId}`)
-      
-      if (!response.ok) {
-        throw new Error('Erro ao carregar projetos')
-      }
-
-      const data = await response.json()
-      setProjects(data)
+      const data = await fetchProjectsPage()
+      setProjects(data.items)
+      setNextCursor(data.next_cursor)
     } catch (err) {
       setError('Erro ao carregar projetos: ' + err.message)
     } finally {
@@ -39,6 +53,19 @@ const ProjectManagement = () => {
     }
   }
 
+  const loadMoreProjects = async () => {
+    try {
+      setLoadingMore(true)
+      const data = await fetchProjectsPage(nextCursor)
+      setProjects((current) => [...current, ...data.items])
+      setNextCursor(data.next_cursor)
+    } catch (err) {
+      setError('Erro ao carregar projetos: ' + err.message)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const fetchProjectItems = async (projectId) => {
     try {
       const response = await fetch(`/api/projects/${projectId}/items`)
@@ -68,12 +95,54 @@ const ProjectManagement = () => {
         throw new Error('Erro ao atualizar status do projeto')
       }
 
-      await fetchProjects()
+      // atualiza só a linha alterada para não perder as páginas já carregadas
+      const data = await response.json()
+      setProjects((current) => current.map((p) => (p.id === projectId ? { ...p, ...data.project } : p)))
     } catch (err) {
       setError('Erro ao atualizar status: ' + err.message)
     }
   }
 
+  // todos os selecionados em uma requisição (PUT /api/projects/status)
+  const updateSelectedStatus = async (newStatus) => {
+    try {
+      setBulkUpdating(true)
+      const response = await fetch('/api/projects/status', {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ status: newStatus, ids: selectedIds })
+      })
+
+      const data = await response.json()
+      if (!response.ok) {
+        throw new Error(data.error || 'Erro ao atualizar status dos projetos')
+      }
+
+      const updated = new Set(data.results.filter((r) => r.outcome !== 'not_found').map((r) => r.id))
+      setProjects((current) => current.map((p) => (updated.has(p.id) ? { ...p, status: newStatus } : p)))
+      setSelectedIds([])
+      if (data.not_found > 0) {
+        setError(`${data.not_found} projeto(s) não encontrado(s)`)
+      }
+    } catch (err) {
+      setError('Erro ao atualizar status: ' + err.message)
+    } finally {
+      setBulkUpdating(false)
+    }
+  }
+
+  const toggleSelected = (projectId) => {
+    setSelectedIds((current) => (
+      current.includes(projectId) ? current.filter((id) => id !== projectId) : [...current, projectId]
+    ))
+  }
+
+  const toggleAllSelected = () => {
+    setSelectedIds((current) => (current.length === projects.length ? [] : projects.map((p) => p.id)))
+  }
+
   const deleteProject = async (projectId) => {
     if (!confirm('Tem certeza que deseja excluir este projeto?')) {
       return
@@ -88,7 +157,8 @@ const ProjectManagement = () => {
         throw new Error('Erro ao excluir projeto')
       }
 
-      await fetchProjects()
+      setProjects((current) => current.filter((p) => p.id !== projectId))
+      setSelectedIds((current) => current.filter((id) => id !== projectId))
       if (selectedProject && selectedProject.id === projectId) {
         setSelectedProject(null)
         setProjectItems([])
@@ -156,9 +226,33 @@ const ProjectManagement = () => {
             </div>
           ) : (
             <div className="overflow-x-auto">
+              {selectedIds.length > 0 && (
+                <div className="flex items-center gap-2 mb-4">
+                  <span className="text-sm text-gray-600">{selectedIds.length} selecionado(s)</span>
+                  <Select onValueChange={updateSelectedStatus} disabled={bulkUpdating}>
+                    <SelectTrigger className="w-48">
+                      <SelectValue placeholder="Alterar status para..." />
+                    </SelectTrigger>
+                    <SelectContent>
+                      <SelectItem value="Rascunho">Rascunho</SelectItem>
+                      <SelectItem value="Enviado">Enviado</SelectItem>
+                      <SelectItem value="Aprovado">Aprovado</SelectItem>
+                      <SelectItem value="Rejeitado">Rejeitado</SelectItem>
+                    </SelectContent>
+                  </Select>
+                  {bulkUpdating && <Loader2 className="h-4 w-4 animate-spin" />}
+                </div>
+              )}
               <Table>
                 <TableHeader>
                   <TableRow>
+                    <TableHead className="w-8">
+                      <input
+                        type="checkbox"
+                        checked={projects.length > 0 && selectedIds.length === projects.length}
+                        onChange={toggleAllSelected}
+                      />
+                    </TableHead>
                     <TableHead>Projeto</TableHead>
                     <TableHead>Cliente</TableHead>
                     <TableHead>Status</TableHead>
@@ -170,6 +264,13 @@ const ProjectManagement = () => {
                 <TableBody>
                   {projects.map((project) => (
                     <TableRow key={project.id}>
+                      <TableCell>
+                        <input
+                          type="checkbox"
+                          checked={selectedIds.includes(project.id)}
+                          onChange={() => toggleSelected(project.id)}
+                        />
+                      </TableCell>
                       <TableCell className="font-medium">{project.nome_projeto}</TableCell>
                       <TableCell>
                         {project.client && (
@@ -230,6 +331,14 @@ const ProjectManagement = () => {
                   ))}
                 </TableBody>
               </Table>
+              {nextCursor && (
+                <div className="flex justify-center mt-4">
+                  <Button variant="outline" onClick={loadMoreProjects} disabled={loadingMore}>
+                    {loadingMore && <Loader2 className="h-4 w-4 mr-2 animate-spin" />}
+                    Carregar mais
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </CardContent>
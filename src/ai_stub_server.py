@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita POST /v1/chat/completions da OpenAI (com e sem
+stream=true), para testar o gateway de IA e medir carga sem gastar tokens:
+
+    python src/ai_stub_server.py --port 8001 --delay 2
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python src/main.py
+
+Opções: --delay (segundos até a resposta), --token-delay (intervalo entre
+chunks no modo stream), --fail-rate (fração de respostas 503, para exercitar as
+retentativas). GET /stats devolve os contadores (requisições, conexões TCP
+abertas, em andamento); POST /stats/reset zera.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+JSON_REPLY = {
+    "suggestions": [],
+    "analysis": "Resposta do servidor stub.",
+    "recommendations": ["Recomendação de teste"],
+    "pricing_strategy": "Estratégia de teste",
+    "negotiation_points": [],
+    "risks": [],
+    "opportunities": [],
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # backlog do listen(): carga com centenas de conexões simultâneas
+
+    def handle_error(self, request, client_address):
+        # cliente que desistiu (timeout de leitura nos testes) não é erro do stub
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class StubState:
+    def __init__(self, delay=0.0, token_delay=0.0, fail_rate=0.0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {"requests": 0, "completions": 0, "streams": 0, "failures": 0,
+                             "connections": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def count(self, name, delta=1):
+        with self.lock:
+            self.counters[name] += delta
+            if name == "in_flight":
+                self.counters["max_in_flight"] = max(self.counters["max_in_flight"], self.counters["in_flight"])
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def reply_text(messages):
+    """JSON quando o system prompt pede JSON; senão, um eco curto da pergunta."""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    if "JSON" in system:
+        return json.dumps(JSON_REPLY, ensure_ascii=False)
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return "Resposta do stub para: " + " ".join(question.split())[:80]
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, para o pool do cliente reaproveitar conexões
+
+        def setup(self):
+            super().setup()
+            state.count("connections")
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                return self._send_json(200, state.snapshot())
+            self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if self.path.rstrip("/") == "/stats/reset":
+                state.reset()
+                return self._send_json(200, state.snapshot())
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            state.count("requests")
+            state.count("in_flight")
+            try:
+                payload = json.loads(raw or b"{}")
+                if state.fail_rate and random.random() < state.fail_rate:
+                    state.count("failures")
+                    return self._send_json(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+                time.sleep(state.delay)
+                text = reply_text(payload.get("messages", []))
+                if payload.get("stream"):
+                    return self._stream(payload, text)
+                state.count("completions")
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": payload.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()),
+                              "total_tokens": len(text.split())},
+                })
+            finally:
+                state.count("in_flight", -1)
+
+        def _stream(self, payload, text):
+            state.count("streams")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+            def chunk(delta, finish_reason=None):
+                event = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": payload.get("model", "stub"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+
+            try:
+                chunk({"role": "assistant", "content": ""})
+                for i, word in enumerate(text.split(" ")):
+                    time.sleep(state.token_delay)
+                    chunk({"content": word if i == 0 else " " + word})
+                chunk({}, "stop")
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def _write_chunk(self, text):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_stub(port=0, delay=0.0, token_delay=0.0, fail_rate=0.0):
+    """Sobe o stub em uma thread; retorna (server, state). base_url: http://127.0.0.1:<port>/v1."""
+    state = StubState(delay, token_delay, fail_rate)
+    server = StubServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub local do chat-completions da OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub_state = StubState(args.delay, args.token_delay, args.fail_rate)
+    httpd = StubServer((args.host, args.port), make_handler(stub_state))
+    print(f"AI stub listening on http://{args.host}:{args.port}/v1 (delay={args.delay}s, fail_rate={args.fail_rate})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,182 @@
+# src/asgi_ai.py
+"""
+App ASGI para as rotas /api/ai/* que chamam o LLM.
+
+No gunicorn síncrono (2 workers x 4 threads) cada chamada ao LLM prende uma
+thread por vários segundos; quatro chamadas simultâneas bastam para enfileirar
+/calculate-price e o CRM atrás delas. Aqui as mesmas rotas (AI_JOBS de
+src/routes/ai_assistant.py) rodam em asyncio: o prompt é montado numa thread do
+pool (consultas ao banco, dentro do app_context do Flask), a espera pelo
+upstream é um await no AsyncAIGateway (limite AI_ASYNC_MAX_CONCURRENCY), e o
+cache de respostas e a coalescência de prompts idênticos (single_flight) são os
+mesmos das rotas Flask. Qualquer outra rota cai no app Flask via WSGI, então o
+processo também responde sozinho em desenvolvimento.
+
+    uvicorn src.asgi_ai:app --host 0.0.0.0 --port 5001
+
+Em produção o nginx manda /api/ai/ para este processo e o resto para o gunicorn.
+"""
+from contextlib import asynccontextmanager
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from src.main import app as flask_app
+from src.routes.ai_assistant import AI_JOBS, STREAMING_JOBS, _sse
+from src.services.ai_gateway import AIGatewayError, AsyncAIGateway, ai_gateway, resolve_model
+from src.services.completion_cache import completion_cache, completion_key
+from src.services.single_flight import single_flight
+
+async_ai_gateway = AsyncAIGateway()
+
+
+def _prepare(prepare, data):
+    with flask_app.app_context():
+        return prepare(data)
+
+
+async def _cached_or_none(job, model):
+    key = completion_key(job.messages, model, job.temperature, job.max_tokens)
+    if not completion_cache.enabled_for(job.endpoint):
+        return key, False, None
+    return key, True, await run_in_threadpool(completion_cache.get, key, job.endpoint)
+
+
+async def _load_job(request, name):
+    """(job, None) ou (None, resposta de erro 400)."""
+    prepare, _ = AI_JOBS[name]
+    try:
+        data = await request.json() if await request.body() else {}
+        return await run_in_threadpool(_prepare, prepare, data or {}), None
+    except ValueError as e:
+        return None, JSONResponse({"error": str(e)}, status_code=400)
+
+
+async def _chat_complete(job):
+    """Equivalente assíncrono de _chat_complete: cache primeiro, depois o upstream."""
+    model = resolve_model(None)
+    key, use_cache, cached = await _cached_or_none(job, model)
+    if cached is not None:
+        return cached
+
+    async def call():
+        text = await async_ai_gateway.chat_complete(job.messages, max_tokens=job.max_tokens,
+                                                    temperature=job.temperature, model=model, endpoint=job.endpoint)
+        if use_cache and text:
+            await run_in_threadpool(completion_cache.put, key, text, model, job.endpoint)
+        return text
+
+    lookup = (lambda: completion_cache.get(key, job.endpoint)) if use_cache else None
+    return await single_flight.do_async(key, call, lookup=lookup, endpoint=job.endpoint)
+
+
+async def _stream_complete(job):
+    model = resolve_model(None)
+    key, use_cache, cached = await _cached_or_none(job, model)
+    if cached is not None:
+        yield cached
+        return
+    upstream = async_ai_gateway.stream_chat(job.messages, max_tokens=job.max_tokens, temperature=job.temperature,
+                                            model=model, endpoint=job.endpoint)
+    parts = []
+    try:
+        async for piece in upstream:
+            parts.append(piece)
+            yield piece
+    finally:
+        await upstream.aclose()
+    if use_cache and parts:
+        await run_in_threadpool(completion_cache.put, key, "".join(parts), model, job.endpoint)
+
+
+def job_endpoint(name):
+    _, error_prefix = AI_JOBS[name]
+
+    async def endpoint(request):
+        try:
+            job, error = await _load_job(request, name)
+            if error is not None:
+                return error
+            if job.messages is None:
+                return JSONResponse(job.result)
+            try:
+                ai_text = await _chat_complete(job)
+            except AIGatewayError as e:
+                return JSONResponse({"error": str(e)}, status_code=e.status_code)
+            return JSONResponse(job.finalize(ai_text))
+        except Exception as e:
+            return JSONResponse({"error": f"{error_prefix}: {str(e)}"}, status_code=500)
+
+    return endpoint
+
+
+def stream_endpoint(name):
+    """Mesmo formato de eventos de _sse_response; o primeiro trecho é lido antes de responder."""
+    _, error_prefix = AI_JOBS[name]
+
+    async def endpoint(request):
+        try:
+            job, error = await _load_job(request, name)
+            if error is not None:
+                return error
+            pieces = _stream_complete(job)
+            try:
+                first = await pieces.__anext__()
+            except StopAsyncIteration:
+                first = ""
+            except AIGatewayError as e:
+                return JSONResponse({"error": str(e)}, status_code=e.status_code)
+        except Exception as e:
+            return JSONResponse({"error": f"{error_prefix}: {str(e)}"}, status_code=500)
+
+        async def events():
+            text = [first]
+            try:
+                if first:
+                    yield _sse("token", {"text": first})
+                async for piece in pieces:
+                    text.append(piece)
+                    yield _sse("token", {"text": piece})
+                yield _sse("done", {"text": "".join(text).strip()})
+            except AIGatewayError as e:
+                yield _sse("error", {"error": str(e), "status": e.status_code})
+            finally:
+                await pieces.aclose()
+
+        return StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    return endpoint
+
+
+async def ai_health(request):
+    return JSONResponse({
+        "openai_key": bool(os.getenv("OPENAI_API_KEY")),
+        "gateway": ai_gateway.stats(),
+        "async_gateway": async_ai_gateway.stats(),
+        "single_flight": single_flight.stats(),
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_ai_gateway.close()
+
+
+routes = [Route("/api/ai/ai/health", ai_health, methods=["GET"])]
+for job_name in AI_JOBS:
+    routes.append(Route(f"/api/ai/{job_name}", job_endpoint(job_name), methods=["POST"]))
+for job_name in STREAMING_JOBS:
+    routes.append(Route(f"/api/ai/{job_name}/stream", stream_endpoint(job_name), methods=["POST"]))
+# demais rotas (/api/ai/optimize-margins, CRM, pricing, estáticos) seguem no Flask
+routes.append(Mount("/", WSGIMiddleware(flask_app)))
+
+app = Starlette(routes=routes, lifespan=lifespan)
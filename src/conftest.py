@@ -0,0 +1,51 @@
+"""
+Shared pytest fixtures: the Flask app on an in-memory SQLite database (created
+empty for each test) with the per-worker caches cleared, and a seeded variant
+with the /api/seed demo data. Tests open `app.app_context()` themselves when
+they touch the database directly, so every request gets its own session.
+"""
+
+import os
+
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+
+import pytest
+
+from src.main import app as flask_app
+from src.models.user import db
+from src.services import rule_sets
+from src.services.quote_cache import quote_cache
+from src.services.response_cache import response_cache
+
+
+@pytest.fixture
+def app(monkeypatch):
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+    response_cache.clear()
+    quote_cache.clear()
+    # fresh rule-set snapshot with no check interval: each test sees its own database
+    monkeypatch.setattr(rule_sets, "_store", rule_sets._DbRulesStore(0))
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded(client):
+    """Seeded ids: materials and difficulties (in seed order), clients and franchise_id."""
+    response = client.post("/api/seed")
+    assert response.status_code == 201, response.json
+    materials = client.get("/api/materials").json
+    difficulties = sorted(client.get("/api/difficulty-factors").json, key=lambda d: d["nivel"])
+    clients = client.get("/api/clients").json
+    return {
+        "materials": [m["id"] for m in materials],
+        "difficulties": [d["id"] for d in difficulties],
+        "clients": [c["id"] for c in clients],
+        "franchise_id": clients[0]["id_franqueado"],
+    }
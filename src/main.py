@@ -7,10 +7,14 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.models.franchise import Franchise
-from src.models.material import Material
+from src.models.material import Material, MaterialImportStaging
 from src.models.difficulty import DifficultyFactor
 from src.models.client import Client
 from src.models.project import Project, ProjectItem
+from src.models.franchise_stats import FranchiseStats, FranchiseMonthlyStats
+from src.models.pricing_rule import PricingRuleSet, PricingEmployeeRate, PricingDifficultyRule, PricingRulesVersion
+from src.models.cache_version import ResponseCacheVersion
+from src.services.response_cache import response_cache
 from src.routes.user import user_bp
 from src.routes.pricing import pricing_bp
 from src.routes.seed_data import seed_bp
@@ -59,5 +63,9 @@ def serve(path):
 def health():
     return {"status": "ok"}, 200
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    return response_cache.stats(), 200
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
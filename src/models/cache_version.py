@@ -0,0 +1,16 @@
+from src.models.user import db
+
+class ResponseCacheVersion(db.Model):
+    """
+    Versão compartilhada entre workers de cada (tabela, franquia) usada pelo cache de
+    respostas (services/response_cache.py). id_franqueado '' = alteração da tabela toda;
+    '*' = qualquer alteração na tabela.
+    """
+    __tablename__ = 'response_cache_versions'
+
+    tabela = db.Column(db.String(64), primary_key=True)
+    id_franqueado = db.Column(db.String(36), primary_key=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResponseCacheVersion {self.tabela}/{self.id_franqueado} {self.versao}>'
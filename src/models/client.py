@@ -5,6 +5,10 @@ from datetime import datetime
 
 class Client(db.Model):
     __tablename__ = 'clients'
+    __table_args__ = (
+        # listagem paginada por franquia: ORDER BY data_cadastro DESC, id DESC
+        db.Index('ix_clients_franqueado_cadastro_id', 'id_franqueado', 'data_cadastro', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     id_franqueado = db.Column(db.String(36), db.ForeignKey('franchises.id'), nullable=False)
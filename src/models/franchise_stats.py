@@ -0,0 +1,71 @@
+from src.models.user import db
+from datetime import datetime
+
+class FranchiseStats(db.Model):
+    """Contadores do dashboard por franquia, mantidos pelas rotas de escrita (ver services/franchise_stats.py)."""
+    __tablename__ = 'franchise_stats'
+
+    id_franqueado = db.Column(db.String(36), primary_key=True)
+    total_clientes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_rascunho = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_enviado = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_aprovado = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_rejeitado = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_outros = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # status fora da lista padrão
+    receita_aprovada = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    # receita (preco_venda_sugerido) dos demais status
+    receita_rascunho = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    receita_enviado = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    receita_rejeitado = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    receita_outros = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FranchiseStats {self.id_franqueado}>'
+
+    def to_dict(self):
+        return {
+            'id_franqueado': self.id_franqueado,
+            'total_clientes': self.total_clientes,
+            'projetos_rascunho': self.projetos_rascunho,
+            'projetos_enviado': self.projetos_enviado,
+            'projetos_aprovado': self.projetos_aprovado,
+            'projetos_rejeitado': self.projetos_rejeitado,
+            'projetos_outros': self.projetos_outros,
+            'receita_aprovada': float(self.receita_aprovada),
+            'receita_rascunho': float(self.receita_rascunho),
+            'receita_enviado': float(self.receita_enviado),
+            'receita_rejeitado': float(self.receita_rejeitado),
+            'receita_outros': float(self.receita_outros),
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
+
+class FranchiseMonthlyStats(db.Model):
+    """Agregado mensal por franquia (mês de criação do projeto), mantido junto com franchise_stats."""
+    __tablename__ = 'franchise_monthly_stats'
+
+    id_franqueado = db.Column(db.String(36), primary_key=True)
+    mes = db.Column(db.Date, primary_key=True)  # primeiro dia do mês
+    total_projetos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_aprovados = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    projetos_rejeitados = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    receita_aprovada = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    soma_margem = db.Column(db.Numeric(14, 4), nullable=False, default=0, server_default='0')  # média = soma_margem / total_projetos
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FranchiseMonthlyStats {self.id_franqueado} {self.mes}>'
+
+    def to_dict(self):
+        approved = self.projetos_aprovados
+        decided = approved + self.projetos_rejeitados
+        return {
+            'month': self.mes.strftime('%Y-%m'),
+            'project_count': self.total_projetos,
+            'approved_count': approved,
+            'rejected_count': self.projetos_rejeitados,
+            'approved_revenue': float(self.receita_aprovada),
+            'average_margin': round(float(self.soma_margem) / self.total_projetos, 4) if self.total_projetos else None,
+            'average_ticket': round(float(self.receita_aprovada) / approved, 2) if approved else None,
+            'approval_rate': round(approved * 100 / decided, 1) if decided else None,
+        }
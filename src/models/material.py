@@ -26,3 +26,20 @@ class Material(db.Model):
             'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
         }
 
+
+
+class MaterialImportStaging(db.Model):
+    """Linhas de uma planilha de fornecedor em importação (ver src/services/material_import.py)."""
+    __tablename__ = 'material_import_staging'
+    __table_args__ = (
+        db.Index('ix_material_import_staging_lote_nome', 'lote', 'nome'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    lote = db.Column(db.String(36), nullable=False)
+    linha = db.Column(db.Integer, nullable=False)
+    novo_id = db.Column(db.String(36), nullable=False)  # id usado se o material for novo
+    nome = db.Column(db.String(200), nullable=False)
+    unidade_medida = db.Column(db.String(10))
+    custo_unitario_base = db.Column(db.Numeric(10, 2), nullable=False)
+    descricao = db.Column(db.Text)
@@ -0,0 +1,81 @@
+from src.models.user import db
+import uuid
+from datetime import datetime
+
+class PricingRuleSet(db.Model):
+    """Conjunto de regras com vigência; id_franqueado vazio = regra global."""
+    __tablename__ = 'pricing_rule_sets'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id_franqueado = db.Column(db.String(36), index=True)  # mesmo identificador usado em clients/projects
+    nome = db.Column(db.String(200), nullable=False)
+    vigente_desde = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    vigente_ate = db.Column(db.DateTime)
+    margem_min = db.Column(db.Numeric(6, 4), nullable=False, default=0)
+    margem_padrao = db.Column(db.Numeric(6, 4))
+    margem_max = db.Column(db.Numeric(6, 4))
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    employee_rates = db.relationship('PricingEmployeeRate', backref='rule_set', lazy=True, cascade='all, delete-orphan')
+    difficulty_rules = db.relationship('PricingDifficultyRule', backref='rule_set', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<PricingRuleSet {self.nome}>'
+
+    def to_rules_data(self):
+        """Mesmo formato do extracted_pricing_data.json."""
+        margin_ranges = {'min': self.margem_min}
+        if self.margem_padrao is not None:
+            margin_ranges['default'] = self.margem_padrao
+        if self.margem_max is not None:
+            margin_ranges['max'] = self.margem_max
+        return {
+            'employee_rates': {r.nivel_funcionario: r.taxa_diaria for r in self.employee_rates},
+            'difficulty_factors': {
+                d.nivel: {'material_multiplier': d.multiplicador_material, 'tax_rate': d.taxa_imposto}
+                for d in self.difficulty_rules
+            },
+            'margin_ranges': margin_ranges,
+        }
+
+    def to_dict(self):
+        data = self.to_rules_data()
+        return {
+            'id': self.id,
+            'id_franqueado': self.id_franqueado,
+            'nome': self.nome,
+            'vigente_desde': self.vigente_desde.isoformat() if self.vigente_desde else None,
+            'vigente_ate': self.vigente_ate.isoformat() if self.vigente_ate else None,
+            'employee_rates': {k: float(v) for k, v in data['employee_rates'].items()},
+            'difficulty_factors': {
+                k: {kk: float(vv) for kk, vv in v.items()} for k, v in data['difficulty_factors'].items()
+            },
+            'margin_ranges': {k: float(v) for k, v in data['margin_ranges'].items()},
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
+
+class PricingEmployeeRate(db.Model):
+    __tablename__ = 'pricing_employee_rates'
+    __table_args__ = (db.UniqueConstraint('id_regra', 'nivel_funcionario'),)
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id_regra = db.Column(db.String(36), db.ForeignKey('pricing_rule_sets.id'), nullable=False)
+    nivel_funcionario = db.Column(db.String(50), nullable=False)
+    taxa_diaria = db.Column(db.Numeric(10, 2), nullable=False)
+
+class PricingDifficultyRule(db.Model):
+    __tablename__ = 'pricing_difficulty_rules'
+    __table_args__ = (db.UniqueConstraint('id_regra', 'nivel'),)
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id_regra = db.Column(db.String(36), db.ForeignKey('pricing_rule_sets.id'), nullable=False)
+    nivel = db.Column(db.String(50), nullable=False)
+    multiplicador_material = db.Column(db.Numeric(6, 4), nullable=False, default=1)
+    taxa_imposto = db.Column(db.Numeric(6, 4), nullable=False, default=0)
+
+class PricingRulesVersion(db.Model):
+    """Contador único; incrementado a cada alteração de regras (workers recarregam ao ver mudança)."""
+    __tablename__ = 'pricing_rules_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
@@ -5,6 +5,11 @@ from datetime import datetime
 
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        # listagens paginadas: ORDER BY data_criacao DESC, id DESC
+        db.Index('ix_projects_franqueado_criacao_id', 'id_franqueado', 'data_criacao', 'id'),
+        db.Index('ix_projects_cliente_criacao_id', 'id_cliente', 'data_criacao', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     id_franqueado = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
@@ -18,6 +23,7 @@ class Project(db.Model):
     
     # Relationships
     items = db.relationship('ProjectItem', backref='project', lazy=True, cascade='all, delete-orphan')
+    client = db.relationship('Client', lazy=True)
 
     def __repr__(self):
         return f'<Project {self.nome_projeto}>'
@@ -39,13 +45,18 @@ class ProjectItem(db.Model):
     __tablename__ = 'project_items'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    id_projeto = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False)
-    id_material = db.Column(db.String(36), db.ForeignKey('materials.id'), nullable=False)
+    id_projeto = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False, index=True)
+    id_material = db.Column(db.String(36), db.ForeignKey('materials.id'), nullable=False, index=True)
     quantidade = db.Column(db.Numeric(10, 2), nullable=False)
     id_dificuldade = db.Column(db.String(36), db.ForeignKey('difficulty_factors.id'), nullable=False)
     custo_item = db.Column(db.Numeric(10, 2), default=0.0)
     preco_venda_item = db.Column(db.Numeric(10, 2), default=0.0)
     observacoes = db.Column(db.Text)
+    # entradas de mão de obra usadas no cálculo (permitem recalcular rascunhos);
+    # 4 casas, a mesma escala do motor de preços
+    nivel_funcionario = db.Column(db.String(50))
+    dias_estimados = db.Column(db.Numeric(12, 4))
+    num_envelopadores = db.Column(db.Numeric(12, 4))
     
     # Relationships
     material = db.relationship('Material', backref='project_items')
@@ -64,6 +75,9 @@ class ProjectItem(db.Model):
             'custo_item': float(self.custo_item),
             'preco_venda_item': float(self.preco_venda_item),
             'observacoes': self.observacoes,
+            'nivel_funcionario': self.nivel_funcionario,
+            'dias_estimados': float(self.dias_estimados) if self.dias_estimados is not None else None,
+            'num_envelopadores': float(self.num_envelopadores) if self.num_envelopadores is not None else None,
             'material': self.material.to_dict() if self.material else None,
             'difficulty': self.difficulty.to_dict() if self.difficulty else None
         }
@@ -9,6 +9,12 @@ import time
 import threading
 from concurrent.futures import ThreadPoolExecutor
 import statistics
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
 
 BASE_URL = "http://localhost:5000/api"
 
@@ -134,5 +140,251 @@ def run_performance_tests():
     else:
         print("⚠️  SLOW performance. Consider optimization before production.")
 
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server did not start: {url}")
+
+def _percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def _pricing_while(stop, url, payload, samples, rate=20):
+    """Fires /calculate-price at a fixed rate (open loop, so a blocked server shows up as slow samples)."""
+    def call():
+        start_time = time.time()
+        try:
+            ok = requests.post(url, json=payload, timeout=120).status_code < 400
+        except requests.RequestException:
+            ok = False
+        samples.append(((time.time() - start_time) * 1000, ok))
+
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        while not stop.is_set():
+            executor.submit(call)
+            time.sleep(1 / rate)
+
+def _pricing_phase(label, pricing_url, payload, ai_url=None, ai_requests=0):
+    """Pricing latency on gunicorn, optionally while `ai_requests` AI calls hit `ai_url` at once."""
+    stop = threading.Event()
+    samples = []
+    workers = [threading.Thread(target=_pricing_while, args=(stop, pricing_url, payload, samples))]
+    ai_status = {}
+    ai_times = []
+    start_time = time.time()
+    for worker in workers:
+        worker.start()
+    if ai_url:
+        def ask(i):
+            t0 = time.time()
+            try:
+                code = requests.post(ai_url, json={"question": f"Pergunta de carga {i}: qual tinta usar?"},
+                                     timeout=120).status_code
+            except requests.RequestException:
+                code = "error"
+            ai_times.append((time.time() - t0) * 1000)
+            return code
+
+        with ThreadPoolExecutor(max_workers=ai_requests) as executor:
+            for code in executor.map(ask, range(ai_requests)):
+                ai_status[code] = ai_status.get(code, 0) + 1
+    else:
+        time.sleep(3)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - start_time
+
+    latencies = [ms for ms, ok in samples if ok]
+    print(f"\n🔄 {label}")
+    print(f"   /calculate-price: {len(latencies)}/{len(samples)} ok, "
+          f"p50 {_percentile(latencies, 50):.1f}ms, p95 {_percentile(latencies, 95):.1f}ms, "
+          f"max {max(latencies or [0]):.1f}ms")
+    if ai_url:
+        print(f"   AI: {ai_status.get(200, 0)}/{ai_requests} ok {ai_status} in {elapsed:.1f}s, "
+              f"p95 {_percentile(ai_times, 95):.0f}ms")
+    return {
+        'label': label,
+        'pricing_p50': _percentile(latencies, 50),
+        'pricing_p95': _percentile(latencies, 95),
+        'pricing_errors': len(samples) - len(latencies),
+        'ai_ok': ai_status.get(200, 0),
+        'ai_status': ai_status,
+    }
+
+def run_mixed_load_test(ai_requests=200, ai_delay=2.0):
+    """
+    AI calls against a local stub upstream (src/ai_stub_server.py) while measuring
+    /calculate-price on gunicorn (2 workers x 4 threads, as in the Dockerfile):
+    first with the AI routes on gunicorn itself, then on the async app (src/asgi_ai.py).
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.ai_stub_server import start_stub
+
+    print("🚀 Starting mixed load test (AI + pricing)...")
+    print("=" * 60)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix="mixed-load-")
+    stub, stub_state = start_stub(delay=ai_delay)
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'app.db')}",
+        OPENAI_API_KEY="stub",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{stub.server_address[1]}/v1",
+        AI_CACHE_PATH=os.path.join(workdir, "ai_cache.db"),
+        AI_CACHE_DISABLED_ENDPOINTS="virtual-assistant",
+        AI_ASYNC_MAX_CONCURRENCY=str(max(ai_requests, 1)),
+    )
+    subprocess.run([sys.executable, "-c", "from src.main import app, db\nwith app.app_context(): db.create_all()"],
+                   cwd=root, env=env, check=True)
+
+    wsgi_port, asgi_port = _free_port(), _free_port()
+    servers = [
+        subprocess.Popen([sys.executable, "-m", "gunicorn", "src.main:app", "--bind", f"127.0.0.1:{wsgi_port}",
+                          "--workers", "2", "--threads", "4", "--timeout", "120"],
+                         cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "src.asgi_ai:app", "--port", str(asgi_port),
+                          "--log-level", "warning"],
+                         cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    try:
+        wsgi, asgi = f"http://127.0.0.1:{wsgi_port}/api", f"http://127.0.0.1:{asgi_port}/api"
+        _wait_ready(f"{wsgi}/health")
+        _wait_ready(f"{asgi}/health")
+        requests.post(f"{wsgi}/seed", timeout=30)
+        pricing_data = {
+            "material_id": requests.get(f"{wsgi}/materials", timeout=10).json()[0]["id"],
+            "quantity": 10,
+            "difficulty_id": requests.get(f"{wsgi}/difficulty-factors", timeout=10).json()[0]["id"],
+            "employee_level": "mid",
+            "estimated_days": 2,
+            "num_envelopers": 2,
+        }
+        pricing_url = f"{wsgi}/calculate-price"
+
+        results = [
+            _pricing_phase("Pricing only (no AI load)", pricing_url, pricing_data),
+            _pricing_phase(f"{ai_requests} AI calls on gunicorn (sync threads)", pricing_url, pricing_data,
+                           f"{wsgi}/ai/virtual-assistant", ai_requests),
+            _pricing_phase(f"{ai_requests} AI calls on the async app (uvicorn src.asgi_ai:app)", pricing_url,
+                           pricing_data, f"{asgi}/ai/virtual-assistant", ai_requests),
+        ]
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait(timeout=15)
+        stub.shutdown()
+
+    print("\n" + "=" * 60)
+    print("📋 MIXED LOAD SUMMARY")
+    print("=" * 60)
+    baseline, sync_ai, async_ai = results
+    for result in results:
+        print(f"\n{result['label']}:")
+        print(f"  Pricing p50/p95: {result['pricing_p50']:.1f}ms / {result['pricing_p95']:.1f}ms")
+        if result is not baseline:
+            print(f"  AI success: {result['ai_ok']}/{ai_requests}")
+    print(f"\n📈 Upstream stub: {stub_state.snapshot()}")
+    if async_ai['ai_ok'] == ai_requests and async_ai['pricing_p95'] < sync_ai['pricing_p95']:
+        print("🎉 Async AI app keeps pricing latency flat under AI load.")
+    else:
+        print("⚠️  Async AI app did not isolate pricing traffic; check the numbers above.")
+    return results
+
+def run_client_search_benchmark(clients=100_000, runs=50, seed=42):
+    """
+    /api/clients/search on SQLite with the FTS5 index (alembic upgrade head) and
+    `clients` clients in one franchise. Target: p95 under 20ms per query type.
+    """
+    import random
+
+    print(f"🚀 Starting client search benchmark ({clients} clients in one franchise)...")
+    print("=" * 60)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix="client-search-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=root, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    sys.path.insert(0, root)
+    from sqlalchemy import text
+    from src.main import app, db
+
+    rng = random.Random(seed)
+    first = ["Ana", "João", "Maria", "José", "Luíza", "Pedro", "Mariana", "Carlos", "Fernanda", "Lucas",
+             "Beatriz", "Rafael", "Camila", "Gustavo", "Patrícia", "Thiago", "Juliana", "André", "Letícia", "Bruno"]
+    last = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+            "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa"]
+    rows = []
+    for i in range(clients):
+        nome = f"{rng.choice(first)} {rng.choice(last)} {rng.choice(last)} {i}"
+        rows.append({
+            "id": f"c{i:08d}", "nome": nome, "email": f"cliente{i}@exemplo.com.br",
+            "telefone": f"({rng.randint(11, 99)}) {rng.randint(9000, 9999)}-{rng.randint(0, 9999):04d}",
+        })
+    started = time.time()
+    with app.app_context():
+        db.session.execute(text("INSERT INTO franchises (id, nome_franquia, cnpj) VALUES ('bench', 'Benchmark', '00.000.000/0001-00')"))
+        db.session.execute(text(
+            "INSERT INTO clients (id, id_franqueado, nome, email, telefone) "
+            "VALUES (:id, 'bench', :nome, :email, :telefone)"
+        ), rows)
+        db.session.commit()
+    print(f"   {clients} clients indexed in {time.time() - started:.1f}s")
+
+    sample = rng.sample(rows, runs)
+    queries = {
+        "prefix (\"mari sil\")": lambda r: "mari sil",
+        "full name": lambda r: r["nome"].rsplit(" ", 1)[0],
+        "phone digits mid-number": lambda r: "".join(ch for ch in r["telefone"] if ch.isdigit())[3:8],
+        "fragment (\"liveir\")": lambda r: "liveir",
+        "email": lambda r: r["email"],
+        "typo (one letter dropped)": lambda r: r["nome"].split(" ")[0] + " " + r["nome"].split(" ")[1][:2] + r["nome"].split(" ")[1][3:],
+        "no match": lambda r: "zzqqxx",
+    }
+    client = app.test_client()
+    results = {}
+    for label, make_query in queries.items():
+        times, found = [], 0
+        for row in sample:
+            t0 = time.perf_counter()
+            response = client.get("/api/clients/search", query_string={"franchisee_id": "bench", "q": make_query(row)})
+            times.append((time.perf_counter() - t0) * 1000)
+            found += bool(response.json["items"])
+        results[label] = _percentile(times, 95)
+        print(f"   {label:<28} p50 {_percentile(times, 50):6.1f}ms  p95 {results[label]:6.1f}ms  "
+              f"with results {found}/{runs}")
+
+    slow = [label for label, p95 in results.items() if p95 >= 20]
+    print("\n" + ("🎉 Every query type under 20ms (p95)." if not slow else f"⚠️  Over 20ms (p95): {', '.join(slow)}"))
+    return results
+
 if __name__ == "__main__":
-    run_performance_tests()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mixed-load", action="store_true",
+                        help="AI + pricing load test against a local stub upstream (starts its own servers)")
+    parser.add_argument("--client-search", action="store_true",
+                        help="client search latency on SQLite/FTS5 with --clients clients in one franchise")
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--ai-requests", type=int, default=200)
+    parser.add_argument("--ai-delay", type=float, default=2.0, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+    if args.mixed_load:
+        run_mixed_load_test(args.ai_requests, args.ai_delay)
+    elif args.client_search:
+        run_client_search_benchmark(args.clients)
+    else:
+        run_performance_tests()
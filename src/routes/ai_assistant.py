@@ -1,6 +1,7 @@
 # src/routes/ai_assistant.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from decimal import Decimal
+from datetime import date
 import json
 import os
 
@@ -8,69 +9,110 @@ from src.models.user import db
 from src.models.material import Material
 from src.models.project import Project, ProjectItem
 from src.models.client import Client
+from src.services import franchise_stats
+from src.services.ai_gateway import AIGatewayError, ai_gateway, resolve_model
+from src.services.completion_cache import completion_cache, completion_key
+from src.services.margin_model import model_cache, optimize_margin
+from src.services.single_flight import single_flight
+from src.services.rule_sets import resolve_pricing_rules
+from src.services.scenarios import ScenarioError
 
 ai_bp = Blueprint("ai", __name__)  # mantém as rotas como estavam (sem url_prefix)
 
 
-# =============== Helpers OpenAI (lazy import + compat old/new SDK) ===============
+# ================================ Helpers OpenAI =================================
 
-def _get_openai_client():
+def _chat_complete(messages, max_tokens=500, temperature=0.7, model=None, endpoint=None, cache=True):
     """
-    Tenta SDK novo (openai>=1.x) e depois o antigo (0.28.x).
-    Retorna (client, mode) onde mode ∈ {"new","old"}.
-    Se não houver SDK ou OPENAI_API_KEY, retorna (None, "missing").
+    Chamada de chat pelo gateway do processo (services/ai_gateway.py): cliente
+    com pool de conexões, timeouts por endpoint, retentativas e limite de concorrência.
+    Respostas iguais saem do cache em disco (services/completion_cache.py), salvo
+    cache=False ou endpoint desativado em AI_CACHE_DISABLED_ENDPOINTS. Chamadas
+    idênticas simultâneas (threads e, via cache, outros workers) esperam uma única
+    ida ao upstream (services/single_flight.py).
+    Levanta AIGatewayError (com status_code) em falha ou sem SDK/chave.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return None, "missing"
-
-    # SDK novo
+    model = resolve_model(model)
+    key = completion_key(messages, model, temperature, max_tokens)
+    use_cache = cache and completion_cache.enabled_for(endpoint)
+    if use_cache:
+        cached = completion_cache.get(key, endpoint)
+        if cached is not None:
+            return cached
+
+    def call():
+        text = ai_gateway.chat_complete(messages, max_tokens=max_tokens, temperature=temperature,
+                                        model=model, endpoint=endpoint)
+        if use_cache and text:
+            completion_cache.put(key, text, model, endpoint)
+        return text
+
+    lookup = (lambda: completion_cache.get(key, endpoint)) if use_cache else None
+    return single_flight.do(key, call, lookup=lookup, endpoint=endpoint)
+
+
+def _stream_complete(messages, max_tokens=500, temperature=0.7, model=None, endpoint=None, cache=True):
+    """
+    Versão em stream de _chat_complete: gerador com os trechos do texto conforme
+    chegam. Resposta em cache sai inteira em um único trecho; só respostas
+    completas (cliente não desconectou no meio) entram no cache.
+    """
+    model = resolve_model(model)
+    use_cache = cache and completion_cache.enabled_for(endpoint)
+    if use_cache:
+        key = completion_key(messages, model, temperature, max_tokens)
+        cached = completion_cache.get(key, endpoint)
+        if cached is not None:
+            yield cached
+            return
+
+    upstream = ai_gateway.stream_chat(messages, max_tokens=max_tokens, temperature=temperature,
+                                      model=model, endpoint=endpoint)
+    parts = []
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        return client, "new"
-    except Exception:
-        pass
+        for piece in upstream:
+            parts.append(piece)
+            yield piece
+    finally:
+        upstream.close()
+    if use_cache and parts:
+        completion_cache.put(key, "".join(parts), model, endpoint)
 
-    # SDK antigo
-    try:
-        import openai
-        openai.api_key = api_key
-        return openai, "old"
-    except Exception:
-        return None, "missing"
 
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
-def _chat_complete(messages, max_tokens=500, temperature=0.7, model=None):
+
+def _sse_response(pieces):
     """
-    Faz a chamada de chat compatível com o SDK novo e antigo.
-    - Usa OPENAI_MODEL (se setado) ou "gpt-4o-mini" por padrão no SDK novo.
-    - No SDK antigo, cai para "gpt-3.5-turbo".
-    Levanta RuntimeError se não houver SDK/chave.
+    Resposta text/event-stream: eventos `token` ({"text": trecho}), e no fim `done`
+    ({"text": texto completo}) ou `error` ({"error", "status"}). O primeiro trecho é
+    lido antes de responder, então falhas de abertura (sem chave, ocupado, timeout)
+    ainda saem como status HTTP. Se o cliente desconectar, o servidor fecha o
+    gerador e o stream do upstream é fechado junto.
     """
-    client, mode = _get_openai_client()
-    if client is None:
-        raise RuntimeError("OpenAI SDK not installed or OPENAI_API_KEY missing")
-
-    model = model or os.getenv("OPENAI_MODEL")
-    if mode == "new":
-        model = model or "gpt-4o-mini"
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
-        return resp.choices[0].message.content
-    else:
-        legacy_model = model or "gpt-3.5-turbo"
-        resp = client.ChatCompletion.create(
-            model=legacy_model,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
-        return resp.choices[0].message["content"]
+    try:
+        first = next(pieces)
+    except StopIteration:
+        first = ""
+
+    def events():
+        text = [first]
+        try:
+            if first:
+                yield _sse("token", {"text": first})
+            for piece in pieces:
+                text.append(piece)
+                yield _sse("token", {"text": piece})
+            yield _sse("done", {"text": "".join(text).strip()})
+        except AIGatewayError as e:
+            yield _sse("error", {"error": str(e), "status": e.status_code})
+        finally:
+            pieces.close()
+
+    # X-Accel-Buffering: o nginx repassa cada evento sem acumular
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 def _json_from_ai(text):
@@ -79,257 +121,332 @@ def _json_from_ai(text):
     return json.loads(clean)
 
 
-# ================================ Endpoints =====================================
+# ============================ Prompts (por endpoint) ============================
+#
+# Cada prepare_* valida a entrada (ValueError -> 400), faz as consultas ao banco
+# e devolve um AIJob. As rotas Flask abaixo e o app assíncrono (src/asgi_ai.py)
+# usam as mesmas funções; só muda como o LLM é chamado.
 
-@ai_bp.route("/generate-project-description", methods=["POST"])
-def generate_project_description():
-    """Gera descrição do projeto baseada em materiais e informações do cliente."""
-    try:
-        data = request.get_json() or {}
-        materials = data.get("materials", [])
-        client_info = data.get("client_info", {})
-        project_type = data.get("project_type", "decoração")
+class AIJob:
+    """Prompt pronto para o LLM e a função que monta a resposta do endpoint a partir do texto."""
 
-        if not materials:
-            return jsonify({"error": "Materials list is required"}), 400
+    def __init__(self, endpoint, messages, max_tokens, finalize, temperature=0.7, result=None):
+        self.endpoint = endpoint
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.finalize = finalize
+        self.result = result  # resposta pronta, sem chamar o LLM
 
-        materials_text = [
-            f"- {m.get('name','')} ({m.get('quantity',0)} {m.get('unit','')})"
-            for m in materials
-        ]
-        materials_context = "\n".join(materials_text)
-        client_context = f"Cliente: {client_info['name']}" if client_info.get("name") else ""
 
-        prompt = f"""
-        Você é um especialista em decoração e design de interiores. Crie uma descrição profissional e atrativa para um projeto de decoração baseado nas seguintes informações:
+def prepare_project_description(data):
+    materials = data.get("materials", [])
+    client_info = data.get("client_info", {})
+    project_type = data.get("project_type", "decoração")
 
-        {client_context}
-        Tipo de projeto: {project_type}
+    if not materials:
+        raise ValueError("Materials list is required")
 
-        Materiais utilizados:
-        {materials_context}
+    materials_text = [
+        f"- {m.get('name','')} ({m.get('quantity',0)} {m.get('unit','')})"
+        for m in materials
+    ]
+    materials_context = "\n".join(materials_text)
+    client_context = f"Cliente: {client_info['name']}" if client_info.get("name") else ""
 
-        Crie uma descrição que:
-        1. Seja profissional e atrativa para o cliente
-        2. Destaque os benefícios dos materiais escolhidos
-        3. Mencione o resultado esperado
-        4. Tenha entre 100-200 palavras
-        5. Use linguagem técnica mas acessível
+    prompt = f"""
+    Você é um especialista em decoração e design de interiores. Crie uma descrição profissional e atrativa para um projeto de decoração baseado nas seguintes informações:
 
-        Formato: Parágrafo corrido, sem bullet points.
-        """
-
-        messages = [
-            {"role": "system", "content": "Você é um especialista em decoração e design de interiores."},
-            {"role": "user", "content": prompt},
-        ]
-
-        try:
-            description = _chat_complete(messages, max_tokens=300, temperature=0.7)
-        except RuntimeError as e:
-            return jsonify({"error": str(e)}), 501
+    {client_context}
+    Tipo de projeto: {project_type}
 
-        return jsonify({"description": description.strip(), "success": True})
+    Materiais utilizados:
+    {materials_context}
 
-    except Exception as e:
-        return jsonify({"error": f"Erro ao gerar descrição: {str(e)}"}), 500
+    Crie uma descrição que:
+    1. Seja profissional e atrativa para o cliente
+    2. Destaque os benefícios dos materiais escolhidos
+    3. Mencione o resultado esperado
+    4. Tenha entre 100-200 palavras
+    5. Use linguagem técnica mas acessível
 
+    Formato: Parágrafo corrido, sem bullet points.
+    """
 
-@ai_bp.route("/suggest-materials", methods=["POST"])
-def suggest_materials():
-    """Sugere materiais com base no tipo de projeto e requisitos."""
-    try:
-        data = request.get_json() or {}
-        project_type = data.get("project_type", "")
-        room_type = data.get("room_type", "")
-        budget_range = data.get("budget_range", "")
-        style = data.get("style", "")
-
-        if not project_type:
-            return jsonify({"error": "Project type is required"}), 400
-
-        mats = Material.query.all()
-        materials_list = [{
-            "id": m.id,
-            "name": m.nome,
-            "unit": m.unidade_medida,
-            "price": float(m.custo_unitario_base),
-            "description": m.descricao,
-        } for m in mats]
-
-        materials_context = json.dumps(materials_list, indent=2)
-
-        prompt = f"""
-        Você é um especialista em decoração. Com base nos materiais disponíveis abaixo, sugira os 5 materiais mais adequados para o seguinte projeto:
-
-        Tipo de projeto: {project_type}
-        Tipo de ambiente: {room_type}
-        Faixa de orçamento: {budget_range}
-        Estilo desejado: {style}
-
-        Materiais disponíveis:
-        {materials_context}
-
-        Para cada material sugerido, forneça:
-        1. ID do material
-        2. Nome do material
-        3. Quantidade sugerida (número realista)
-        4. Justificativa da escolha (1-2 frases)
-
-        Responda em formato JSON com a seguinte estrutura:
+    messages = [
+        {"role": "system", "content": "Você é um especialista em decoração e design de interiores."},
+        {"role": "user", "content": prompt},
+    ]
+    return AIJob("generate-project-description", messages, 300,
+                 lambda text: {"description": text.strip(), "success": True})
+
+
+def prepare_material_suggestions(data):
+    project_type = data.get("project_type", "")
+    room_type = data.get("room_type", "")
+    budget_range = data.get("budget_range", "")
+    style = data.get("style", "")
+
+    if not project_type:
+        raise ValueError("Project type is required")
+
+    mats = Material.query.all()
+    materials_list = [{
+        "id": m.id,
+        "name": m.nome,
+        "unit": m.unidade_medida,
+        "price": float(m.custo_unitario_base),
+        "description": m.descricao,
+    } for m in mats]
+
+    materials_context = json.dumps(materials_list, indent=2)
+
+    prompt = f"""
+    Você é um especialista em decoração. Com base nos materiais disponíveis abaixo, sugira os 5 materiais mais adequados para o seguinte projeto:
+
+    Tipo de projeto: {project_type}
+    Tipo de ambiente: {room_type}
+    Faixa de orçamento: {budget_range}
+    Estilo desejado: {style}
+
+    Materiais disponíveis:
+    {materials_context}
+
+    Para cada material sugerido, forneça:
+    1. ID do material
+    2. Nome do material
+    3. Quantidade sugerida (número realista)
+    4. Justificativa da escolha (1-2 frases)
+
+    Responda em formato JSON com a seguinte estrutura:
+    {{
+      "suggestions": [
         {{
-          "suggestions": [
-            {{
-              "material_id": "id_do_material",
-              "material_name": "nome_do_material",
-              "suggested_quantity": numero,
-              "unit": "unidade",
-              "justification": "justificativa"
-            }}
-          ]
+          "material_id": "id_do_material",
+          "material_name": "nome_do_material",
+          "suggested_quantity": numero,
+          "unit": "unidade",
+          "justification": "justificativa"
         }}
-        """
-
-        messages = [
-            {"role": "system", "content": "Você é um especialista em decoração. Responda sempre em JSON válido."},
-            {"role": "user", "content": prompt},
-        ]
+      ]
+    }}
+    """
 
-        try:
-            ai_text = _chat_complete(messages, max_tokens=800, temperature=0.7)
-        except RuntimeError as e:
-            return jsonify({"error": str(e)}), 501
+    messages = [
+        {"role": "system", "content": "Você é um especialista em decoração. Responda sempre em JSON válido."},
+        {"role": "user", "content": prompt},
+    ]
 
+    def finalize(ai_text):
         try:
-            return jsonify(_json_from_ai(ai_text))
+            return _json_from_ai(ai_text)
         except json.JSONDecodeError:
-            return jsonify({
+            return {
                 "suggestions": [],
                 "raw_response": ai_text,
                 "note": "AI response was not in valid JSON format"
-            })
+            }
+
+    return AIJob("suggest-materials", messages, 800, finalize)
+
+
+def prepare_pricing_trends(data):
+    franchisee_id = data.get("franchisee_id")
+    if not franchisee_id:
+        raise ValueError("Franchisee ID is required")
+
+    # Agregados prontos (franchise_stats + série mensal) em vez de todos os projetos
+    stats = franchise_stats.get_stats(db.session, franchisee_id)
+    total_projects = 0
+    if stats is not None:
+        total_projects = sum(getattr(stats, c) for c in franchise_stats.STATUS_COLUMNS.values()) + stats.projetos_outros
+    if not total_projects:
+        return AIJob("analyze-pricing-trends", None, 0, None, result={
+            "analysis": "Não há dados suficientes para análise de tendências. Crie mais projetos para obter insights.",
+            "recommendations": []
+        })
+
+    end = franchise_stats.month_start(None)
+    start = date(end.year - 2, end.month, 1)
+    months = [m for m in franchise_stats.monthly_series(db.session, franchisee_id, start, end) if m["project_count"]]
+    approved = stats.projetos_aprovado
+    decided = approved + stats.projetos_rejeitado
+    recent_projects = sum(m["project_count"] for m in months)
+    key_metrics = {
+        "total_projects": total_projects,
+        "average_margin": (f"{sum(m['average_margin'] * m['project_count'] for m in months) / recent_projects:.2%}"
+                           if recent_projects else "n/d"),  # últimos 24 meses
+        "approval_rate": f"{approved * 100 / decided:.1f}%" if decided else "n/d",
+        "average_ticket": f"R$ {float(stats.receita_aprovada) / approved:.2f}" if approved else "n/d",
+        "approved_revenue": f"R$ {float(stats.receita_aprovada):.2f}",
+    }
+
+    projects_context = json.dumps({"totals": key_metrics, "monthly": months}, indent=2)
+
+    prompt = f"""
+    Você é um analista de negócios especializado em decoração. Analise os dados dos projetos abaixo e forneça insights sobre tendências de precificação:
+
+    Dados agregados dos projetos (totais e série mensal por mês de criação):
+    {projects_context}
+
+    Forneça uma análise que inclua:
+    1. Tendências de preços e margens
+    2. Taxa de aprovação de projetos
+    3. Recomendações para otimização de preços
+    4. Identificação de padrões de sucesso
+
+    Responda em formato JSON:
+    {{
+      "analysis": "análise detalhada em português",
+      "recommendations": ["recomendação 1", "recomendação 2", "recomendação 3"],
+      "key_metrics": {{
+        "average_margin": "margem média",
+        "approval_rate": "taxa de aprovação",
+        "average_ticket": "ticket médio"
+      }}
+    }}
+    """
 
-    except Exception as e:
-        return jsonify({"error": f"Erro ao sugerir materiais: {str(e)}"}), 500
+    messages = [
+        {"role": "system", "content": "Você é um analista de negócios. Responda sempre em JSON válido."},
+        {"role": "user", "content": prompt},
+    ]
 
+    def finalize(ai_text):
+        try:
+            result = _json_from_ai(ai_text)
+        except json.JSONDecodeError:
+            result = {"analysis": ai_text, "recommendations": []}
+        # métricas calculadas localmente valem mais que as "lidas" pelo modelo
+        result["key_metrics"] = key_metrics
+        result["monthly"] = months
+        return result
+
+    return AIJob("analyze-pricing-trends", messages, 1000, finalize)
 
-@ai_bp.route("/analyze-pricing-trends", methods=["POST"])
-def analyze_pricing_trends():
-    """Analisa tendências de precificação e sugere otimizações."""
-    try:
-        data = request.get_json() or {}
-        franchisee_id = data.get("franchisee_id")
-        if not franchisee_id:
-            return jsonify({"error": "Franchisee ID is required"}), 400
-
-        projects = Project.query.filter_by(id_franqueado=franchisee_id).all()
-        if not projects:
-            return jsonify({
-                "analysis": "Não há dados suficientes para análise de tendências. Crie mais projetos para obter insights.",
-                "recommendations": []
-            })
-
-        project_data = [{
-            "status": p.status,
-            "total_cost": float(p.custo_total_estimado),
-            "selling_price": float(p.preco_venda_sugerido),
-            "margin": float(p.margem_lucro_aplicada),
-            "date": p.data_criacao.isoformat()
-        } for p in projects]
-
-        projects_context = json.dumps(project_data, indent=2)
-
-        prompt = f"""
-        Você é um analista de negócios especializado em decoração. Analise os dados dos projetos abaixo e forneça insights sobre tendências de precificação:
-
-        Dados dos projetos:
-        {projects_context}
-
-        Forneça uma análise que inclua:
-        1. Tendências de preços e margens
-        2. Taxa de aprovação de projetos
-        3. Recomendações para otimização de preços
-        4. Identificação de padrões de sucesso
-
-        Responda em formato JSON:
-        {{
-          "analysis": "análise detalhada em português",
-          "recommendations": ["recomendação 1", "recomendação 2", "recomendação 3"],
-          "key_metrics": {{
-            "average_margin": "margem média",
-            "approval_rate": "taxa de aprovação",
-            "average_ticket": "ticket médio"
-          }}
-        }}
-        """
 
-        messages = [
-            {"role": "system", "content": "Você é um analista de negócios. Responda sempre em JSON válido."},
-            {"role": "user", "content": prompt},
-        ]
+def prepare_virtual_assistant(data):
+    user_question = data.get("question", "")
+    context = data.get("context", {})
 
+    if not user_question:
+        raise ValueError("Question is required")
+
+    system_context = """
+    Você é um assistente virtual especializado em decoração e design de interiores. 
+    Ajude com: dúvidas sobre materiais, sugestões de design, orçamento, tendências e manutenção.
+    Seja profissional, prestativo, linguagem acessível. Se não souber, diga e sugira consultar um especialista.
+    """
+
+    prompt = f"""
+    Pergunta do cliente: {user_question}
+
+    Contexto adicional: {json.dumps(context, indent=2) if context else 'Nenhum contexto adicional'}
+
+    Responda de forma clara, profissional e útil.
+    """
+
+    messages = [
+        {"role": "system", "content": system_context},
+        {"role": "user", "content": prompt},
+    ]
+    return AIJob("virtual-assistant", messages, 500,
+                 lambda text: {"response": text.strip(), "success": True})
+
+
+# endpoints atendidos também pelo app assíncrono (src/asgi_ai.py)
+AI_JOBS = {
+    "generate-project-description": (prepare_project_description, "Erro ao gerar descrição"),
+    "suggest-materials": (prepare_material_suggestions, "Erro ao sugerir materiais"),
+    "analyze-pricing-trends": (prepare_pricing_trends, "Erro ao analisar tendências"),
+    "virtual-assistant": (prepare_virtual_assistant, "Erro no assistente virtual"),
+}
+STREAMING_JOBS = ("generate-project-description", "virtual-assistant")
+
+
+def _run_job(name):
+    prepare, error_prefix = AI_JOBS[name]
+    try:
+        data = request.get_json() or {}
         try:
-            ai_text = _chat_complete(messages, max_tokens=1000, temperature=0.7)
-        except RuntimeError as e:
-            return jsonify({"error": str(e)}), 501
+            job = prepare(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if job.messages is None:
+            return jsonify(job.result)
 
         try:
-            return jsonify(_json_from_ai(ai_text))
-        except json.JSONDecodeError:
-            return jsonify({
-                "analysis": ai_text,
-                "recommendations": [],
-                "key_metrics": {}
-            })
+            ai_text = _chat_complete(job.messages, max_tokens=job.max_tokens, temperature=job.temperature,
+                                     endpoint=job.endpoint)
+        except AIGatewayError as e:
+            return jsonify({"error": str(e)}), e.status_code
+
+        return jsonify(job.finalize(ai_text))
 
     except Exception as e:
-        return jsonify({"error": f'Erro ao analisar tendências: {str(e)}'}), 500
+        return jsonify({"error": f"{error_prefix}: {str(e)}"}), 500
 
 
-@ai_bp.route("/virtual-assistant", methods=["POST"])
-def virtual_assistant():
-    """Assistente virtual para dúvidas gerais do cliente."""
+def _stream_job(name):
+    prepare, error_prefix = AI_JOBS[name]
     try:
         data = request.get_json() or {}
-        user_question = data.get("question", "")
-        context = data.get("context", {})
+        try:
+            job = prepare(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        if not user_question:
-            return jsonify({"error": "Question is required"}), 400
+        try:
+            return _sse_response(_stream_complete(job.messages, max_tokens=job.max_tokens,
+                                                  temperature=job.temperature, endpoint=job.endpoint))
+        except AIGatewayError as e:
+            return jsonify({"error": str(e)}), e.status_code
 
-        system_context = """
-        Você é um assistente virtual especializado em decoração e design de interiores. 
-        Ajude com: dúvidas sobre materiais, sugestões de design, orçamento, tendências e manutenção.
-        Seja profissional, prestativo, linguagem acessível. Se não souber, diga e sugira consultar um especialista.
-        """
+    except Exception as e:
+        return jsonify({"error": f"{error_prefix}: {str(e)}"}), 500
 
-        prompt = f"""
-        Pergunta do cliente: {user_question}
 
-        Contexto adicional: {json.dumps(context, indent=2) if context else 'Nenhum contexto adicional'}
+# ================================ Endpoints =====================================
 
-        Responda de forma clara, profissional e útil.
-        """
+@ai_bp.route("/generate-project-description", methods=["POST"])
+def generate_project_description():
+    """Gera descrição do projeto baseada em materiais e informações do cliente."""
+    return _run_job("generate-project-description")
 
-        messages = [
-            {"role": "system", "content": system_context},
-            {"role": "user", "content": prompt},
-        ]
 
-        try:
-            answer = _chat_complete(messages, max_tokens=500, temperature=0.7)
-        except RuntimeError as e:
-            return jsonify({"error": str(e)}), 501
+@ai_bp.route("/generate-project-description/stream", methods=["POST"])
+def generate_project_description_stream():
+    """Mesma descrição de /generate-project-description, enviada por SSE conforme é gerada."""
+    return _stream_job("generate-project-description")
 
-        return jsonify({"response": answer.strip(), "success": True})
 
-    except Exception as e:
-        return jsonify({"error": f"Erro no assistente virtual: {str(e)}"}), 500
+@ai_bp.route("/suggest-materials", methods=["POST"])
+def suggest_materials():
+    """Sugere materiais com base no tipo de projeto e requisitos."""
+    return _run_job("suggest-materials")
+
+
+@ai_bp.route("/analyze-pricing-trends", methods=["POST"])
+def analyze_pricing_trends():
+    """Analisa tendências de precificação e sugere otimizações."""
+    return _run_job("analyze-pricing-trends")
+
+
+@ai_bp.route("/virtual-assistant", methods=["POST"])
+def virtual_assistant():
+    """Assistente virtual para dúvidas gerais do cliente."""
+    return _run_job("virtual-assistant")
+
+
+@ai_bp.route("/virtual-assistant/stream", methods=["POST"])
+def virtual_assistant_stream():
+    """Assistente virtual com a resposta enviada por SSE conforme é gerada."""
+    return _stream_job("virtual-assistant")
 
 
 @ai_bp.route("/optimize-margins", methods=["POST"])
 def optimize_margins():
-    """Sugere otimizações de margem a partir de dados do projeto e mercado."""
+    """Sugere a margem que maximiza o lucro esperado (modelo local; LLM só para o texto, opcional)."""
     try:
         data = request.get_json() or {}
         project_data = data.get("project_data", {})
@@ -338,54 +455,109 @@ def optimize_margins():
         if not project_data:
             return jsonify({"error": "Project data is required"}), 400
 
-        prompt = f"""
-        Você é um consultor de precificação especializado em decoração. 
-        Analise os dados do projeto e sugira otimizações de margem.
-
-        Dados do projeto:
-        {json.dumps(project_data, indent=2)}
-
-        Condições de mercado:
-        {json.dumps(market_conditions, indent=2) if market_conditions else 'Não informado'}
+        franchisee_id = (data.get("franchisee_id") or project_data.get("franchisee_id")
+                         or project_data.get("id_franqueado"))
+        total_cost = project_data.get("total_cost", project_data.get("custo_total_estimado"))
+        project_id = project_data.get("project_id") or project_data.get("id")
+        if project_id and total_cost is None:
+            project = Project.query.get(project_id)
+            if not project:
+                return jsonify({"error": "Project not found"}), 404
+            total_cost = project.custo_total_estimado
+            franchisee_id = franchisee_id or project.id_franqueado
+        if total_cost is None:
+            return jsonify({"error": "Missing required field: total_cost"}), 400
+
+        rules = resolve_pricing_rules(franchisee_id)
+        result = optimize_margin(
+            rules, franchisee_id, total_cost,
+            min_margin=project_data.get("min_margin"), max_margin=project_data.get("max_margin"),
+        )
+        result.update(_margin_narrative(result))
 
-        Responda em JSON:
-        {{
-          "recommended_margin": "decimal",
-          "pricing_strategy": "estratégia",
-          "negotiation_points": ["ponto 1", "ponto 2"],
-          "risks": ["risco 1", "risco 2"],
-          "opportunities": ["op 1", "op 2"]
-        }}
-        """
+        if data.get("include_narrative"):
+            prompt = f"""
+            Você é um consultor de precificação especializado em decoração.
+            Nosso modelo estatístico já calculou a margem recomendada; NÃO altere os números,
+            apenas explique a estratégia.
 
-        messages = [
-            {"role": "system", "content": "Você é um consultor de precificação. Responda sempre em JSON válido."},
-            {"role": "user", "content": prompt},
-        ]
+            Dados do projeto:
+            {json.dumps(project_data, indent=2, default=str)}
 
-        try:
-            ai_text = _chat_complete(messages, max_tokens=800, temperature=0.7)
-        except RuntimeError as e:
-            return jsonify({"error": str(e)}), 501
+            Resultado do modelo:
+            {json.dumps({k: result[k] for k in ("recommended_margin", "selling_price", "approval_probability", "expected_profit")}, indent=2)}
 
-        try:
-            return jsonify(_json_from_ai(ai_text))
-        except json.JSONDecodeError:
-            # fallback mínimo
-            return jsonify({
-                "recommended_margin": 0.30,
-                "pricing_strategy": ai_text,
-                "negotiation_points": [],
-                "risks": [],
-                "opportunities": []
-            })
+            Condições de mercado:
+            {json.dumps(market_conditions, indent=2) if market_conditions else 'Não informado'}
 
+            Responda em JSON:
+            {{
+              "pricing_strategy": "estratégia",
+              "negotiation_points": ["ponto 1", "ponto 2"],
+              "risks": ["risco 1", "risco 2"],
+              "opportunities": ["op 1", "op 2"]
+            }}
+            """
+            messages = [
+                {"role": "system", "content": "Você é um consultor de precificação. Responda sempre em JSON válido."},
+                {"role": "user", "content": prompt},
+            ]
+            try:
+                narrative = _json_from_ai(_chat_complete(messages, max_tokens=800, temperature=0.7, endpoint="optimize-margins"))
+                result.update({k: narrative[k] for k in ("pricing_strategy", "negotiation_points", "risks", "opportunities")
+                               if k in narrative})
+            except AIGatewayError as e:
+                result["narrative_error"] = str(e)
+            except (json.JSONDecodeError, TypeError):
+                result["narrative_error"] = "Invalid AI response"
+
+        return jsonify(result)
+
+    except ScenarioError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Erro ao otimizar margens: {str(e)}"}), 500
 
 
+def _margin_narrative(result):
+    """Texto padrão (sem LLM) a partir do resultado do otimizador."""
+    margin_pct = f"{result['recommended_margin'] * 100:.1f}%"
+    if result["method"] != "logistic":
+        return {
+            "pricing_strategy": f"Histórico insuficiente de projetos aprovados/rejeitados; usando a margem padrão de {margin_pct}.",
+            "negotiation_points": [],
+            "risks": ["Recomendação sem base estatística: registre o resultado (aprovado/rejeitado) dos projetos."],
+            "opportunities": [],
+        }
+    probability_pct = f"{result['approval_probability'] * 100:.0f}%"
+    risks = []
+    if not result["model"]["margin_sensitive"]:
+        risks.append("O histórico não mostra queda de aprovação com margens maiores; a recomendação tende ao teto da faixa.")
+    if result["model"]["scope"] == "global":
+        risks.append("Poucos projetos decididos nesta franquia; modelo ajustado com dados de todas as franquias.")
+    return {
+        "pricing_strategy": (f"Margem de {margin_pct} maximiza o lucro esperado "
+                             f"(probabilidade estimada de aprovação: {probability_pct})."),
+        "negotiation_points": [f"Preço sugerido: R$ {result['selling_price']:.2f}"],
+        "risks": risks,
+        "opportunities": [],
+    }
+
+
+@ai_bp.get("/margin-model/stats")
+def margin_model_stats():
+    """Estatísticas do cache de modelos de margem deste worker."""
+    return jsonify(model_cache.stats())
+
+
+@ai_bp.get("/completion-cache/stats")
+def completion_cache_stats():
+    """Contadores do cache de respostas do LLM (todos os workers da máquina)."""
+    return jsonify(completion_cache.stats())
+
+
 @ai_bp.get("/ai/health")
 def ai_health():
-    """Verifica se a chave está presente (não testa conexão)."""
+    """Verifica se a chave está presente (não testa conexão) e mostra os contadores do gateway e da coalescência."""
     has_key = bool(os.getenv("OPENAI_API_KEY"))
-    return jsonify({"openai_key": has_key})
\ No newline at end of file
+    return jsonify({"openai_key": has_key, "gateway": ai_gateway.stats(), "single_flight": single_flight.stats()})
\ No newline at end of file
@@ -5,9 +5,18 @@ from src.models.project import Project, ProjectItem
 from src.models.material import Material
 from src.models.difficulty import DifficultyFactor
 from decimal import Decimal
+from datetime import date, datetime
+import click
+from sqlalchemy.orm import joinedload
+from src.services import client_import, client_search, franchise_stats, project_status
+from src.services.response_cache import cached_response
+from src.services.pagination import PaginationError, paginate, parse_limit, wants_page
 
 crm_bp = Blueprint('crm', __name__)
 
+PROJECT_STATUSES = ['Rascunho', 'Enviado', 'Aprovado', 'Rejeitado']
+CENTS = Decimal('0.01')
+
 # Client Management Routes
 @crm_bp.route('/clients', methods=['GET'])
 def get_clients():
@@ -17,12 +26,21 @@ def get_clients():
         # For now, we'll use a query parameter or get all clients
         franchisee_id = request.args.get('franchisee_id')
         
+        query = Client.query
         if franchisee_id:
-            clients = Client.query.filter_by(id_franqueado=franchisee_id).all()
-        else:
-            clients = Client.query.all()
+            query = query.filter_by(id_franqueado=franchisee_id)
+        
+        if wants_page(request.args):
+            clients, next_cursor = paginate(
+                query, Client.data_cadastro, Client.id,
+                parse_limit(request.args.get('limit')), request.args.get('cursor'),
+            )
+            return jsonify({'items': [client.to_dict() for client in clients], 'next_cursor': next_cursor})
         
+        clients = query.all()
         return jsonify([client.to_dict() for client in clients])
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -47,6 +65,7 @@ def create_client():
         )
         
         db.session.add(client)
+        franchise_stats.record_client(db.session, client.id_franqueado, 1)
         db.session.commit()
         
         return jsonify({
@@ -58,6 +77,58 @@ def create_client():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@crm_bp.route('/clients/import', methods=['POST'])
+def import_clients():
+    """Import clients from a CSV upload (multipart 'file' or raw text/csv body), in batches"""
+    try:
+        franchisee_id = request.args.get('franchisee_id') or request.form.get('franchisee_id')
+        if not franchisee_id:
+            return jsonify({'error': 'franchisee_id is required'}), 400
+        batch_size = client_import.parse_batch_size(
+            request.args.get('batch_size') or request.form.get('batch_size')
+        )
+        
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({'error': "Missing file field 'file'"}), 400
+            stream = upload.stream
+        else:
+            stream = request.stream
+        
+        report = client_import.import_clients(db.session, franchisee_id, stream, batch_size)
+        return jsonify(report.to_dict())
+        
+    except client_import.ClientImportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        partial = e.report.to_dict() if hasattr(e, 'report') else None
+        return jsonify({'error': str(e), 'partial': partial}), 500
+
+@crm_bp.route('/clients/search', methods=['GET'])
+def search_clients():
+    """Fuzzy, accent-insensitive client search (nome/email/telefone) for a franchisee"""
+    try:
+        franchisee_id = request.args.get('franchisee_id')
+        if not franchisee_id:
+            return jsonify({'error': 'franchisee_id is required'}), 400
+        
+        backend, results = client_search.search_clients(
+            db.session, franchisee_id, request.args.get('q', ''),
+            client_search.parse_search_limit(request.args.get('limit')),
+        )
+        items = []
+        for client, score in results:
+            client_data = client.to_dict()
+            client_data['score'] = round(score, 4) if score is not None else None
+            items.append(client_data)
+        return jsonify({'items': items, 'backend': backend})
+    except client_search.SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @crm_bp.route('/clients/<client_id>', methods=['GET'])
 def get_client(client_id):
     """Get a specific client"""
@@ -115,6 +186,7 @@ def delete_client(client_id):
             return jsonify({'error': 'Cannot delete client with existing projects'}), 400
         
         db.session.delete(client)
+        franchise_stats.record_client(db.session, client.id_franqueado, -1)
         db.session.commit()
         
         return jsonify({'message': 'Client deleted successfully'})
@@ -131,25 +203,36 @@ def get_projects():
         franchisee_id = request.args.get('franchisee_id')
         client_id = request.args.get('client_id')
         
-        query = Project.query
+        # Cliente carregado no mesmo SELECT (LEFT OUTER JOIN): 1 query para qualquer quantidade de projetos
+        query = Project.query.options(joinedload(Project.client))
         
         if franchisee_id:
             query = query.filter_by(id_franqueado=franchisee_id)
         if client_id:
             query = query.filter_by(id_cliente=client_id)
         
-        projects = query.all()
+        next_cursor = None
+        if wants_page(request.args):
+            projects, next_cursor = paginate(
+                query, Project.data_criacao, Project.id,
+                parse_limit(request.args.get('limit')), request.args.get('cursor'),
+            )
+        else:
+            projects = query.all()
         
         # Include client information in the response
         result = []
         for project in projects:
             project_data = project.to_dict()
-            client = Client.query.get(project.id_cliente)
-            if client:
-                project_data['client'] = client.to_dict()
+            if project.client:
+                project_data['client'] = project.client.to_dict()
             result.append(project_data)
         
+        if wants_page(request.args):
+            return jsonify({'items': result, 'next_cursor': next_cursor})
         return jsonify(result)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -167,6 +250,45 @@ def get_project_items(project_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@crm_bp.route('/projects/status', methods=['PUT'])
+def update_projects_status():
+    """Update the status of many projects (ids or a filter) with a single UPDATE"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'status' not in data:
+            return jsonify({'error': 'Status is required'}), 400
+        
+        if data['status'] not in PROJECT_STATUSES:
+            return jsonify({'error': f'Invalid status. Must be one of: {PROJECT_STATUSES}'}), 400
+        
+        filters = data.get('filter') or {}
+        if not isinstance(filters, dict):
+            return jsonify({'error': "'filter' must be an object"}), 400
+        if filters.get('status') and filters['status'] not in PROJECT_STATUSES:
+            return jsonify({'error': f'Invalid filter status. Must be one of: {PROJECT_STATUSES}'}), 400
+        
+        results = project_status.bulk_update_status(
+            db.session,
+            data['status'],
+            ids=data.get('ids'),
+            franchise_id=filters.get('franchisee_id') or data.get('franchisee_id'),
+            current_status=filters.get('status'),
+            client_id=filters.get('client_id'),
+        )
+        db.session.commit()
+        
+        summary = {outcome: 0 for outcome in ('updated', 'unchanged', 'not_found')}
+        for result in results:
+            summary[result['outcome']] += 1
+        return jsonify(dict(summary, status=data['status'], results=results))
+        
+    except project_status.BulkStatusError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @crm_bp.route('/projects/<project_id>/status', methods=['PUT'])
 def update_project_status(project_id):
     """Update project status"""
@@ -179,10 +301,10 @@ def update_project_status(project_id):
         if 'status' not in data:
             return jsonify({'error': 'Status is required'}), 400
         
-        valid_statuses = ['Rascunho', 'Enviado', 'Aprovado', 'Rejeitado']
-        if data['status'] not in valid_statuses:
-            return jsonify({'error': f'Invalid status. Must be one of: {valid_statuses}'}), 400
+        if data['status'] not in PROJECT_STATUSES:
+            return jsonify({'error': f'Invalid status. Must be one of: {PROJECT_STATUSES}'}), 400
         
+        franchise_stats.record_status_change(db.session, project, data['status'])
         project.status = data['status']
         db.session.commit()
         
@@ -208,6 +330,7 @@ def delete_project(project_id):
         
         # Delete the project
         db.session.delete(project)
+        franchise_stats.record_project(db.session, project, -1)
         db.session.commit()
         
         return jsonify({'message': 'Project deleted successfully'})
@@ -216,7 +339,27 @@ def delete_project(project_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def dashboard_payload(total_clients, counts_by_status, revenue_by_status):
+    """Monta a resposta do dashboard (inclui os indicadores que o Dashboard.jsx exibe)."""
+    projects_by_status = {status: int(counts_by_status.get(status, 0)) for status in PROJECT_STATUSES}
+    revenue = {status: Decimal(revenue_by_status.get(status) or 0).quantize(CENTS) for status in PROJECT_STATUSES}
+    total_projects = sum(int(c) for c in counts_by_status.values())
+    approved = projects_by_status['Aprovado']
+    total_revenue = revenue['Aprovado']
+    return {
+        'total_clients': int(total_clients),
+        'total_projects': total_projects,
+        'projects_by_status': projects_by_status,
+        'revenue_by_status': {status: float(value) for status, value in revenue.items()},
+        'total_revenue': float(total_revenue),
+        'approved_projects_count': approved,
+        'approval_rate': round(approved * 100 / total_projects, 1) if total_projects else 0.0,
+        'average_ticket': float((total_revenue / approved).quantize(CENTS)) if approved else 0.0,
+        'projects_per_client': round(total_projects / total_clients, 1) if total_clients else 0.0,
+    }
+
 @crm_bp.route('/dashboard/stats', methods=['GET'])
+@cached_response('dashboard_stats', tables=('franchise_stats',), franchise_arg='franchisee_id')
 def get_dashboard_stats():
     """Get dashboard statistics for a franchisee"""
     try:
@@ -225,33 +368,80 @@ def get_dashboard_stats():
         if not franchisee_id:
             return jsonify({'error': 'franchisee_id is required'}), 400
         
-        # Get statistics
-        total_clients = Client.query.filter_by(id_franqueado=franchisee_id).count()
-        total_projects = Project.query.filter_by(id_franqueado=franchisee_id).count()
+        # Contadores mantidos pelas rotas de escrita: uma leitura pela chave primária
+        stats = franchise_stats.get_stats(db.session, franchisee_id)
+        if stats is None:
+            return jsonify(dashboard_payload(0, {}, {}))
         
-        # Projects by status
-        projects_by_status = {}
-        statuses = ['Rascunho', 'Enviado', 'Aprovado', 'Rejeitado']
-        for status in statuses:
-            count = Project.query.filter_by(id_franqueado=franchisee_id, status=status).count()
-            projects_by_status[status] = count
+        counts = {status: getattr(stats, column) for status, column in franchise_stats.STATUS_COLUMNS.items()}
+        counts['outros'] = stats.projetos_outros
+        revenue = {status: getattr(stats, column) for status, column in franchise_stats.REVENUE_COLUMNS.items()}
+        return jsonify(dashboard_payload(stats.total_clientes, counts, revenue))
         
-        # Total revenue from approved projects
-        approved_projects = Project.query.filter_by(
-            id_franqueado=franchisee_id, 
-            status='Aprovado'
-        ).all()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+MAX_TIMESERIES_MONTHS = 120
+
+def parse_month(value, field_name):
+    try:
+        parsed = datetime.strptime(value, '%Y-%m')
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid month for '{field_name}' (expected YYYY-MM): {value!r}")
+    return date(parsed.year, parsed.month, 1)
+
+@crm_bp.route('/dashboard/timeseries', methods=['GET'])
+@cached_response('dashboard_timeseries', tables=('franchise_monthly_stats',), franchise_arg='franchisee_id')
+def get_dashboard_timeseries():
+    """Get monthly project/revenue/approval series for a franchisee (start/end as YYYY-MM)"""
+    try:
+        franchisee_id = request.args.get('franchisee_id')
+        if not franchisee_id:
+            return jsonify({'error': 'franchisee_id is required'}), 400
         
-        total_revenue = sum(float(project.preco_venda_sugerido) for project in approved_projects)
+        end = parse_month(request.args['end'], 'end') if request.args.get('end') else franchise_stats.month_start(None)
+        if request.args.get('start'):
+            start = parse_month(request.args['start'], 'start')
+        else:
+            start = date(end.year - 1, end.month, 1)  # últimos 12 meses + o atual
+        if start > end:
+            return jsonify({'error': "'start' must not be after 'end'"}), 400
+        if (end.year - start.year) * 12 + end.month - start.month >= MAX_TIMESERIES_MONTHS:
+            return jsonify({'error': f'Range too large (max {MAX_TIMESERIES_MONTHS} months)'}), 400
         
         return jsonify({
-            'total_clients': total_clients,
-            'total_projects': total_projects,
-            'projects_by_status': projects_by_status,
-            'total_revenue': total_revenue,
-            'approved_projects_count': len(approved_projects)
+            'franchisee_id': franchisee_id,
+            'start': start.strftime('%Y-%m'),
+            'end': end.strftime('%Y-%m'),
+            'months': franchise_stats.monthly_series(db.session, franchisee_id, start, end),
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@crm_bp.cli.command('backfill-monthly-stats')
+@click.option('--franchisee-id', default=None, help='Só esta franquia (padrão: todas).')
+@click.option('--batch-months', default=12, show_default=True, help='Meses por transação.')
+def backfill_monthly_stats_command(franchisee_id, batch_months):
+    """Recalcula franchise_monthly_stats a partir de projects em lotes (flask crm backfill-monthly-stats)."""
+    windows, rows = franchise_stats.backfill_monthly(db.session, franchisee_id, batch_months=batch_months)
+    click.echo(f"franchise_monthly_stats: {rows} linha(s) em {windows} lote(s)")
+
+@crm_bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Repovoa os índices FTS5 de clientes no SQLite (flask crm rebuild-search-index)."""
+    if client_search.search_backend(db.session) != 'fts5':
+        click.echo('Nada a fazer: o índice FTS5 só existe no SQLite (migração 0011)')
+        return
+    count = client_search.rebuild_sqlite_index(db.session)
+    db.session.commit()
+    click.echo(f'clients_fts: {count} cliente(s) indexado(s)')
+
+@crm_bp.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recalcula a tabela franchise_stats a partir de clients/projects (flask crm reconcile-stats)."""
+    count = franchise_stats.reconcile(db.session)
+    db.session.commit()
+    click.echo(f"franchise_stats recalculada para {count} franquia(s)")
@@ -1,51 +1,105 @@
 from flask import Blueprint, request, jsonify
-from decimal import Decimal, InvalidOperation
-from pathlib import Path
-import json
+import click
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from sqlalchemy import insert
+from datetime import datetime
+import uuid
 
 from src.models.user import db
 from src.models.material import Material
 from src.models.difficulty import DifficultyFactor
 from src.models.project import Project, ProjectItem
 from src.models.client import Client
+from src.models.pricing_rule import PricingRuleSet, PricingEmployeeRate, PricingDifficultyRule
+from src.services.pricing_rules import PricingRules, reload_pricing_rules, PricingRulesError
+from src.services.rule_sets import resolve_pricing_rules, bump_rules_version, invalidate_local_snapshot
+from src.services.pricing_engine import get_engine, cents_to_decimal, to_units
+from src.services import scenarios, risk, repricing, material_import
+from src.services.query_stats import QueryCounter
+from src.services import franchise_stats
+from src.services.response_cache import cached_response
+from src.services.quote_cache import quote_cache, difficulty_version, material_version
 
 pricing_bp = Blueprint("pricing", __name__)  # mantém sem url_prefix para não quebrar quem registra
 
 
 # ---------- Utilidades ----------
 
-DATA_PATH = (Path(__file__).resolve().parents[1] / "extracted_pricing_data.json")
-
-def load_pricing_data():
-    """
-    Carrega o JSON de regras a partir de src/extracted_pricing_data.json.
-    Não levanta exceção para não derrubar o servidor; retorna dict com 'error' em caso de problema.
-    """
-    try:
-        with DATA_PATH.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"error": f"file not found: {DATA_PATH.name}", "rules": []}
-    except json.JSONDecodeError as e:
-        return {"error": f"invalid JSON in {DATA_PATH.name}: {e}", "rules": []}
-    except Exception as e:
-        return {"error": f"failed to load {DATA_PATH.name}: {e}", "rules": []}
-
 def to_decimal(value, field_name):
     try:
         return Decimal(str(value))
     except (InvalidOperation, TypeError, ValueError):
         raise ValueError(f"Invalid decimal value for '{field_name}': {value!r}")
 
+STORED_SCALE = Decimal("0.01")  # project_items.quantidade e projects.margem_lucro_aplicada têm 2 casas
+
+def to_stored_decimal(value, field_name):
+    """Valor na escala da coluna, para a cotação usar o mesmo valor que é gravado (e recalculado)."""
+    number = to_decimal(value, field_name)
+    if not number.is_finite():
+        raise ValueError(f"Invalid decimal value for '{field_name}': {value!r}")
+    return number.quantize(STORED_SCALE, rounding=ROUND_HALF_UP)
+
 def require_fields(payload, fields):
     for f in fields:
         if f not in payload:
             raise KeyError(f"Missing required field: {f}")
 
+ITEM_FIELDS = ["material_id", "quantity", "difficulty_id", "employee_level", "estimated_days", "num_envelopers"]
+MAX_BATCH_ITEMS = 1000
+
+def price_item(engine, material, difficulty_level, item, margin=None):
+    """
+    Precifica um item já validado (material e nível de dificuldade existentes)
+    com o motor compilado das regras em uso. Retorna um Quote (valores em centavos);
+    levanta PricingError (ValueError) para nível de funcionário ou números inválidos.
+    """
+    return engine.quote(
+        difficulty_level,
+        item["employee_level"],
+        material.custo_unitario_base,
+        item["quantity"],
+        item["estimated_days"],
+        item["num_envelopers"],
+        margin,
+    )
+
+def item_inputs(item):
+    return {
+        "quantity": float(to_decimal(item["quantity"], "quantity")),
+        "estimated_days": float(to_decimal(item["estimated_days"], "estimated_days")),
+        "num_envelopers": float(to_decimal(item["num_envelopers"], "num_envelopers")),
+    }
+
+def reference_id(item, field_name):
+    """Id de material/dificuldade de um item: os ids são strings (UUID)."""
+    value = item[field_name]
+    if not isinstance(value, str):
+        raise ValueError(f"'{field_name}' must be a string")
+    return value
+
+def prefetch_reference_data(items):
+    """
+    Carrega todos os materiais e fatores de dificuldade referenciados pelos itens
+    com uma query IN por tabela. Retorna (materials_by_id, difficulties_by_id).
+    Ids que não são string ficam de fora; `reference_id` rejeita o item depois.
+    """
+    material_ids = {i["material_id"] for i in items if isinstance(i, dict) and isinstance(i.get("material_id"), str)}
+    difficulty_ids = {i["difficulty_id"] for i in items
+                      if isinstance(i, dict) and isinstance(i.get("difficulty_id"), str)}
+    materials = {}
+    difficulties = {}
+    if material_ids:
+        materials = {m.id: m for m in Material.query.filter(Material.id.in_(material_ids)).all()}
+    if difficulty_ids:
+        difficulties = {d.id: d for d in DifficultyFactor.query.filter(DifficultyFactor.id.in_(difficulty_ids)).all()}
+    return materials, difficulties
+
 
 # ---------- Endpoints ----------
 
 @pricing_bp.route("/materials", methods=["GET"])
+@cached_response("materials", tables=("materials",))
 def get_materials():
     """Get all available materials"""
     try:
@@ -55,7 +109,41 @@ def get_materials():
         return jsonify({"error": str(e)}), 500
 
 
+def is_truthy(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+@pricing_bp.route("/materials/import", methods=["POST"])
+def import_materials():
+    """Import a supplier price sheet (CSV) into materials in one transaction and report the cost changes"""
+    try:
+        reprice = is_truthy(request.args.get("reprice") or request.form.get("reprice"))
+        dry_run = is_truthy(request.args.get("dry_run") or request.form.get("dry_run"))
+        if request.mimetype == "multipart/form-data":
+            upload = request.files.get("file")
+            if upload is None:
+                return jsonify({"error": "Missing file field 'file'"}), 400
+            stream = upload.stream
+        else:
+            stream = request.stream
+
+        report = material_import.import_price_sheet(
+            db.session,
+            stream,
+            resolve_rules=resolve_pricing_rules if reprice else None,
+            dry_run=dry_run,
+        )
+        return jsonify(report)
+
+    except material_import.MaterialImportError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
 @pricing_bp.route("/difficulty-factors", methods=["GET"])
+@cached_response("difficulty_factors", tables=("difficulty_factors",))
 def get_difficulty_factors():
     """Get all difficulty factors"""
     try:
@@ -65,72 +153,162 @@ def get_difficulty_factors():
         return jsonify({"error": str(e)}), 500
 
 
+@pricing_bp.route("/pricing-rules", methods=["GET"])
+def get_pricing_rules_info():
+    """Get the pricing rules snapshot this worker uses (optionally for a franchisee)"""
+    try:
+        return jsonify(resolve_pricing_rules(request.args.get("franchisee_id")).to_dict())
+    except PricingRulesError as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@pricing_bp.route("/pricing-rules/reload", methods=["POST"])
+def reload_rules():
+    """Force this worker to re-read the pricing rules file"""
+    try:
+        return jsonify(reload_pricing_rules().to_dict())
+    except PricingRulesError as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def parse_datetime(value, field_name):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid datetime for '{field_name}': {value!r}")
+
+def create_rule_set(data):
+    """Valida (mesmo formato do JSON) e adiciona um PricingRuleSet na sessão; incrementa a versão."""
+    rules = PricingRules(data, "new")
+    rule_set = PricingRuleSet(
+        nome=data.get("nome") or "Regras",
+        id_franqueado=data.get("id_franqueado") or None,
+        vigente_desde=parse_datetime(data["vigente_desde"], "vigente_desde") if data.get("vigente_desde") else datetime.utcnow(),
+        vigente_ate=parse_datetime(data["vigente_ate"], "vigente_ate") if data.get("vigente_ate") else None,
+        margem_min=rules.margin_ranges["min"],
+        margem_padrao=rules.margin_ranges.get("default"),
+        margem_max=rules.margin_ranges.get("max"),
+    )
+    if rule_set.vigente_ate is not None and rule_set.vigente_ate <= rule_set.vigente_desde:
+        raise ValueError("'vigente_ate' must be after 'vigente_desde'")
+    rule_set.employee_rates = [
+        PricingEmployeeRate(nivel_funcionario=level, taxa_diaria=rate)
+        for level, rate in rules.employee_rates.items()
+    ]
+    rule_set.difficulty_rules = [
+        PricingDifficultyRule(nivel=level, multiplicador_material=f["material_multiplier"], taxa_imposto=f["tax_rate"])
+        for level, f in rules.difficulty_factors.items()
+    ]
+    db.session.add(rule_set)
+    bump_rules_version(db.session)
+    return rule_set
+
+
+@pricing_bp.route("/pricing-rules/sets", methods=["GET"])
+def list_rule_sets():
+    """List stored pricing rule sets (optionally for one franchisee)"""
+    try:
+        query = PricingRuleSet.query
+        franchisee_id = request.args.get("franchisee_id")
+        if franchisee_id:
+            query = query.filter(PricingRuleSet.id_franqueado == franchisee_id)
+        rule_sets = query.order_by(PricingRuleSet.vigente_desde.desc()).all()
+        return jsonify([r.to_dict() for r in rule_sets])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@pricing_bp.route("/pricing-rules/sets", methods=["POST"])
+def create_rule_set_endpoint():
+    """Store a new (global or per-franchisee) effective-dated pricing rule set"""
+    try:
+        data = request.get_json(force=True, silent=False) or {}
+        rule_set = create_rule_set(data)
+        db.session.commit()
+        invalidate_local_snapshot()
+        return jsonify({"rule_set": rule_set.to_dict(), "message": "Pricing rule set created successfully"}), 201
+
+    except (PricingRulesError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@pricing_bp.route("/pricing-rules/sets/<rule_set_id>", methods=["DELETE"])
+def delete_rule_set(rule_set_id):
+    """Delete a pricing rule set"""
+    try:
+        rule_set = PricingRuleSet.query.get(rule_set_id)
+        if not rule_set:
+            return jsonify({"error": "Pricing rule set not found"}), 404
+        db.session.delete(rule_set)
+        bump_rules_version(db.session)
+        db.session.commit()
+        invalidate_local_snapshot()
+        return jsonify({"message": "Pricing rule set deleted successfully"})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
 @pricing_bp.route("/calculate-price", methods=["POST"])
 def calculate_price():
     """Calculate price for a single item"""
     try:
         data = request.get_json(force=True, silent=False) or {}
-        require_fields(data, ["material_id", "quantity", "difficulty_id", "employee_level", "estimated_days", "num_envelopers"])
+        require_fields(data, ITEM_FIELDS)
 
-        # Carrega regras
-        rules = load_pricing_data()
-        if "error" in rules:
-            return jsonify({"error": rules["error"]}), 500
+        # Regras em memória (snapshot por worker; regras da franquia quando houver)
+        try:
+            rules = resolve_pricing_rules(data.get("franchisee_id"))
+        except PricingRulesError as e:
+            return jsonify({"error": str(e)}), 500
 
-        material = Material.query.get(data["material_id"])
+        material = Material.query.get(reference_id(data, "material_id"))
         if not material:
             return jsonify({"error": "Material not found"}), 404
 
-        difficulty_factor_obj = DifficultyFactor.query.get(data["difficulty_id"])
+        difficulty_factor_obj = DifficultyFactor.query.get(reference_id(data, "difficulty_id"))
         if not difficulty_factor_obj:
             return jsonify({"error": "Difficulty factor not found"}), 404
 
         employee_level = data["employee_level"]
-        employee_rates = rules.get("employee_rates", {})
-        if employee_level not in employee_rates:
+        if employee_level not in rules.employee_rates:
             return jsonify({"error": "Invalid employee level"}), 400
 
         # Difficulty data por nível
-        diff_all = rules.get("difficulty_factors", {})
-        difficulty_data = diff_all.get(difficulty_factor_obj.nivel)
-        if not difficulty_data:
+        if difficulty_factor_obj.nivel not in rules.difficulty_factors:
             return jsonify({"error": "Difficulty data not found for selected level"}), 400
 
-        # Conversões seguras
-        quantity = to_decimal(data["quantity"], "quantity")
-        estimated_days = to_decimal(data["estimated_days"], "estimated_days")
-        num_envelopers = to_decimal(data["num_envelopers"], "num_envelopers")
-
-        material_multiplier = to_decimal(difficulty_data.get("material_multiplier", "1"), "material_multiplier")
-        tax_rate = to_decimal(difficulty_data.get("tax_rate", "0"), "tax_rate")
-
-        # Custos
-        material_cost = quantity * Decimal(str(material.custo_unitario_base)) * material_multiplier
-        daily_rate = to_decimal(employee_rates[employee_level], "employee_rates[employee_level]")
-        labor_cost = daily_rate * estimated_days * num_envelopers
-        total_cost_before_tax = material_cost + labor_cost
-        total_cost = total_cost_before_tax * (Decimal("1") + tax_rate)
-
-        # Margem
-        margin_ranges = rules.get("margin_ranges", {})
-        margin = to_decimal(margin_ranges.get("min", "0"), "margin_ranges.min")
-        selling_price = total_cost * (Decimal("1") + margin)
-
-        result = {
-            "material_cost": float(material_cost),
-            "labor_cost": float(labor_cost),
-            "total_cost_before_tax": float(total_cost_before_tax),
-            "tax_rate_applied": float(tax_rate),
-            "total_cost": float(total_cost),
-            "margin_applied": float(margin),
-            "selling_price": float(selling_price),
+        cache_key = quote_cache.make_key(
+            material.id,
+            material_version(material),
+            difficulty_version(difficulty_factor_obj),
+            employee_level,
+            to_units(data["estimated_days"], "estimated_days"),
+            to_units(data["num_envelopers"], "num_envelopers"),
+            to_units(data["quantity"], "quantity"),
+            rules.version,
+        )
+        cached = quote_cache.get(cache_key)
+        if cached is not None:
+            return jsonify(dict(cached, cache_hit=True))
+
+        quote = price_item(get_engine(rules), material, difficulty_factor_obj.nivel, data)
+
+        result = quote.to_dict()
+        result.update(item_inputs(data))
+        result.update({
             "material": material.to_dict(),
             "difficulty": difficulty_factor_obj.to_dict(),
             "employee_level": employee_level,
-            "estimated_days": float(estimated_days),
-            "num_envelopers": float(num_envelopers),
-        }
-        return jsonify(result)
+            "rules_version": rules.version,
+        })
+        quote_cache.put(cache_key, result)
+        return jsonify(dict(result, cache_hit=False))
 
     except KeyError as e:
         return jsonify({"error": str(e)}), 400
@@ -141,87 +319,299 @@ def calculate_price():
         return jsonify({"error": str(e)}), 500
 
 
-@pricing_bp.route("/projects", methods=["POST"])
-def create_project():
-    """Create a new project with items"""
+@pricing_bp.route("/calculate-price/cache-stats", methods=["GET"])
+def quote_cache_stats():
+    """Hit/miss counters of this worker's quote cache"""
+    return jsonify(quote_cache.stats())
+
+
+@pricing_bp.route("/calculate-price/batch", methods=["POST"])
+def calculate_price_batch():
+    """Calculate prices for many items in one request (one IN query per reference table)"""
     try:
         payload = request.get_json(force=True, silent=False) or {}
-        require_fields(payload, ["nome_projeto", "id_cliente", "id_franqueado", "items"])
+        require_fields(payload, ["items"])
+        items = payload["items"]
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'items' must be a non-empty list"}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({"error": f"Too many items (max {MAX_BATCH_ITEMS})"}), 400
+
+        try:
+            rules = resolve_pricing_rules(payload.get("franchisee_id"))
+        except PricingRulesError as e:
+            return jsonify({"error": str(e)}), 500
+
+        engine = get_engine(rules)
+        margin = rules.margin_ranges["min"]
+        if "margem_lucro" in payload:
+            margin = to_decimal(payload["margem_lucro"], "margem_lucro")
+
+        materials, difficulties = prefetch_reference_data(items)
+
+        totals = dict.fromkeys(["material_cost", "labor_cost", "total_cost_before_tax", "total_cost", "selling_price"], 0)
+        results = []
+        errors = 0
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("Item must be an object")
+                require_fields(item, ITEM_FIELDS)
+                material = materials.get(reference_id(item, "material_id"))
+                if not material:
+                    raise LookupError(f"Material not found: {item['material_id']}")
+                difficulty_factor_obj = difficulties.get(reference_id(item, "difficulty_id"))
+                if not difficulty_factor_obj:
+                    raise LookupError(f"Difficulty factor not found: {item['difficulty_id']}")
+
+                quote = price_item(engine, material, difficulty_factor_obj.nivel, item, margin)
+                inputs = item_inputs(item)
+            except (KeyError, LookupError, ValueError) as e:
+                errors += 1
+                results.append({"index": index, "error": e.args[0] if e.args else str(e)})
+                continue
+
+            for key in totals:
+                totals[key] += getattr(quote, key)
+            result = quote.to_dict()
+            result.update(inputs)
+            result.update({
+                "index": index,
+                "material_id": material.id,
+                "difficulty_id": difficulty_factor_obj.id,
+                "employee_level": item["employee_level"],
+            })
+            results.append(result)
+
+        return jsonify({
+            "items": results,
+            "totals": {k: v / 100 for k, v in totals.items()},
+            "item_count": len(items) - errors,
+            "error_count": errors,
+            "margin_applied": float(margin),
+            "rules_version": rules.version,
+        })
 
-        rules = load_pricing_data()
-        if "error" in rules:
-            return jsonify({"error": rules["error"]}), 500
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-        margin_default = to_decimal(rules.get("margin_ranges", {}).get("min", "0"), "margin_ranges.min")
 
-        project = Project(
-            nome_projeto=payload["nome_projeto"],
-            id_cliente=payload["id_cliente"],
-            id_franqueado=payload["id_franqueado"],
-            margem_lucro_aplicada=to_decimal(payload.get("margem_lucro", margin_default), "margem_lucro")
+@pricing_bp.route("/calculate-price/scenarios", methods=["POST"])
+def calculate_price_scenarios():
+    """Evaluate a what-if grid (margin x employee level x days x crew) for a set of items"""
+    try:
+        payload = request.get_json(force=True, silent=False) or {}
+        require_fields(payload, ["items"])
+        items = payload["items"]
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'items' must be a non-empty list"}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({"error": f"Too many items (max {MAX_BATCH_ITEMS})"}), 400
+        grid = payload.get("grid") or {}
+        if not isinstance(grid, dict):
+            return jsonify({"error": "'grid' must be an object"}), 400
+
+        try:
+            rules = resolve_pricing_rules(payload.get("franchisee_id"))
+        except PricingRulesError as e:
+            return jsonify({"error": str(e)}), 500
+
+        materials, difficulties = prefetch_reference_data(items)
+        scenario_items = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return jsonify({"error": f"items[{index}] must be an object"}), 400
+            require_fields(item, ["material_id", "quantity", "difficulty_id"])
+            material = materials.get(reference_id(item, "material_id"))
+            if not material:
+                return jsonify({"error": f"Material not found: {item['material_id']}"}), 404
+            difficulty_factor_obj = difficulties.get(reference_id(item, "difficulty_id"))
+            if not difficulty_factor_obj:
+                return jsonify({"error": f"Difficulty factor not found: {item['difficulty_id']}"}), 404
+            scenario_items.append(scenarios.ScenarioItem(
+                material.custo_unitario_base,
+                item["quantity"],
+                difficulty_factor_obj.nivel,
+                item.get("estimated_days"),
+                item.get("num_envelopers"),
+            ))
+
+        axes = {
+            name: scenarios.parse_axis(grid[name], f"grid.{name}")
+            for name in ("margins", "estimated_days", "num_envelopers") if name in grid
+        }
+        employee_levels = grid.get("employee_levels")
+        if employee_levels is not None and (not isinstance(employee_levels, list) or not employee_levels):
+            return jsonify({"error": "'grid.employee_levels' must be a non-empty list"}), 400
+
+        result = scenarios.sweep(rules, scenario_items, employee_levels=employee_levels, **axes)
+        points, summary = scenarios.flatten(
+            result,
+            output=payload.get("output", "surface"),
+            max_selling_price=payload.get("max_selling_price"),
+            min_profit=payload.get("min_profit"),
         )
+        return jsonify({"points": points, "summary": summary, "rules_version": rules.version})
 
-        db.session.add(project)
-        db.session.flush()  # garante project.id
-
-        total_cost = Decimal("0")
-        total_selling_price = Decimal("0")
-
-        employee_rates = rules.get("employee_rates", {})
-        diff_all = rules.get("difficulty_factors", {})
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-        for item in payload["items"]:
-            require_fields(item, ["material_id", "quantity", "difficulty_id", "employee_level", "estimated_days", "num_envelopers"])
 
-            material = Material.query.get(item["material_id"])
+@pricing_bp.route("/calculate-price/risk", methods=["POST"])
+def calculate_price_risk():
+    """Monte Carlo cost distribution for items with uncertain quantity / estimated days"""
+    try:
+        payload = request.get_json(force=True, silent=False) or {}
+        require_fields(payload, ["items"])
+        items = payload["items"]
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'items' must be a non-empty list"}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({"error": f"Too many items (max {MAX_BATCH_ITEMS})"}), 400
+
+        try:
+            rules = resolve_pricing_rules(payload.get("franchisee_id"))
+        except PricingRulesError as e:
+            return jsonify({"error": str(e)}), 500
+
+        materials, difficulties = prefetch_reference_data(items)
+        risk_items = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return jsonify({"error": f"items[{index}] must be an object"}), 400
+            require_fields(item, ITEM_FIELDS)
+            material = materials.get(reference_id(item, "material_id"))
             if not material:
                 return jsonify({"error": f"Material not found: {item['material_id']}"}), 404
-
-            difficulty_factor_obj = DifficultyFactor.query.get(item["difficulty_id"])
+            difficulty_factor_obj = difficulties.get(reference_id(item, "difficulty_id"))
             if not difficulty_factor_obj:
                 return jsonify({"error": f"Difficulty factor not found: {item['difficulty_id']}"}), 404
+            risk_items.append(risk.RiskItem(
+                material.custo_unitario_base,
+                item["quantity"],
+                item["estimated_days"],
+                item["num_envelopers"],
+                difficulty_factor_obj.nivel,
+                item["employee_level"],
+            ))
+
+        margin = None
+        if "margem_lucro" in payload:
+            margin = to_decimal(payload["margem_lucro"], "margem_lucro")
+        result = risk.simulate(
+            rules,
+            risk_items,
+            samples=payload.get("samples", risk.DEFAULT_SAMPLES),
+            target_probability=payload.get("target_probability", 0.9),
+            margin=margin,
+            seed=payload.get("seed"),
+        )
+        result["rules_version"] = rules.version
+        return jsonify(result)
 
-            employee_level = item["employee_level"]
-            if employee_level not in employee_rates:
-                return jsonify({"error": f"Invalid employee level: {employee_level}"}), 400
-
-            difficulty_data = diff_all.get(difficulty_factor_obj.nivel)
-            if not difficulty_data:
-                return jsonify({"error": f"Difficulty data not found for level: {difficulty_factor_obj.nivel}"}), 400
-
-            quantity = to_decimal(item["quantity"], "items[].quantity")
-            estimated_days = to_decimal(item["estimated_days"], "items[].estimated_days")
-            num_envelopers = to_decimal(item["num_envelopers"], "items[].num_envelopers")
-            material_multiplier = to_decimal(difficulty_data.get("material_multiplier", "1"), "material_multiplier")
-            tax_rate = to_decimal(difficulty_data.get("tax_rate", "0"), "tax_rate")
-            daily_rate = to_decimal(employee_rates[employee_level], "employee_rates[level]")
-
-            material_cost = quantity * Decimal(str(material.custo_unitario_base)) * material_multiplier
-            labor_cost = daily_rate * estimated_days * num_envelopers
-            item_cost_before_tax = material_cost + labor_cost
-            item_cost = item_cost_before_tax * (Decimal("1") + tax_rate)
-            item_selling_price = item_cost * (Decimal("1") + project.margem_lucro_aplicada)
-
-            project_item = ProjectItem(
-                id_projeto=project.id,
-                id_material=item["material_id"],
-                quantidade=quantity,
-                id_dificuldade=item["difficulty_id"],
-                custo_item=item_cost,
-                preco_venda_item=item_selling_price,
-                observacoes=item.get("observacoes", "")
-            )
-            db.session.add(project_item)
-
-            total_cost += item_cost
-            total_selling_price += item_selling_price
+    except KeyError as e:
+        return jsonify({"error": str(e)}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-        project.custo_total_estimado = total_cost
-        project.preco_venda_sugerido = total_selling_price
 
-        db.session.commit()
+@pricing_bp.route("/projects", methods=["POST"])
+def create_project():
+    """Create a new project with items (prefetched references, bulk item insert)"""
+    try:
+        payload = request.get_json(force=True, silent=False) or {}
+        require_fields(payload, ["nome_projeto", "id_cliente", "id_franqueado", "items"])
 
-        return jsonify({"project": project.to_dict(), "message": "Project created successfully"}), 201
+        try:
+            rules = resolve_pricing_rules(payload["id_franqueado"])
+        except PricingRulesError as e:
+            return jsonify({"error": str(e)}), 500
+
+        items = payload["items"]
+        if not isinstance(items, list):
+            return jsonify({"error": "'items' must be a list"}), 400
+
+        with QueryCounter(db.engine) as queries:
+            margin = to_stored_decimal(payload.get("margem_lucro", rules.margin_ranges["min"]), "margem_lucro")
+            engine = get_engine(rules)
+            project_id = str(uuid.uuid4())
+
+            # 1) referências: uma query IN por tabela
+            materials, difficulties = prefetch_reference_data(items)
+
+            # 2) valida e precifica tudo antes de tocar na sessão
+            rows = []
+            total_cost = 0
+            total_selling_price = 0
+            for item in items:
+                if not isinstance(item, dict):
+                    return jsonify({"error": "Each item must be an object"}), 400
+                require_fields(item, ITEM_FIELDS)
+
+                material = materials.get(reference_id(item, "material_id"))
+                if not material:
+                    return jsonify({"error": f"Material not found: {item['material_id']}"}), 404
+
+                difficulty_factor_obj = difficulties.get(reference_id(item, "difficulty_id"))
+                if not difficulty_factor_obj:
+                    return jsonify({"error": f"Difficulty factor not found: {item['difficulty_id']}"}), 404
+
+                quantity = to_stored_decimal(item["quantity"], "items[].quantity")
+                quote = price_item(engine, material, difficulty_factor_obj.nivel, dict(item, quantity=quantity), margin)
+                rows.append({
+                    "id": str(uuid.uuid4()),
+                    "id_projeto": project_id,
+                    "id_material": material.id,
+                    "quantidade": quantity,
+                    "id_dificuldade": difficulty_factor_obj.id,
+                    "custo_item": cents_to_decimal(quote.total_cost),
+                    "preco_venda_item": cents_to_decimal(quote.selling_price),
+                    "observacoes": item.get("observacoes", ""),
+                    "nivel_funcionario": item["employee_level"],
+                    "dias_estimados": to_decimal(item["estimated_days"], "items[].estimated_days"),
+                    "num_envelopadores": to_decimal(item["num_envelopers"], "items[].num_envelopers"),
+                })
+                total_cost += quote.total_cost
+                total_selling_price += quote.selling_price
+
+            # 3) grava: um INSERT do projeto + um executemany dos itens
+            project = Project(
+                id=project_id,
+                nome_projeto=payload["nome_projeto"],
+                id_cliente=payload["id_cliente"],
+                id_franqueado=payload["id_franqueado"],
+                margem_lucro_aplicada=margin,
+                custo_total_estimado=cents_to_decimal(total_cost),
+                preco_venda_sugerido=cents_to_decimal(total_selling_price),
+            )
+            db.session.add(project)
+            db.session.flush()
+            if rows:
+                db.session.execute(insert(ProjectItem), rows)
+            franchise_stats.record_project(db.session, project)
+            project_data = project.to_dict()  # antes do commit, evita o refresh pós-commit
+            db.session.commit()
+
+        return jsonify({
+            "project": project_data,
+            "item_count": len(rows),
+            "query_count": queries.count,
+            "rules_version": rules.version,
+            "message": "Project created successfully",
+        }), 201
 
     except KeyError as e:
         return jsonify({"error": str(e)}), 400
@@ -245,4 +635,92 @@ def get_project(project_id):
         return jsonify(project_data)
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@pricing_bp.route("/repricing/drafts", methods=["POST"])
+def reprice_drafts():
+    """Recompute draft projects affected by material cost or pricing rule changes"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        material_ids = payload.get("material_ids") or None
+        difficulty_levels = payload.get("difficulty_levels") or None
+        if not (material_ids or difficulty_levels or payload.get("all")):
+            return jsonify({"error": "Provide material_ids, difficulty_levels or all=true"}), 400
+
+        summary = repricing.reprice_drafts(
+            resolve_pricing_rules,
+            material_ids=material_ids,
+            difficulty_levels=difficulty_levels,
+            franchise_id=payload.get("franchisee_id"),
+            dry_run=bool(payload.get("dry_run")),
+        )
+        db.session.commit()
+        return jsonify(summary)
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@pricing_bp.cli.command("reprice-drafts")
+@click.option("--material-id", "material_ids", multiple=True, help="Material alterado (repetível).")
+@click.option("--level", "difficulty_levels", multiple=True, help="Nível de dificuldade alterado (repetível).")
+@click.option("--franchisee-id", default=None)
+@click.option("--all", "all_drafts", is_flag=True, help="Recalcula todos os rascunhos (mudança de regras).")
+@click.option("--dry-run", is_flag=True)
+def reprice_drafts_command(material_ids, difficulty_levels, franchisee_id, all_drafts, dry_run):
+    """Recalcula rascunhos afetados (flask pricing reprice-drafts ...)."""
+    if not (material_ids or difficulty_levels or all_drafts):
+        raise click.UsageError("Informe --material-id, --level ou --all")
+    summary = repricing.reprice_drafts(
+        resolve_pricing_rules,
+        material_ids=list(material_ids) or None,
+        difficulty_levels=list(difficulty_levels) or None,
+        franchise_id=franchisee_id,
+        dry_run=dry_run,
+    )
+    db.session.commit()
+    click.echo(
+        f"{summary['affected_projects']} projeto(s), {summary['updated_items']} item(ns) recalculado(s), "
+        f"{summary['skipped_items']} ignorado(s) (rules {', '.join(summary['rules_versions']) or '-'})"
+    )
+
+
+@pricing_bp.cli.command("import-rules-file")
+@click.option("--franchisee-id", default=None, help="Cria como regra da franquia (padrão: global).")
+@click.option("--nome", default="Importado de extracted_pricing_data.json")
+def import_rules_file_command(franchisee_id, nome):
+    """Copia o JSON de regras atual para um conjunto no banco (flask pricing import-rules-file)."""
+    data = dict(reload_pricing_rules().data, nome=nome, id_franqueado=franchisee_id)
+    rule_set = create_rule_set(data)
+    db.session.commit()
+    click.echo(f"Conjunto de regras {rule_set.id} criado")
+
+
+@pricing_bp.cli.command("import-materials")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--reprice", is_flag=True, help="Recalcula os rascunhos dos materiais com custo alterado.")
+@click.option("--dry-run", is_flag=True, help="Só mostra as diferenças, sem gravar.")
+def import_materials_command(path, reprice, dry_run):
+    """Importa a planilha de preços do fornecedor (flask pricing import-materials arquivo.csv)."""
+    with open(path, "rb") as stream:
+        try:
+            report = material_import.import_price_sheet(
+                db.session, stream, resolve_rules=resolve_pricing_rules if reprice else None, dry_run=dry_run,
+            )
+        except material_import.MaterialImportError as e:
+            raise click.ClickException(str(e))
+    for change in report["changes"]:
+        if change["action"] == "inserted":
+            click.echo(f"+ {change['nome']}: {change['new_cost']:.2f}")
+        elif change["delta"]:
+            click.echo(f"~ {change['nome']}: {change['old_cost']:.2f} -> {change['new_cost']:.2f} ({change['delta']:+.2f})")
+    for error in report["errors"]:
+        click.echo(f"linha {error['line']}: {'; '.join(error['errors'])}", err=True)
+    click.echo(
+        f"{report['inserted']} novo(s), {report['updated']} alterado(s), {report['unchanged']} sem mudança, "
+        f"{report['invalid']} inválido(s){' (dry-run, nada gravado)' if dry_run else ''}"
+    )
+    if report["repricing"]:
+        click.echo(f"{report['repricing']['affected_projects']} rascunho(s) recalculado(s)")
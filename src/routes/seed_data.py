@@ -9,6 +9,7 @@ from src.models.difficulty import DifficultyFactor
 from src.models.client import Client
 from src.models.project import Project
 from src.models.franchise import Franchise
+from src.services import franchise_stats
 
 seed_bp = Blueprint("seed", __name__)
 
@@ -102,7 +103,7 @@ def seed_all():
 
         # 4) Clientes → todos atrelados à franquia default
         for nome, email in CLIENTS:
-            _, is_new = get_or_create(
+            client, is_new = get_or_create(
                 Client,
                 defaults={
                     "email": email,
@@ -112,6 +113,7 @@ def seed_all():
             )
             if is_new:
                 created["clients"] += 1
+                franchise_stats.record_client(db.session, client.id_franqueado, 1)
 
         db.session.commit()
         return jsonify({"status": "ok", "created": created}), 201
@@ -0,0 +1,415 @@
+# src/services/ai_gateway.py
+"""
+Gateway (por processo) para as chamadas de chat da OpenAI.
+
+- Um único cliente OpenAI sobre um httpx.Client com pool de conexões keep-alive,
+  criado na primeira chamada de cada worker (e recriado se o processo for um
+  fork de outro que já tinha o cliente), em vez de um cliente novo por requisição.
+- Timeouts de conexão e de leitura por endpoint (ENDPOINT_READ_TIMEOUTS, com
+  override por variável de ambiente AI_READ_TIMEOUT_<ENDPOINT>).
+- Retentativas limitadas (AI_MAX_RETRIES) com backoff exponencial e jitter,
+  só para falhas transitórias: erro/timeout de conexão, 429 e 5xx. Timeout de
+  leitura não é repetido (o upstream está lento; repetir só multiplica a espera).
+- Semáforo (AI_MAX_CONCURRENCY) limitando as chamadas simultâneas ao upstream;
+  quem espera mais que AI_QUEUE_TIMEOUT recebe 503 em vez de prender a thread.
+
+OPENAI_BASE_URL permite apontar para outro servidor compatível, por exemplo o
+stub local src/ai_stub_server.py usado nos testes de carga.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "5"))
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "3"))
+AI_READ_TIMEOUT = float(os.getenv("AI_READ_TIMEOUT", "30"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BACKOFF = float(os.getenv("AI_RETRY_BACKOFF", "0.5"))
+AI_RETRY_MAX_BACKOFF = float(os.getenv("AI_RETRY_MAX_BACKOFF", "4"))
+AI_POOL_SIZE = int(os.getenv("AI_POOL_SIZE", "16"))
+AI_KEEPALIVE_EXPIRY = float(os.getenv("AI_KEEPALIVE_EXPIRY", "60"))
+# app assíncrono (src/asgi_ai.py): chamadas simultâneas por processo, sem prender threads
+AI_ASYNC_MAX_CONCURRENCY = int(os.getenv("AI_ASYNC_MAX_CONCURRENCY", "200"))
+# conexões ociosas mantidas abertas: o pool do httpcore fica lento ao reaproveitar centenas delas
+AI_ASYNC_KEEPALIVE_CONNECTIONS = int(os.getenv("AI_ASYNC_KEEPALIVE_CONNECTIONS", "20"))
+
+# segundos de leitura por endpoint (respostas maiores pedem mais tempo)
+ENDPOINT_READ_TIMEOUTS = {
+    "generate-project-description": 20,
+    "suggest-materials": 30,
+    "analyze-pricing-trends": 40,
+    "virtual-assistant": 20,
+    "optimize-margins": 30,
+}
+
+
+class AIGatewayError(RuntimeError):
+    status_code = 502
+
+
+class AIConfigError(AIGatewayError):
+    """SDK ausente ou OPENAI_API_KEY não configurada."""
+    status_code = 501
+
+
+class AIBusyError(AIGatewayError):
+    """Todas as vagas do semáforo ocupadas por mais que AI_QUEUE_TIMEOUT."""
+    status_code = 503
+
+
+class AITimeoutError(AIGatewayError):
+    status_code = 504
+
+
+class AIUpstreamError(AIGatewayError):
+    status_code = 502
+
+
+def resolve_model(model=None):
+    return model or os.getenv("OPENAI_MODEL") or DEFAULT_MODEL
+
+
+def read_timeout(endpoint):
+    env_name = "AI_READ_TIMEOUT_" + (endpoint or "").upper().replace("-", "_")
+    if os.getenv(env_name):
+        return float(os.getenv(env_name))
+    return float(ENDPOINT_READ_TIMEOUTS.get(endpoint, AI_READ_TIMEOUT))
+
+
+def backoff_delay(attempt, base=AI_RETRY_BACKOFF, cap=AI_RETRY_MAX_BACKOFF):
+    """Full jitter: uniforme entre 0 e min(cap, base * 2^tentativa)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(error):
+    """Falha transitória: erro/timeout de conexão, 429 ou 5xx (timeout de leitura não)."""
+    import httpx
+    import openai
+    if isinstance(error, openai.APITimeoutError):
+        return isinstance(error.__cause__, httpx.ConnectTimeout)
+    return isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+def retry_delay(error, attempt):
+    """Retry-After do upstream (limitado a AI_RETRY_MAX_BACKOFF) ou o backoff com jitter."""
+    response = getattr(error, "response", None)
+    try:
+        return min(float(response.headers.get("retry-after")), AI_RETRY_MAX_BACKOFF)
+    except (AttributeError, TypeError, ValueError):
+        return backoff_delay(attempt)
+
+
+def timeout_for(endpoint, connect_timeout=AI_CONNECT_TIMEOUT):
+    import httpx
+    return httpx.Timeout(read_timeout(endpoint), connect=connect_timeout, write=connect_timeout,
+                         pool=connect_timeout)
+
+
+def http_limits(size=AI_POOL_SIZE, keepalive=None):
+    import httpx
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size if keepalive is None else keepalive,
+                        keepalive_expiry=AI_KEEPALIVE_EXPIRY)
+
+
+def translate_error(error, endpoint):
+    """Exceção do SDK/httpx -> AIGatewayError (status HTTP da rota)."""
+    import httpx
+    import openai
+    if isinstance(error, (openai.APITimeoutError, httpx.TimeoutException)):
+        return AITimeoutError(f"AI upstream timed out ({endpoint or 'default'})")
+    return AIUpstreamError(f"AI upstream error: {error}")
+
+
+class AIGateway:
+    def __init__(self, max_concurrency=AI_MAX_CONCURRENCY, queue_timeout=AI_QUEUE_TIMEOUT,
+                 max_retries=AI_MAX_RETRIES, connect_timeout=AI_CONNECT_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.connect_timeout = connect_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_pid = None
+        self._stats = {"requests": 0, "retries": 0, "busy": 0, "timeouts": 0, "errors": 0, "in_flight": 0}
+
+    # ------------------------------------------------------------------ cliente
+
+    def client(self):
+        """Cliente OpenAI do processo (criado sob demanda)."""
+        with self._lock:
+            if self._client is None or self._client_pid != os.getpid():
+                self._client = self._build_client()
+                self._client_pid = os.getpid()
+            return self._client
+
+    def _build_client(self):
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise AIConfigError("OpenAI SDK not installed or OPENAI_API_KEY missing")
+        try:
+            import httpx
+            from openai import OpenAI
+        except ImportError:
+            raise AIConfigError("OpenAI SDK not installed or OPENAI_API_KEY missing")
+
+        http_client = httpx.Client(
+            limits=http_limits(), timeout=httpx.Timeout(AI_READ_TIMEOUT, connect=self.connect_timeout),
+        )
+        # as retentativas são feitas aqui (com jitter e sem repetir timeout de leitura)
+        return OpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL,
+                      http_client=http_client, max_retries=0)
+
+    def reset(self):
+        """Fecha o pool (ex.: troca de OPENAI_BASE_URL/chave em testes)."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    # ------------------------------------------------------------------ chamadas
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    def _failure(self, error, endpoint):
+        failure = translate_error(error, endpoint)
+        self._count("timeouts" if isinstance(failure, AITimeoutError) else "errors")
+        return failure
+
+    def _acquire(self):
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            self._count("busy")
+            raise AIBusyError("AI service busy, try again shortly")
+        self._count("in_flight")
+
+    def _release(self):
+        self._count("in_flight", -1)
+        self._semaphore.release()
+
+    def _attempt(self, fn, client, timeout, endpoint):
+        """fn(client, timeout) com as retentativas; exceções do SDK viram AIGatewayError."""
+        import openai
+
+        attempt = 0
+        while True:
+            self._count("requests")
+            try:
+                return fn(client, timeout)
+            except openai.APIError as e:
+                if attempt < self.max_retries and is_retryable(e):
+                    time.sleep(retry_delay(e, attempt))
+                    attempt += 1
+                    self._count("retries")
+                    continue
+                raise self._failure(e, endpoint) from e
+
+    def call(self, fn, endpoint=None):
+        """Executa fn(client, timeout) dentro do semáforo, com as retentativas."""
+        client = self.client()
+        timeout = timeout_for(endpoint, self.connect_timeout)
+        self._acquire()
+        try:
+            return self._attempt(fn, client, timeout, endpoint)
+        finally:
+            self._release()
+
+    def stream_chat(self, messages, max_tokens=500, temperature=0.7, model=None, endpoint=None):
+        """
+        Gerador com os trechos de texto conforme chegam (stream=True). A vaga do
+        semáforo fica presa enquanto o stream está aberto. Só a abertura do stream
+        é repetida em falha; depois do primeiro byte, um erro sobe como AIGatewayError.
+        Fechar o gerador (cliente desconectou) fecha a resposta HTTP do upstream.
+        """
+        import httpx
+        import openai
+
+        model = resolve_model(model)
+        client = self.client()
+        timeout = timeout_for(endpoint, self.connect_timeout)
+        self._acquire()
+        try:
+            stream = self._attempt(
+                lambda c, t: c.chat.completions.create(
+                    model=model, messages=messages, max_tokens=max_tokens,
+                    temperature=temperature, timeout=t, stream=True,
+                ),
+                client, timeout, endpoint,
+            )
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except (httpx.HTTPError, openai.APIError) as e:
+                raise self._failure(e, endpoint) from e
+            finally:
+                stream.close()
+        finally:
+            self._release()
+
+    def chat_complete(self, messages, max_tokens=500, temperature=0.7, model=None, endpoint=None):
+        """Texto da resposta de chat (OPENAI_MODEL ou gpt-4o-mini por padrão)."""
+        model = resolve_model(model)
+
+        def create(client, timeout):
+            resp = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout,
+            )
+            return resp.choices[0].message.content
+
+        return self.call(create, endpoint)
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                max_concurrency=self.max_concurrency,
+                queue_timeout_seconds=self.queue_timeout,
+                max_retries=self.max_retries,
+                pool_size=AI_POOL_SIZE,
+                base_url=os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL,
+                client_ready=self._client is not None and self._client_pid == os.getpid(),
+            )
+
+
+
+class AsyncAIGateway:
+    """
+    Mesmo contrato do AIGateway para o app assíncrono (src/asgi_ai.py): AsyncOpenAI
+    sobre um httpx.AsyncClient, asyncio.Semaphore limitando as chamadas em voo e as
+    mesmas regras de timeout/retentativa. Esperar o upstream não ocupa thread, então
+    o limite pode ser bem maior que o do gateway síncrono.
+    """
+
+    def __init__(self, max_concurrency=AI_ASYNC_MAX_CONCURRENCY, queue_timeout=AI_QUEUE_TIMEOUT,
+                 max_retries=AI_MAX_RETRIES, connect_timeout=AI_CONNECT_TIMEOUT,
+                 keepalive_connections=AI_ASYNC_KEEPALIVE_CONNECTIONS):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.connect_timeout = connect_timeout
+        self.keepalive_connections = keepalive_connections
+        self._semaphore = None  # criado no loop que vai usá-lo
+        self._client = None
+        self._stats = {"requests": 0, "retries": 0, "busy": 0, "timeouts": 0, "errors": 0, "in_flight": 0}
+
+    def client(self):
+        if self._client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise AIConfigError("OpenAI SDK not installed or OPENAI_API_KEY missing")
+            try:
+                import httpx
+                from openai import AsyncOpenAI
+            except ImportError:
+                raise AIConfigError("OpenAI SDK not installed or OPENAI_API_KEY missing")
+            http_client = httpx.AsyncClient(
+                limits=http_limits(self.max_concurrency, self.keepalive_connections),
+                timeout=httpx.Timeout(AI_READ_TIMEOUT, connect=self.connect_timeout),
+            )
+            self._client = AsyncOpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL,
+                                       http_client=http_client, max_retries=0)
+        return self._client
+
+    async def close(self):
+        client, self._client = self._client, None
+        if client is not None:
+            await client.close()
+
+    def _failure(self, error, endpoint):
+        failure = translate_error(error, endpoint)
+        self._stats["timeouts" if isinstance(failure, AITimeoutError) else "errors"] += 1
+        return failure
+
+    async def _acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["busy"] += 1
+            raise AIBusyError("AI service busy, try again shortly")
+        self._stats["in_flight"] += 1
+
+    def _release(self):
+        self._stats["in_flight"] -= 1
+        self._semaphore.release()
+
+    async def _attempt(self, create, endpoint):
+        import openai
+
+        attempt = 0
+        while True:
+            self._stats["requests"] += 1
+            try:
+                return await create()
+            except openai.APIError as e:
+                if attempt < self.max_retries and is_retryable(e):
+                    await asyncio.sleep(retry_delay(e, attempt))
+                    attempt += 1
+                    self._stats["retries"] += 1
+                    continue
+                raise self._failure(e, endpoint) from e
+
+    async def chat_complete(self, messages, max_tokens=500, temperature=0.7, model=None, endpoint=None):
+        model = resolve_model(model)
+        client = self.client()
+        timeout = timeout_for(endpoint, self.connect_timeout)
+        await self._acquire()
+        try:
+            resp = await self._attempt(lambda: client.chat.completions.create(
+                model=model, messages=messages, max_tokens=max_tokens, temperature=temperature, timeout=timeout,
+            ), endpoint)
+            return resp.choices[0].message.content
+        finally:
+            self._release()
+
+    async def stream_chat(self, messages, max_tokens=500, temperature=0.7, model=None, endpoint=None):
+        """Gerador assíncrono dos trechos; cancelar/fechar fecha o stream do upstream."""
+        import httpx
+        import openai
+
+        model = resolve_model(model)
+        client = self.client()
+        timeout = timeout_for(endpoint, self.connect_timeout)
+        await self._acquire()
+        try:
+            stream = await self._attempt(lambda: client.chat.completions.create(
+                model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                timeout=timeout, stream=True,
+            ), endpoint)
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except (httpx.HTTPError, openai.APIError) as e:
+                raise self._failure(e, endpoint) from e
+            finally:
+                await stream.close()
+        finally:
+            self._release()
+
+    def stats(self):
+        return dict(
+            self._stats,
+            max_concurrency=self.max_concurrency,
+            queue_timeout_seconds=self.queue_timeout,
+            max_retries=self.max_retries,
+            keepalive_connections=self.keepalive_connections,
+            base_url=os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL,
+            client_ready=self._client is not None,
+        )
+
+
+ai_gateway = AIGateway()
@@ -0,0 +1,212 @@
+# src/services/client_import.py
+"""
+Importação de clientes via CSV em streaming.
+
+O arquivo é lido linha a linha (csv.DictReader sobre o stream do upload), então
+a memória usada não depende do tamanho do arquivo. Cada linha é validada e
+deduplicada por email e telefone (só dígitos), tanto dentro do arquivo quanto
+contra os clientes já cadastrados na franquia (carregados uma vez, só essas
+duas colunas). As linhas válidas são gravadas em lotes: um INSERT executemany
+por lote, com os contadores de franchise_stats, e um commit por lote.
+"""
+import csv
+from datetime import datetime
+import io
+import re
+import uuid
+
+from sqlalchemy import insert
+
+from src.models.client import Client
+from src.services import franchise_stats
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+
+# cabeçalhos aceitos -> coluna
+HEADER_ALIASES = {
+    "nome": "nome", "name": "nome", "cliente": "nome",
+    "email": "email", "e-mail": "email",
+    "telefone": "telefone", "phone": "telefone", "celular": "telefone", "fone": "telefone",
+    "endereco": "endereco", "endereço": "endereco", "address": "endereco",
+}
+MAX_LENGTHS = {"nome": 200, "email": 120, "telefone": 20, "endereco": 500}
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class ClientImportError(ValueError):
+    """Erro que impede a importação como um todo (arquivo/cabeçalho inválido)."""
+
+
+def email_key(value):
+    return (value or "").strip().lower() or None
+
+
+def phone_key(value):
+    digits = re.sub(r"\D", "", value or "")
+    return digits or None
+
+
+def parse_batch_size(value):
+    if value in (None, ""):
+        return DEFAULT_BATCH_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ClientImportError("'batch_size' must be an integer")
+    if size < 1 or size > MAX_BATCH_SIZE:
+        raise ClientImportError(f"'batch_size' must be between 1 and {MAX_BATCH_SIZE}")
+    return size
+
+
+def _header_map(fieldnames):
+    if not fieldnames:
+        raise ClientImportError("CSV file is empty or has no header")
+    mapping = {}
+    for name in fieldnames:
+        column = HEADER_ALIASES.get((name or "").strip().lower())
+        if column and column not in mapping.values():
+            mapping[name] = column
+    if "nome" not in mapping.values():
+        raise ClientImportError("CSV header must include a 'nome' column")
+    return mapping
+
+
+def _validate(record):
+    errors = []
+    if not record.get("nome"):
+        errors.append("nome is required")
+    for column, max_length in MAX_LENGTHS.items():
+        if len(record.get(column) or "") > max_length:
+            errors.append(f"{column} longer than {max_length} characters")
+    if record.get("email") and not EMAIL_RE.match(record["email"]):
+        errors.append("invalid email")
+    return errors
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.errors = []
+        self.errors_truncated = False
+
+    def add_error(self, line, errors):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": errors})
+        else:
+            self.errors_truncated = True
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+def _flush_batch(session, franchise_id, batch, report):
+    session.execute(insert(Client), batch)
+    franchise_stats.record_client(session, franchise_id, len(batch))
+    session.commit()
+    report.imported += len(batch)
+    report.batches += 1
+
+
+def import_clients(session, franchise_id, binary_stream, batch_size=DEFAULT_BATCH_SIZE, encoding="utf-8-sig"):
+    """
+    Importa o CSV de `binary_stream` para a franquia. Retorna o ImportReport.
+    Se o banco falhar no meio, os lotes anteriores continuam gravados; a exceção
+    sobe com `report` anexado (exc.report) para a rota informar o parcial.
+    """
+    report = ImportReport()
+    text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline="")
+    try:
+        reader = sniffed_reader(text_stream)
+        mapping = _header_map(reader.fieldnames)
+
+        existing = session.query(Client.email, Client.telefone).filter(Client.id_franqueado == franchise_id)
+        seen_emails, seen_phones = set(), set()
+        for email, telefone in existing:
+            if email_key(email):
+                seen_emails.add(email_key(email))
+            if phone_key(telefone):
+                seen_phones.add(phone_key(telefone))
+
+        batch = []
+        now = datetime.utcnow()
+        for row in reader:
+            report.rows += 1
+            line = reader.line_num
+            record = {column: (row.get(name) or "").strip() for name, column in mapping.items()}
+            errors = _validate(record)
+            if errors:
+                report.invalid += 1
+                report.add_error(line, errors)
+                continue
+
+            email, phone = email_key(record.get("email")), phone_key(record.get("telefone"))
+            if (email and email in seen_emails) or (phone and phone in seen_phones):
+                report.duplicates += 1
+                report.add_error(line, ["duplicate email/telefone (file or existing client)"])
+                continue
+            if email:
+                seen_emails.add(email)
+            if phone:
+                seen_phones.add(phone)
+
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "id_franqueado": franchise_id,
+                "nome": record["nome"],
+                "email": record.get("email", ""),
+                "telefone": record.get("telefone", ""),
+                "endereco": record.get("endereco", ""),
+                "data_cadastro": now,
+            })
+            if len(batch) >= batch_size:
+                _flush_batch(session, franchise_id, batch, report)
+                batch = []
+        if batch:
+            _flush_batch(session, franchise_id, batch, report)
+        return report
+    except UnicodeDecodeError:
+        session.rollback()
+        raise ClientImportError(f"CSV must be encoded as {encoding} ({report.imported} rows imported before the error)")
+    except csv.Error as e:
+        session.rollback()
+        raise ClientImportError(
+            f"Malformed CSV near line {report.rows + 1}: {e} ({report.imported} rows imported before the error)"
+        )
+    except Exception as e:
+        session.rollback()
+        e.report = report
+        raise
+    finally:
+        text_stream.detach()
+
+
+def sniffed_reader(text_stream):
+    """csv.DictReader com o delimitador (, ; ou tab) detectado no início do arquivo."""
+    sample = text_stream.read(4096)
+    dialect = csv.excel
+    if sample:
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            pass
+    return csv.DictReader(_chain(sample, text_stream), dialect=dialect)
+
+
+def _chain(sample, stream):
+    """Devolve o trecho já lido (para o Sniffer) e continua do stream, linha a linha."""
+    yield from io.StringIO(sample + stream.readline())
+    yield from stream
@@ -0,0 +1,287 @@
+# src/services/client_search.py
+"""
+Busca aproximada de clientes (nome/email/telefone), sem acento e com ranking.
+
+- PostgreSQL: índice GIN trigram (pg_trgm + btree_gin) sobre a expressão
+  SEARCH_EXPRESSION, criado na migração 0007. A consulta usa `<%`
+  (word similarity) e LIKE '%q%', ambos atendidos pelo índice, ordenando por
+  word_similarity.
+- SQLite: tabelas FTS5 da migração 0011, ligadas a clients por
+  clients_fts_docs.docid (INTEGER PRIMARY KEY, estável ao VACUUM). Cada fase
+  só roda quando a anterior não bastou e traz até SEARCH_CANDIDATES clientes,
+  sem ORDER BY no SQL (o bm25 sobre milhares de matches custava dezenas de
+  ms); o ranking é feito aqui por `similarity`:
+  1. prefixo de cada termo em `clients_fts` (unicode61 sem diacríticos);
+  2. trecho de cada termo (>= 3 caracteres) em `clients_fts_trgm`, o que acha
+     "99990" em "(11) 9999-0000" e "ilva" em "Silva";
+  3. sem nenhum resultado: termos sem prefixo conhecido são trocados pelas
+     palavras de nome mais parecidas (`clients_fts_names_vocab`, mesma letra
+     inicial), e a fase 1 roda de novo: "slva" acha "Silva".
+  O score fica entre 0 e 1, como o word_similarity do PostgreSQL.
+- Sem o índice (ex.: banco criado com db.create_all): LIKE simples, sem ranking.
+
+A detecção do índice é feita uma vez por engine. O tokenizer trigram do
+SQLite não remove acentos: trechos no meio da palavra precisam do acento
+("ão" em "João"); prefixos (fase 1) continuam sem acento.
+"""
+import difflib
+import functools
+import re
+import threading
+import unicodedata
+
+from sqlalchemy import func, or_, text
+
+from src.models.client import Client
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MIN_QUERY_LENGTH = 2
+SEARCH_CANDIDATES = MAX_SEARCH_LIMIT
+FUZZY_CUTOFF = 0.75
+FUZZY_CORRECTIONS = 3
+
+# Precisa ser idêntica à expressão do índice ix_clients_search_trgm (migração 0007)
+SEARCH_EXPRESSION = (
+    "f_unaccent(lower(coalesce(nome, '') || ' ' || coalesce(email, '') || ' ' || "
+    "coalesce(telefone, '') || ' ' || regexp_replace(coalesce(telefone, ''), '[^0-9]', '', 'g')))"
+)
+
+_POSTGRES_SEARCH = text(f"""
+    SELECT id, word_similarity(:q, {SEARCH_EXPRESSION}) AS score
+    FROM clients
+    WHERE id_franqueado = :franchise_id
+      AND (:q <% {SEARCH_EXPRESSION} OR {SEARCH_EXPRESSION} LIKE :pattern)
+    ORDER BY score DESC, nome
+    LIMIT :limit
+""")
+
+# {table} é clients_fts (fases 1 e 3) ou clients_fts_trgm (fase 2). CROSS JOIN
+# fixa o FTS como laço externo: sem ORDER BY o planner preferiria varrer os
+# clientes da franquia pelo índice e consultar o FTS uma vez por cliente.
+_SQLITE_SEARCH = """
+    SELECT c.id
+    FROM {table} f
+    CROSS JOIN clients_fts_docs d ON d.docid = f.rowid
+    CROSS JOIN clients c ON c.id = d.client_id
+    WHERE {table} MATCH :match AND c.id_franqueado = :franchise_id
+    LIMIT :limit
+"""
+_SQLITE_PREFIX_SEARCH = text(_SQLITE_SEARCH.format(table="clients_fts"))
+_SQLITE_TRIGRAM_SEARCH = text(_SQLITE_SEARCH.format(table="clients_fts_trgm"))
+
+_SQLITE_HAS_PREFIX = text("SELECT 1 FROM clients_fts WHERE clients_fts MATCH :match LIMIT 1")
+_SQLITE_NAME_WORDS = text("""
+    SELECT term FROM clients_fts_names_vocab
+    WHERE term >= :first AND term < :next AND length(term) BETWEEN :shortest AND :longest
+""")
+
+
+class SearchError(ValueError):
+    pass
+
+
+def normalize(value):
+    """minúsculas e sem acentos (mesma normalização do índice)."""
+    if (value or "").isascii():
+        return (value or "").lower().strip()
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower().strip()
+
+
+def fts5_match(query):
+    """Termos viram prefixos entre aspas ("ana"* "silva"*), combinados com AND."""
+    tokens = re.findall(r"\w+", normalize(query))
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _trigram_tokens(query):
+    # o tokenizer trigram não remove acentos: os termos mantêm os do usuário
+    return [token for token in re.findall(r"\w+", (query or "").lower()) if len(token) >= 3]
+
+
+def trigram_match(query):
+    """Trechos de 3+ caracteres entre aspas ("99990" AND "ilva"), combinados com AND."""
+    # o tokenizer trigram não remove acentos: os termos mantêm os do usuário
+    tokens = [token for token in re.findall(r"\w+", (query or "").lower()) if len(token) >= 3]
+    return " AND ".join(f'"{token}"' for token in tokens)
+
+
+def _words(client):
+    words = re.findall(r"\w+", normalize(f"{client.nome or ''} {client.email or ''} {client.telefone or ''}"))
+    digits = re.sub(r"\D", "", client.telefone or "")
+    return words + [digits] if digits else words
+
+
+@functools.lru_cache(maxsize=4096)
+def _ratio(token, word):
+    # os candidatos repetem as mesmas palavras de nome
+    return difflib.SequenceMatcher(None, token, word).ratio()
+
+
+def similarity(query, client):
+    """Média, por termo, da melhor palavra do cliente: 1 igual, 0.9 prefixo, 0.8 trecho, senão 0.8 x difflib
+    (contra palavras com a mesma letra inicial)."""
+    tokens = re.findall(r"\w+", normalize(query))
+    words = _words(client)
+    if not tokens or not words:
+        return 0.0
+    total = 0.0
+    for token in tokens:
+        best = 0.0
+        for word in words:
+            if word == token:
+                best = 1.0
+                break
+            if word.startswith(token):
+                best = max(best, 0.9)
+            elif token in word:
+                best = max(best, 0.8)
+        if not best:  # fase 3: como na correção, só palavras com a mesma letra inicial
+            best = 0.8 * max((_ratio(token, word) for word in words if word[0] == token[0]), default=0.0)
+        total += best
+    return total / len(tokens)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def search_backend(session):
+    """'pg_trgm', 'fts5' ou 'like' para o banco da sessão (detectado uma vez por engine)."""
+    engine = session.get_bind()
+    with _backends_lock:
+        backend = _backends.get(engine)
+    if backend is not None:
+        return backend
+
+    backend = "like"
+    if engine.dialect.name == "postgresql":
+        if session.execute(text("SELECT to_regclass('ix_clients_search_trgm') IS NOT NULL")).scalar():
+            backend = "pg_trgm"
+    elif engine.dialect.name == "sqlite":
+        found = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts_docs'")
+        ).first()
+        if found:
+            backend = "fts5"
+    with _backends_lock:
+        _backends[engine] = backend
+    return backend
+
+
+def parse_search_limit(value):
+    if value in (None, ""):
+        return DEFAULT_SEARCH_LIMIT
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise SearchError("'limit' must be an integer")
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        raise SearchError(f"'limit' must be between 1 and {MAX_SEARCH_LIMIT}")
+    return limit
+
+
+def search_clients(session, franchise_id, query, limit=DEFAULT_SEARCH_LIMIT):
+    """Retorna (backend, [(Client, score)]) em ordem de relevância."""
+    normalized = normalize(query)
+    if len(normalized) < MIN_QUERY_LENGTH:
+        raise SearchError(f"'q' must have at least {MIN_QUERY_LENGTH} characters")
+
+    backend = search_backend(session)
+    if backend == "pg_trgm":
+        escaped = normalized.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        ranked = session.execute(_POSTGRES_SEARCH, {
+            "q": normalized, "pattern": f"%{escaped}%", "franchise_id": franchise_id, "limit": limit,
+        }).all()
+    elif backend == "fts5":
+        return backend, _search_sqlite(session, franchise_id, query, limit)
+    else:
+        pattern = f"%{query.strip().lower()}%"
+        clients = (
+            session.query(Client)
+            .filter(Client.id_franqueado == franchise_id)
+            .filter(or_(
+                func.lower(Client.nome).like(pattern),
+                func.lower(Client.email).like(pattern),
+                Client.telefone.like(pattern),
+            ))
+            .order_by(Client.nome)
+            .limit(limit)
+            .all()
+        )
+        return backend, [(client, None) for client in clients]
+
+    # uma segunda consulta por PK carrega os objetos, mantendo a ordem do ranking
+    ids = [row[0] for row in ranked]
+    if not ids:
+        return backend, []
+    clients = {c.id: c for c in session.query(Client).filter(Client.id.in_(ids))}
+    return backend, [(clients[row[0]], float(row[1])) for row in ranked if row[0] in clients]
+
+
+def _corrected_match(session, query):
+    """MATCH da fase 3: termos sem prefixo no índice viram as palavras de nome mais parecidas."""
+    terms, corrected = [], False
+    for token in re.findall(r"\w+", normalize(query)):
+        if session.execute(_SQLITE_HAS_PREFIX, {"match": f'"{token}"*'}).first():
+            terms.append(f'"{token}"*')
+            continue
+        if len(token) < 3 or not token.isalpha():
+            return None
+        words = session.execute(_SQLITE_NAME_WORDS, {
+            "first": token[0], "next": chr(ord(token[0]) + 1),
+            "shortest": len(token) - 2, "longest": len(token) + 2,
+        }).scalars().all()
+        close = difflib.get_close_matches(token, words, n=FUZZY_CORRECTIONS, cutoff=FUZZY_CUTOFF)
+        if not close:
+            return None
+        terms.append("(" + " OR ".join(f'"{word}"' for word in close) + ")")
+        corrected = True
+    return " AND ".join(terms) if corrected else None
+
+
+def _search_sqlite(session, franchise_id, query, limit):
+    params = {"franchise_id": franchise_id, "limit": SEARCH_CANDIDATES}
+    ids = []
+    for statement, match in ((_SQLITE_PREFIX_SEARCH, fts5_match(query)),
+                             (_SQLITE_TRIGRAM_SEARCH, trigram_match(query))):
+        if len(ids) >= limit or not match:
+            continue
+        for client_id in session.execute(statement, dict(params, match=match)).scalars():
+            if client_id not in ids:
+                ids.append(client_id)
+    if not ids:
+        match = _corrected_match(session, query)
+        if match:
+            ids = session.execute(_SQLITE_PREFIX_SEARCH, dict(params, match=match)).scalars().all()
+    if not ids:
+        return []
+
+    clients = session.query(Client).filter(Client.id.in_(ids)).all()
+    scored = sorted(((client, similarity(query, client)) for client in clients),
+                    key=lambda pair: (-pair[1], pair[0].nome))
+    return scored[:limit]
+
+
+def rebuild_sqlite_index(session):
+    """Repovoa clients_fts_docs e as tabelas FTS5 a partir de clients (SQLite). Retorna o nº de clientes indexados."""
+    digits = "coalesce(c.telefone, '')"
+    for char in ("(", ")", "-", " ", "+", "."):
+        digits = f"replace({digits}, '{char}', '')"
+    source = "FROM clients c JOIN clients_fts_docs d ON d.client_id = c.id"
+    session.execute(text("INSERT INTO clients_fts (clients_fts) VALUES ('delete-all')"))
+    session.execute(text("INSERT INTO clients_fts_trgm (clients_fts_trgm) VALUES ('delete-all')"))
+    session.execute(text("INSERT INTO clients_fts_names (clients_fts_names) VALUES ('delete-all')"))
+    session.execute(text("DELETE FROM clients_fts_docs"))
+    session.execute(text("INSERT INTO clients_fts_docs (client_id) SELECT id FROM clients"))
+    session.execute(text(
+        "INSERT INTO clients_fts (rowid, nome, email, telefone, telefone_digitos) "
+        f"SELECT d.docid, coalesce(c.nome, ''), coalesce(c.email, ''), coalesce(c.telefone, ''), {digits} {source}"
+    ))
+    session.execute(text(
+        "INSERT INTO clients_fts_trgm (rowid, texto, telefone_digitos) "
+        f"SELECT d.docid, coalesce(c.nome, '') || ' ' || coalesce(c.email, ''), {digits} {source}"
+    ))
+    session.execute(text(f"INSERT INTO clients_fts_names (rowid, nome) SELECT d.docid, coalesce(c.nome, '') {source}"))
+    return session.query(func.count(Client.id)).scalar()
@@ -0,0 +1,183 @@
+# src/services/completion_cache.py
+"""
+Cache persistente das respostas do LLM (usado por _chat_complete em
+src/routes/ai_assistant.py).
+
+A chave é o sha256 de (modelo, temperature, max_tokens, mensagens normalizadas:
+papel em minúsculas e espaços colapsados, já que os prompts vêm de f-strings
+indentadas). O armazenamento é um arquivo SQLite local (AI_CACHE_PATH) em modo
+WAL, compartilhado pelos workers do gunicorn da mesma máquina:
+
+- TTL (AI_CACHE_TTL): entradas vencidas contam como miss e são apagadas;
+- LRU limitado (AI_CACHE_MAX_ENTRIES): cada hit atualiza last_access e, quando
+  o total passa do limite, as menos acessadas saem;
+- contadores de hit/miss por endpoint na própria base (somam todos os workers);
+- opt-out por endpoint com AI_CACHE_DISABLED_ENDPOINTS (lista separada por
+  vírgula) ou cache=False na chamada.
+
+Falhas do SQLite (arquivo travado, disco cheio) nunca derrubam a chamada de IA:
+o cache é ignorado e a resposta vem do upstream.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+AI_CACHE_PATH = os.getenv(
+    "AI_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "ai_completion_cache.db")
+)
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "5000"))
+AI_CACHE_DISABLED_ENDPOINTS = {
+    name.strip() for name in os.getenv("AI_CACHE_DISABLED_ENDPOINTS", "").split(",") if name.strip()
+}
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_completions_last_access ON completions (last_access);
+CREATE TABLE IF NOT EXISTS counters (
+    endpoint TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def normalize_messages(messages):
+    return [
+        {"role": str(m.get("role", "")).strip().lower(), "content": " ".join(str(m.get("content") or "").split())}
+        for m in messages
+    ]
+
+
+def completion_key(messages, model, temperature, max_tokens):
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "max_tokens": max_tokens,
+         "messages": normalize_messages(messages)},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, path=AI_CACHE_PATH, ttl=AI_CACHE_TTL, max_entries=AI_CACHE_MAX_ENTRIES,
+                 disabled_endpoints=AI_CACHE_DISABLED_ENDPOINTS):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disabled_endpoints = set(disabled_endpoints)
+        self._local = threading.local()
+        self._schema_ready = set()  # pids que já criaram o schema
+        self._lock = threading.Lock()
+
+    def enabled_for(self, endpoint):
+        return self.max_entries > 0 and endpoint not in self.disabled_endpoints
+
+    def _connection(self):
+        # uma conexão por thread e por processo (conexões sqlite3 não atravessam fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if os.getpid() not in self._schema_ready:
+                conn.executescript(_SCHEMA)
+                self._schema_ready.add(os.getpid())
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, conn, endpoint, column):
+        conn.execute(
+            f"INSERT INTO counters (endpoint, {column}) VALUES (?, 1) "
+            f"ON CONFLICT (endpoint) DO UPDATE SET {column} = {column} + 1",
+            (endpoint or "default",),
+        )
+
+    def get(self, key, endpoint=None):
+        """Texto em cache ou None (miss, vencido ou erro do SQLite)."""
+        try:
+            conn = self._connection()
+            now = time.time()
+            row = conn.execute("SELECT response, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] + self.ttl < now:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(conn, endpoint, "misses")
+                return None
+            conn.execute("UPDATE completions SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._count(conn, endpoint, "hits")
+            return row[0]
+        except sqlite3.Error:
+            logger.warning("AI completion cache unavailable (get)", exc_info=True)
+            return None
+
+    def put(self, key, response, model, endpoint=None):
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, endpoint, model, response, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, endpoint, model, response, now, now),
+            )
+            excess = conn.execute("SELECT count(*) FROM completions").fetchone()[0] - self.max_entries
+            if excess > 0:
+                # apaga as vencidas e, se ainda faltar espaço, as menos acessadas
+                conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM completions WHERE key IN "
+                    "(SELECT key FROM completions ORDER BY last_access LIMIT max(0, (SELECT count(*) FROM completions) - ?))",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            logger.warning("AI completion cache unavailable (put)", exc_info=True)
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM completions")
+        conn.execute("DELETE FROM counters")
+
+    def stats(self):
+        try:
+            conn = self._connection()
+            entries = conn.execute("SELECT count(*) FROM completions").fetchone()[0]
+            endpoints = {}
+            for endpoint, hits, misses in conn.execute("SELECT endpoint, hits, misses FROM counters ORDER BY endpoint"):
+                lookups = hits + misses
+                endpoints[endpoint] = {
+                    "hits": hits, "misses": misses, "hit_rate": round(hits / lookups, 4) if lookups else None,
+                }
+        except sqlite3.Error as e:
+            return {"path": self.path, "error": str(e)}
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disabled_endpoints": sorted(self.disabled_endpoints),
+            "hits": sum(e["hits"] for e in endpoints.values()),
+            "misses": sum(e["misses"] for e in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+
+completion_cache = CompletionCache()
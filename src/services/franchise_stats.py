@@ -0,0 +1,346 @@
+# src/services/franchise_stats.py
+"""
+Manutenção incremental das tabelas de agregados do dashboard:
+
+- franchise_stats: totais por franquia (clientes, projetos e receita por status);
+- franchise_monthly_stats: série mensal por franquia, pelo mês de criação do
+  projeto (nº de projetos, aprovados/rejeitados, receita aprovada, soma das margens).
+
+As rotas de escrita chamam as funções record_* dentro da MESMA transação da
+alteração: cada chamada é um UPSERT "coluna = coluna + delta" por tabela, então
+os contadores só mudam se a escrita for commitada e atualizações concorrentes
+não se perdem (o banco serializa pelo lock da linha). `reconcile` e
+`backfill_monthly` recalculam a partir de clients/projects, para corrigir
+divergências (escritas feitas por fora das rotas, carga manual etc.).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+
+from src.models.client import Client
+from src.models.franchise_stats import FranchiseMonthlyStats, FranchiseStats
+from src.models.project import Project
+
+APPROVED_STATUS = "Aprovado"
+REJECTED_STATUS = "Rejeitado"
+STATUS_COLUMNS = {
+    "Rascunho": "projetos_rascunho",
+    "Enviado": "projetos_enviado",
+    "Aprovado": "projetos_aprovado",
+    "Rejeitado": "projetos_rejeitado",
+}
+OTHER_STATUS_COLUMN = "projetos_outros"
+REVENUE_COLUMNS = {
+    "Rascunho": "receita_rascunho",
+    "Enviado": "receita_enviado",
+    "Aprovado": "receita_aprovada",
+    "Rejeitado": "receita_rejeitado",
+}
+OTHER_REVENUE_COLUMN = "receita_outros"
+COUNTER_COLUMNS = ("total_clientes", *STATUS_COLUMNS.values(), OTHER_STATUS_COLUMN,
+                   *REVENUE_COLUMNS.values(), OTHER_REVENUE_COLUMN)
+MONTHLY_COLUMNS = ("total_projetos", "projetos_aprovados", "projetos_rejeitados", "receita_aprovada", "soma_margem")
+
+
+def status_column(status):
+    return STATUS_COLUMNS.get(status, OTHER_STATUS_COLUMN)
+
+
+def revenue_column(status):
+    return REVENUE_COLUMNS.get(status, OTHER_REVENUE_COLUMN)
+
+
+def month_start(value):
+    value = value or datetime.utcnow()
+    return date(value.year, value.month, 1)
+
+
+def _upsert_statement(dialect_name, table, key_columns, values, deltas):
+    if dialect_name not in ("postgresql", "sqlite"):
+        return None
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    set_ = {name: table.c[name] + delta for name, delta in deltas.items()}
+    set_["data_atualizacao"] = values["data_atualizacao"]
+    return dialect_insert(table).values(**values).on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns], set_=set_,
+    )
+
+
+def _add_to_row(session, model, columns, keys, deltas):
+    """Soma os deltas à linha identificada por `keys` (cria a linha se não existir)."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not keys.get("id_franqueado") or not deltas:
+        return
+    unknown = set(deltas) - set(columns)
+    if unknown:
+        raise ValueError(f"Unknown {model.__tablename__} columns: {sorted(unknown)}")
+
+    table = model.__table__
+    now = datetime.utcnow()
+    values = {name: 0 for name in columns}
+    values.update(deltas, data_atualizacao=now, **keys)
+
+    # a franquia segue junto para a invalidação do cache de respostas (services/response_cache.py)
+    options = {"response_cache_franchise": keys["id_franqueado"]}
+    stmt = _upsert_statement(session.get_bind().dialect.name, table, list(keys), values, deltas)
+    if stmt is not None:
+        session.execute(stmt.execution_options(**options))
+        return
+
+    # outros bancos: UPDATE e, se a linha ainda não existe, INSERT
+    result = session.execute(
+        update(table)
+        .where(and_(*(table.c[name] == value for name, value in keys.items())))
+        .values(data_atualizacao=now, **{name: table.c[name] + delta for name, delta in deltas.items()})
+        .execution_options(**options)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table).values(**values).execution_options(**options))
+
+
+def apply_delta(session, franchise_id, **deltas):
+    """Soma os deltas aos contadores de franchise_stats da franquia."""
+    _add_to_row(session, FranchiseStats, COUNTER_COLUMNS, {"id_franqueado": franchise_id}, deltas)
+
+
+def apply_monthly_delta(session, franchise_id, month, **deltas):
+    """Soma os deltas à linha (franquia, mês) de franchise_monthly_stats."""
+    _add_to_row(session, FranchiseMonthlyStats, MONTHLY_COLUMNS,
+                {"id_franqueado": franchise_id, "mes": month}, deltas)
+
+
+def _status_deltas(status, revenue, sign):
+    """Contribuição de um projeto com `status` para as colunas mensais dependentes de status."""
+    deltas = {}
+    if status == APPROVED_STATUS:
+        deltas["projetos_aprovados"] = sign
+        deltas["receita_aprovada"] = revenue * sign
+    elif status == REJECTED_STATUS:
+        deltas["projetos_rejeitados"] = sign
+    return deltas
+
+
+def record_client(session, franchise_id, delta=1):
+    apply_delta(session, franchise_id, total_clientes=delta)
+
+
+def record_project(session, project, delta=1):
+    """Projeto criado (delta=1) ou removido (delta=-1). Chamar após o flush (data_criacao preenchida)."""
+    revenue = Decimal(project.preco_venda_sugerido or 0)
+    apply_delta(session, project.id_franqueado, **{
+        status_column(project.status): delta,
+        revenue_column(project.status): revenue * delta,
+    })
+
+    monthly = _status_deltas(project.status, revenue, delta)
+    monthly["total_projetos"] = delta
+    monthly["soma_margem"] = Decimal(project.margem_lucro_aplicada or 0) * delta
+    apply_monthly_delta(session, project.id_franqueado, month_start(project.data_criacao), **monthly)
+
+
+def _status_change_deltas(old_status, new_status, revenue):
+    """(deltas de franchise_stats, deltas mensais) de um projeto que muda de status."""
+    deltas = {status_column(old_status): -1, revenue_column(old_status): -revenue}
+    deltas[status_column(new_status)] = deltas.get(status_column(new_status), 0) + 1
+    deltas[revenue_column(new_status)] = deltas.get(revenue_column(new_status), 0) + revenue
+
+    monthly = _status_deltas(old_status, revenue, -1)
+    for name, delta in _status_deltas(new_status, revenue, 1).items():
+        monthly[name] = monthly.get(name, 0) + delta
+    return deltas, monthly
+
+
+def record_status_change(session, project, new_status):
+    """Chamar antes de atribuir o novo status ao projeto."""
+    record_status_changes(session, [project], new_status)
+
+
+def record_status_changes(session, projects, new_status):
+    """
+    Várias mudanças de status de uma vez (antes do UPDATE). `projects` pode ter
+    objetos Project ou linhas com id_franqueado, status, preco_venda_sugerido e
+    data_criacao. Os deltas são somados por franquia e por (franquia, mês), então
+    o custo é um UPSERT por grupo e não por projeto.
+    """
+    totals, months = {}, {}
+    for project in projects:
+        if project.status == new_status:
+            continue
+        deltas, monthly = _status_change_deltas(
+            project.status, new_status, Decimal(project.preco_venda_sugerido or 0),
+        )
+        target = totals.setdefault(project.id_franqueado, {})
+        for name, delta in deltas.items():
+            target[name] = target.get(name, 0) + delta
+        target = months.setdefault((project.id_franqueado, month_start(project.data_criacao)), {})
+        for name, delta in monthly.items():
+            target[name] = target.get(name, 0) + delta
+
+    for franchise_id, deltas in totals.items():
+        apply_delta(session, franchise_id, **deltas)
+    for (franchise_id, month), deltas in months.items():
+        apply_monthly_delta(session, franchise_id, month, **deltas)
+
+
+def revenue_by_franchise(session, project_ids):
+    """Soma de preco_venda_sugerido dos projetos por franquia (antes/depois de um recálculo)."""
+    if not project_ids:
+        return {}
+    rows = session.execute(
+        select(Project.id_franqueado, func.sum(Project.preco_venda_sugerido))
+        .where(Project.id.in_(project_ids))
+        .group_by(Project.id_franqueado)
+    )
+    return {franchise_id: Decimal(revenue or 0) for franchise_id, revenue in rows}
+
+
+def record_revenue_change(session, status, before, after):
+    """
+    Diferença de receita (dicts de `revenue_by_franchise`) de projetos que
+    continuam no mesmo status, ex.: rascunhos recalculados. Só franchise_stats:
+    a série mensal guarda apenas a receita aprovada, que não é recalculada.
+    """
+    for franchise_id in set(before) | set(after):
+        delta = after.get(franchise_id, Decimal(0)) - before.get(franchise_id, Decimal(0))
+        apply_delta(session, franchise_id, **{revenue_column(status): delta})
+
+
+def get_stats(session, franchise_id):
+    """Leitura do dashboard: uma busca pela chave primária (None se a franquia não tem linha)."""
+    return session.get(FranchiseStats, franchise_id)
+
+
+def get_monthly(session, franchise_id, start_month, end_month):
+    """Linhas mensais da franquia entre os meses (inclusive), em ordem cronológica."""
+    return (
+        session.query(FranchiseMonthlyStats)
+        .filter(
+            FranchiseMonthlyStats.id_franqueado == franchise_id,
+            FranchiseMonthlyStats.mes >= start_month,
+            FranchiseMonthlyStats.mes <= end_month,
+        )
+        .order_by(FranchiseMonthlyStats.mes)
+        .all()
+    )
+
+
+def month_range(start_month, end_month):
+    months = []
+    current = start_month
+    while current <= end_month:
+        months.append(current)
+        current = _next_month(current)
+    return months
+
+
+def _empty_month(month):
+    return {
+        "month": month.strftime("%Y-%m"),
+        "project_count": 0,
+        "approved_count": 0,
+        "rejected_count": 0,
+        "approved_revenue": 0.0,
+        "average_margin": None,
+        "average_ticket": None,
+        "approval_rate": None,
+    }
+
+
+def monthly_series(session, franchise_id, start_month, end_month):
+    """Série mensal em dicts (meses sem projetos aparecem zerados)."""
+    rows = {r.mes: r.to_dict() for r in get_monthly(session, franchise_id, start_month, end_month)}
+    return [rows.get(month) or _empty_month(month) for month in month_range(start_month, end_month)]
+
+
+def reconcile(session):
+    """Recalcula franchise_stats do zero a partir de clients/projects. Retorna o nº de franquias."""
+    rows = {}
+
+    def row(franchise_id):
+        if franchise_id not in rows:
+            rows[franchise_id] = dict({name: 0 for name in COUNTER_COLUMNS}, id_franqueado=franchise_id)
+        return rows[franchise_id]
+
+    for franchise_id, count in session.query(Client.id_franqueado, func.count(Client.id)).group_by(Client.id_franqueado):
+        row(franchise_id)["total_clientes"] = count
+
+    project_totals = session.query(
+        Project.id_franqueado, Project.status, func.count(Project.id), func.sum(Project.preco_venda_sugerido),
+    ).group_by(Project.id_franqueado, Project.status)
+    for franchise_id, status, count, revenue in project_totals:
+        target = row(franchise_id)
+        target[status_column(status)] += count
+        target[revenue_column(status)] += Decimal(revenue or 0)
+
+    now = datetime.utcnow()
+    session.execute(delete(FranchiseStats.__table__))
+    if rows:
+        session.execute(insert(FranchiseStats.__table__), [dict(r, data_atualizacao=now) for r in rows.values()])
+    return len(rows)
+
+
+def _next_month(month, count=1):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def backfill_monthly(session, franchise_id=None, batch_months=12, read_batch_size=5000):
+    """
+    Recalcula franchise_monthly_stats em janelas de `batch_months` meses.
+    Cada janela lê só as colunas necessárias em lotes (yield_per), agrega em Python
+    (portável entre bancos, sem date_trunc/strftime), substitui as linhas da janela
+    e faz commit, para não manter uma transação longa. Retorna (janelas, linhas).
+    """
+    scope = [Project.id_franqueado == franchise_id] if franchise_id else []
+    first, last = session.query(func.min(Project.data_criacao), func.max(Project.data_criacao)).filter(*scope).one()
+    monthly_table = FranchiseMonthlyStats.__table__
+    monthly_scope = [monthly_table.c.id_franqueado == franchise_id] if franchise_id else []
+    if first is None:
+        session.execute(delete(monthly_table).where(*monthly_scope))
+        session.commit()
+        return 0, 0
+
+    windows = written = 0
+    window_start = month_start(first)
+    end = _next_month(month_start(last))
+    # meses fora do intervalo com projetos não têm mais dados
+    session.execute(delete(monthly_table).where(
+        *monthly_scope, or_(monthly_table.c.mes < window_start, monthly_table.c.mes >= end),
+    ))
+    while window_start < end:
+        window_end = min(_next_month(window_start, batch_months), end)
+        rows = {}
+        projects = (
+            session.query(Project.id_franqueado, Project.data_criacao, Project.status,
+                          Project.margem_lucro_aplicada, Project.preco_venda_sugerido)
+            .filter(*scope,
+                    Project.data_criacao >= datetime.combine(window_start, datetime.min.time()),
+                    Project.data_criacao < datetime.combine(window_end, datetime.min.time()))
+            .execution_options(yield_per=read_batch_size)
+        )
+        for project_franchise, created, status, margin, price in projects:
+            key = (project_franchise, month_start(created))
+            target = rows.get(key)
+            if target is None:
+                target = rows[key] = dict({name: 0 for name in MONTHLY_COLUMNS},
+                                          id_franqueado=project_franchise, mes=key[1])
+            target["total_projetos"] += 1
+            target["soma_margem"] += Decimal(margin or 0)
+            for name, delta in _status_deltas(status, Decimal(price or 0), 1).items():
+                target[name] += delta
+
+        session.execute(delete(monthly_table).where(
+            *monthly_scope, monthly_table.c.mes >= window_start, monthly_table.c.mes < window_end,
+        ))
+        if rows:
+            now = datetime.utcnow()
+            session.execute(insert(monthly_table), [dict(r, data_atualizacao=now) for r in rows.values()])
+        session.commit()
+        windows += 1
+        written += len(rows)
+        window_start = window_end
+    return windows, written
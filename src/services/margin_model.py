@@ -0,0 +1,234 @@
+# src/services/margin_model.py
+"""
+Otimizador local de margem (substitui o "chute" do LLM em /optimize-margins).
+
+Para cada franquia ajustamos uma regressão logística (NumPy, Newton/IRLS com
+regularização L2) da probabilidade de aprovação do projeto em função da margem
+aplicada e do tamanho do ticket (log do custo), usando o histórico de projetos
+já decididos ('Aprovado' x 'Rejeitado'). Com o modelo, a margem recomendada é a
+que maximiza o lucro esperado  P(aprovar | m, custo) * custo * m  dentro da
+faixa de margens das regras de preço.
+
+Os modelos ficam em cache por worker. A cada consulta uma agregação barata
+(contagem/somas dos projetos decididos) serve de "impressão digital": se mudou
+(projeto aprovado/rejeitado, criado ou apagado) o modelo é reajustado partindo
+dos coeficientes anteriores, o que converge em poucas iterações. Como a
+padronização das features é recalculada com os dados novos, os coeficientes
+anteriores são reescritos nela antes (`restandardize`): o ponto de partida é o
+mesmo modelo, não os números de outra escala.
+"""
+from collections import namedtuple
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import case, func
+
+from src.models.user import db
+from src.models.project import Project
+from src.services.scenarios import ScenarioError, parse_float
+
+APPROVED_STATUS = "Aprovado"
+REJECTED_STATUS = "Rejeitado"
+
+MIN_SAMPLES = 8            # abaixo disso a franquia usa o modelo global (todas as franquias)
+L2_PENALTY = 1.0
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-8
+MARGIN_STEP = 0.005
+DEFAULT_MAX_MARGIN_SPAN = 0.5  # usado quando as regras não definem margin_ranges.max
+
+MarginModel = namedtuple("MarginModel", [
+    "scope", "franchise_id", "coef", "mean", "scale",
+    "samples", "approved", "fingerprint", "iterations", "fitted_at",
+])
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35.0, 35.0)))
+
+
+def _design(margins, costs, mean, scale):
+    """Matriz [1, margem, log(custo)] com as colunas de features padronizadas."""
+    features = np.column_stack([margins, np.log1p(np.maximum(costs, 0.0))])
+    features = (features - mean) / scale
+    return np.column_stack([np.ones(len(features)), features])
+
+
+def fit_logistic(X, y, coef=None, penalty=L2_PENALTY, max_iter=MAX_ITERATIONS, tol=TOLERANCE):
+    """
+    Newton/IRLS com penalidade L2 (o intercepto não é penalizado).
+    Retorna (coeficientes, iterações). `coef` é o ponto de partida (warm start).
+    """
+    n_features = X.shape[1]
+    beta = np.zeros(n_features) if coef is None else np.array(coef, dtype=float)
+    reg = np.full(n_features, float(penalty))
+    reg[0] = 0.0
+    for iteration in range(1, max_iter + 1):
+        p = _sigmoid(X @ beta)
+        w = p * (1.0 - p)
+        gradient = X.T @ (y - p) - reg * beta
+        hessian = (X.T * w) @ X + np.diag(reg) + 1e-9 * np.eye(n_features)
+        step = np.linalg.solve(hessian, gradient)
+        beta = beta + step
+        if np.max(np.abs(step)) < tol:
+            break
+    return beta, iteration
+
+
+def restandardize(coef, mean, scale, new_mean, new_scale):
+    """Coeficientes equivalentes (mesmas probabilidades) para features padronizadas com new_mean/new_scale."""
+    raw = np.asarray(coef[1:], dtype=float) / scale      # pesos nas features sem padronização
+    intercept = coef[0] - raw @ mean
+    return np.concatenate([[intercept + raw @ new_mean], raw * new_scale])
+
+
+class MarginModelCache:
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self.fits = 0
+        self.reuses = 0
+
+    @staticmethod
+    def _decided(franchise_id):
+        query_filter = [Project.status.in_((APPROVED_STATUS, REJECTED_STATUS))]
+        if franchise_id is not None:
+            query_filter.append(Project.id_franqueado == franchise_id)
+        return query_filter
+
+    def _fingerprint(self, franchise_id):
+        row = db.session.query(
+            func.count(Project.id),
+            func.coalesce(func.sum(case((Project.status == APPROVED_STATUS, 1), else_=0)), 0),
+            func.coalesce(func.sum(Project.margem_lucro_aplicada), 0),
+            func.coalesce(func.sum(Project.custo_total_estimado), 0),
+        ).filter(*self._decided(franchise_id)).one()
+        return tuple(str(v) for v in row), int(row[0]), int(row[1])
+
+    def _fit(self, franchise_id, fingerprint, previous):
+        rows = db.session.query(
+            Project.margem_lucro_aplicada, Project.custo_total_estimado, Project.status,
+        ).filter(*self._decided(franchise_id)).all()
+        margins = np.array([float(r[0] or 0) for r in rows])
+        costs = np.array([float(r[1] or 0) for r in rows])
+        y = np.array([1.0 if r[2] == APPROVED_STATUS else 0.0 for r in rows])
+
+        raw = np.column_stack([margins, np.log1p(np.maximum(costs, 0.0))])
+        mean = raw.mean(axis=0)
+        scale = raw.std(axis=0)
+        scale[scale < 1e-9] = 1.0
+        X = _design(margins, costs, mean, scale)
+        start = None
+        if previous is not None:
+            start = restandardize(previous.coef, previous.mean, previous.scale, mean, scale)
+        coef, iterations = fit_logistic(X, y, start)
+        self.fits += 1
+        return MarginModel(
+            "franchise" if franchise_id is not None else "global", franchise_id,
+            coef, mean, scale, len(y), int(y.sum()), fingerprint, iterations, time.time(),
+        )
+
+    def get(self, franchise_id):
+        """Modelo atualizado para a franquia (ou None se não houver dados suficientes)."""
+        fingerprint, samples, approved = self._fingerprint(franchise_id)
+        if samples < MIN_SAMPLES or approved == 0 or approved == samples:
+            return None
+        with self._lock:
+            previous = self._models.get(franchise_id)
+            if previous is not None and previous.fingerprint == fingerprint:
+                self.reuses += 1
+                return previous
+        model = self._fit(franchise_id, fingerprint, previous)
+        with self._lock:
+            self._models[franchise_id] = model
+        return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"models": len(self._models), "fits": self.fits, "reuses": self.reuses}
+
+
+model_cache = MarginModelCache()
+
+
+def approval_probability(model, margins, cost):
+    margins = np.asarray(margins, dtype=float)
+    X = _design(margins, np.full(margins.shape, cost), model.mean, model.scale)
+    return _sigmoid(X @ model.coef)
+
+
+def margin_bounds(rules):
+    low = float(rules.margin_ranges["min"])
+    high = rules.margin_ranges.get("max")
+    high = float(high) if high is not None else low + DEFAULT_MAX_MARGIN_SPAN
+    return low, max(low, high)
+
+
+def optimize_margin(rules, franchise_id, total_cost, min_margin=None, max_margin=None):
+    """
+    Margem que maximiza o lucro esperado para um projeto de custo `total_cost`.
+    Usa o modelo da franquia; sem histórico suficiente cai para o modelo global
+    e, sem nenhum, para a margem padrão das regras.
+    """
+    total_cost = parse_float(total_cost, "total_cost")
+    if total_cost <= 0:
+        raise ScenarioError("'total_cost' must be greater than zero")
+    low, high = margin_bounds(rules)
+    if min_margin is not None:
+        low = max(low, parse_float(min_margin, "min_margin"))
+    if max_margin is not None:
+        high = min(high, parse_float(max_margin, "max_margin"))
+    if low > high:
+        raise ScenarioError("Empty margin range")
+
+    model = model_cache.get(franchise_id) if franchise_id else None
+    if model is None:
+        model = model_cache.get(None)
+
+    if model is None:
+        margin = float(rules.margin_ranges.get("default", rules.margin_ranges["min"]))
+        margin = min(max(margin, low), high)
+        return {
+            "recommended_margin": round(margin, 4),
+            "selling_price": round(total_cost * (1 + margin), 2),
+            "approval_probability": None,
+            "expected_profit": None,
+            "method": "rules_default",
+            "model": None,
+        }
+
+    grid = np.round(np.arange(low, high + MARGIN_STEP / 2, MARGIN_STEP), 6)
+    probability = approval_probability(model, grid, total_cost)
+    expected_profit = probability * total_cost * grid
+    best = int(np.argmax(expected_profit))
+    margin = float(grid[best])
+
+    # pontos da curva para o front (até ~20)
+    stride = max(1, len(grid) // 20)
+    curve = [
+        {"margin": float(grid[i]), "approval_probability": round(float(probability[i]), 4),
+         "expected_profit": round(float(expected_profit[i]), 2)}
+        for i in range(0, len(grid), stride)
+    ]
+    return {
+        "recommended_margin": margin,
+        "selling_price": round(total_cost * (1 + margin), 2),
+        "approval_probability": round(float(probability[best]), 4),
+        "expected_profit": round(float(expected_profit[best]), 2),
+        "method": "logistic",
+        "model": {
+            "scope": model.scope,
+            "samples": model.samples,
+            "approved": model.approved,
+            "iterations": model.iterations,
+            "margin_coefficient": round(float(model.coef[1] / model.scale[0]), 4),
+            # coeficiente >= 0: o histórico não mostra a aprovação caindo com a margem
+            "margin_sensitive": bool(model.coef[1] < 0),
+        },
+        "curve": curve,
+    }
@@ -0,0 +1,281 @@
+# src/services/material_import.py
+"""
+Importação da planilha de preços do fornecedor para `materials`, por conjunto.
+
+1) O CSV é lido em streaming e gravado na tabela material_import_staging sob um
+   `lote` (uuid), em INSERTs executemany de STAGING_BATCH_SIZE linhas;
+2) um único SELECT (staging LEFT JOIN materials por nome) devolve só as linhas
+   novas ou alteradas, com os valores antigos, para o relatório de diferenças;
+3) um único INSERT ... SELECT ... ON CONFLICT (nome) DO UPDATE aplica o diff
+   (PostgreSQL/SQLite; nos demais bancos, UPDATE executemany + INSERT ... SELECT);
+4) as linhas do lote saem da staging.
+
+Tudo na mesma transação: ou a planilha inteira entra, ou nada muda. Colunas
+opcionais vazias (unidade, descrição) mantêm o valor atual do material.
+data_atualizacao muda junto com o custo, o que invalida o quote_cache
+(chave por material_version), e o UPSERT passa pela Session, então o cache de
+/materials é invalidado no commit (services/response_cache.py).
+"""
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import io
+import uuid
+
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, or_, select, update
+
+from src.models.material import Material, MaterialImportStaging
+from src.services import repricing
+from src.services.client_import import sniffed_reader
+
+STAGING_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+MAX_COST = Decimal("99999999.99")  # Numeric(10, 2)
+
+HEADER_ALIASES = {
+    "nome": "nome", "name": "nome", "material": "nome", "produto": "nome", "sku": "nome",
+    "custo": "custo_unitario_base", "custo_unitario_base": "custo_unitario_base", "custo unitario": "custo_unitario_base",
+    "preco": "custo_unitario_base", "preço": "custo_unitario_base", "price": "custo_unitario_base", "cost": "custo_unitario_base",
+    "unidade": "unidade_medida", "unidade_medida": "unidade_medida", "unit": "unidade_medida",
+    "descricao": "descricao", "descrição": "descricao", "description": "descricao",
+}
+MAX_LENGTHS = {"nome": 200, "unidade_medida": 10}
+
+
+class MaterialImportError(ValueError):
+    """Planilha inválida: nada é gravado."""
+
+
+def parse_cost(value):
+    """'12.5', '12,50', '1.234,56' ou 'R$ 1.234,56' -> Decimal com 2 casas (None se inválido)."""
+    raw = (value or "").replace("R$", "").replace(" ", "").strip()
+    if "," in raw:
+        raw = raw.replace(".", "").replace(",", ".")
+    try:
+        cost = Decimal(raw).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+    if not cost.is_finite() or cost < 0 or cost > MAX_COST:
+        return None
+    return cost
+
+
+def _header_map(fieldnames):
+    if not fieldnames:
+        raise MaterialImportError("CSV file is empty or has no header")
+    mapping = {}
+    for name in fieldnames:
+        column = HEADER_ALIASES.get((name or "").strip().lower())
+        if column and column not in mapping.values():
+            mapping[name] = column
+    missing = {"nome", "custo_unitario_base"} - set(mapping.values())
+    if missing:
+        raise MaterialImportError(f"CSV header must include {', '.join(sorted(missing))}")
+    return mapping
+
+
+def _stage(session, batch_id, reader, mapping, errors):
+    """Grava as linhas válidas na staging. Retorna (linhas lidas, linhas gravadas)."""
+    rows = staged = 0
+    seen = set()
+    batch = []
+    for row in reader:
+        rows += 1
+        record = {column: (row.get(name) or "").strip() for name, column in mapping.items()}
+        problems = []
+        if not record["nome"]:
+            problems.append("nome is required")
+        for column, max_length in MAX_LENGTHS.items():
+            if len(record.get(column) or "") > max_length:
+                problems.append(f"{column} longer than {max_length} characters")
+        cost = parse_cost(record["custo_unitario_base"])
+        if cost is None:
+            problems.append(f"invalid custo '{record['custo_unitario_base']}'")
+        if record["nome"] in seen:
+            problems.append("duplicate nome in file")
+        if problems:
+            errors.append({"line": reader.line_num, "errors": problems})
+            continue
+
+        seen.add(record["nome"])
+        batch.append({
+            "lote": batch_id,
+            "linha": reader.line_num,
+            "novo_id": str(uuid.uuid4()),
+            "nome": record["nome"],
+            "unidade_medida": record.get("unidade_medida") or None,
+            "custo_unitario_base": cost,
+            "descricao": record.get("descricao") or None,
+        })
+        if len(batch) >= STAGING_BATCH_SIZE:
+            session.execute(insert(MaterialImportStaging), batch)
+            staged += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(MaterialImportStaging), batch)
+        staged += len(batch)
+    return rows, staged
+
+
+def _diff_select(batch_id, now):
+    """Linhas do lote que criam ou alteram um material, já com os valores finais."""
+    staging, materials = MaterialImportStaging.__table__, Material.__table__
+    unidade = func.coalesce(staging.c.unidade_medida, materials.c.unidade_medida, "unidade")
+    descricao = func.coalesce(staging.c.descricao, materials.c.descricao)
+    changed = or_(
+        materials.c.id.is_(None),
+        materials.c.custo_unitario_base != staging.c.custo_unitario_base,
+        materials.c.unidade_medida != unidade,
+        and_(staging.c.descricao.isnot(None),
+             or_(materials.c.descricao.is_(None), materials.c.descricao != staging.c.descricao)),
+    )
+    return (
+        select(
+            func.coalesce(materials.c.id, staging.c.novo_id).label("id"),
+            staging.c.nome,
+            unidade.label("unidade_medida"),
+            staging.c.custo_unitario_base,
+            descricao.label("descricao"),
+            literal(now).label("data_atualizacao"),
+        )
+        .select_from(staging.outerjoin(materials, materials.c.nome == staging.c.nome))
+        .where(staging.c.lote == batch_id, changed)
+    ), materials
+
+
+def _apply(session, batch_id, now, changes):
+    diff, materials = _diff_select(batch_id, now)
+    columns = ["id", "nome", "unidade_medida", "custo_unitario_base", "descricao", "data_atualizacao"]
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(materials).from_select(columns, diff)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[materials.c.nome],
+            set_={name: stmt.excluded[name] for name in columns if name not in ("id", "nome")},
+        ))
+        return
+
+    # outros bancos: os materiais existentes por UPDATE executemany, os novos por INSERT ... SELECT
+    updates = [
+        {"b_id": c["id"], "b_unidade": c["unidade_medida"], "b_custo": c["new_cost"], "b_descricao": c["descricao"]}
+        for c in changes if c["action"] == "updated"
+    ]
+    if updates:
+        session.execute(
+            update(materials).where(materials.c.id == bindparam("b_id")).values(
+                unidade_medida=bindparam("b_unidade"), custo_unitario_base=bindparam("b_custo"),
+                descricao=bindparam("b_descricao"), data_atualizacao=now,
+            ),
+            updates,
+        )
+    if any(c["action"] == "inserted" for c in changes):
+        new_rows = diff.where(materials.c.id.is_(None))
+        session.execute(insert(materials).from_select(columns, new_rows))
+
+
+def import_price_sheet(session, binary_stream, resolve_rules=None, dry_run=False, encoding="utf-8-sig"):
+    """
+    Importa a planilha de `binary_stream` e faz commit (rollback se dry_run).
+    Com `resolve_rules`, recalcula na mesma transação os rascunhos que usam
+    materiais cujo custo mudou (services/repricing.py). Retorna o relatório.
+    """
+    batch_id = str(uuid.uuid4())
+    errors = []
+    text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline="")
+    try:
+        reader = sniffed_reader(text_stream)
+        mapping = _header_map(reader.fieldnames)
+        rows, staged = _stage(session, batch_id, reader, mapping, errors)
+        if errors and not staged:
+            raise MaterialImportError("No valid rows in file")
+
+        now = datetime.utcnow()
+        diff, materials = _diff_select(batch_id, now)
+        staging = MaterialImportStaging.__table__
+        result = session.execute(
+            diff.add_columns(
+                staging.c.linha,
+                materials.c.id.label("old_id"),
+                materials.c.custo_unitario_base.label("old_cost"),
+                materials.c.unidade_medida.label("old_unidade"),
+            ).order_by(staging.c.linha)
+        ).mappings()
+
+        changes = []
+        for row in result:
+            new_cost = Decimal(row["custo_unitario_base"])
+            exists = row["old_id"] is not None
+            change = {
+                "id": row["id"],
+                "nome": row["nome"],
+                "line": row["linha"],
+                "action": "updated" if exists else "inserted",
+                "unidade_medida": row["unidade_medida"],
+                "descricao": row["descricao"],
+                "old_cost": None,
+                "new_cost": new_cost,
+                "delta": None,
+                "delta_percent": None,
+            }
+            if exists:
+                old_cost = Decimal(row["old_cost"])
+                change["old_cost"] = old_cost
+                change["delta"] = new_cost - old_cost
+                if old_cost:
+                    change["delta_percent"] = round(float((new_cost - old_cost) / old_cost * 100), 2)
+                if row["old_unidade"] != row["unidade_medida"]:
+                    change["old_unidade_medida"] = row["old_unidade"]
+            changes.append(change)
+
+        if changes:
+            _apply(session, batch_id, now, changes)
+        session.execute(delete(staging).where(staging.c.lote == batch_id))
+
+        cost_changed = [c["id"] for c in changes if c["action"] == "updated" and c["delta"]]
+        repriced = None
+        if resolve_rules is not None and cost_changed:
+            repriced = repricing.reprice_drafts(resolve_rules, material_ids=cost_changed)
+
+        if dry_run:
+            session.rollback()
+        else:
+            session.commit()
+    except UnicodeDecodeError:
+        session.rollback()
+        raise MaterialImportError(f"CSV must be encoded as {encoding}")
+    except csv.Error as e:
+        session.rollback()
+        raise MaterialImportError(f"Malformed CSV: {e}")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        text_stream.detach()
+
+    inserted = sum(1 for c in changes if c["action"] == "inserted")
+    return {
+        "dry_run": bool(dry_run),
+        "rows": rows,
+        "staged": staged,
+        "inserted": inserted,
+        "updated": len(changes) - inserted,
+        "unchanged": staged - len(changes),
+        "invalid": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "errors_truncated": len(errors) > MAX_REPORTED_ERRORS,
+        "changes": [_serialize(c) for c in changes],
+        "repricing": repriced,
+    }
+
+
+def _serialize(change):
+    data = dict(change)
+    for name in ("old_cost", "new_cost", "delta"):
+        if data[name] is not None:
+            data[name] = float(data[name])
+    data.pop("descricao")
+    return data
@@ -0,0 +1,72 @@
+# src/services/pagination.py
+"""
+Paginação por cursor (keyset) para listagens grandes.
+
+A ordem é (data de criação DESC, id DESC) e o cursor guarda os valores da
+última linha da página. A próxima página filtra "depois" dessa linha em vez de
+usar OFFSET, então com o índice composto (filtro, data, id) o custo de buscar
+qualquer página é o mesmo, não importa a profundidade.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise PaginationError("Invalid cursor")
+
+
+def parse_limit(value):
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError("'limit' must be an integer")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise PaginationError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def wants_page(args):
+    """Só pagina quando o cliente pede (limit/cursor); sem eles a resposta continua sendo a lista completa."""
+    return "limit" in args or "cursor" in args
+
+
+def paginate(query, created_column, id_column, limit, cursor=None):
+    """
+    Aplica ordem + filtro keyset à query e retorna (linhas, next_cursor).
+    Busca limit + 1 linhas para saber se existe próxima página.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < row_id),
+        ))
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,186 @@
+# src/services/pricing_engine.py
+"""
+Núcleo de precificação em aritmética inteira (ponto fixo), sem dependência de Flask.
+
+Fórmula (a mesma que estava duplicada em calculate_price/create_project):
+    material_cost = quantidade * custo_unitario * material_multiplier
+    labor_cost    = diaria(nivel_funcionario) * dias * envelopadores
+    total_cost    = (material_cost + labor_cost) * (1 + tax_rate)
+    selling_price = total_cost * (1 + margem)
+
+Regras de arredondamento:
+- entradas (quantidade, dias, envelopadores, custos, coeficientes, margem) são
+  representadas com 4 casas decimais (UNIT_SCALE); valores com mais casas são
+  arredondados ROUND_HALF_UP;
+- os produtos são calculados exatamente em inteiros e cada resultado é
+  arredondado uma única vez para centavos, ROUND_HALF_UP.
+Assim, para entradas com até 4 casas, o resultado é idêntico ao caminho Decimal
+quantizado em centavos (ver src/test_pricing_engine.py).
+
+Para cada snapshot de regras os coeficientes por (nível de dificuldade,
+nível de funcionário) são pré-compilados e reaproveitados enquanto a versão
+das regras não mudar.
+"""
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import threading
+
+UNIT_DIGITS = 4
+UNIT_SCALE = 10 ** UNIT_DIGITS
+CENTS_DIGITS = 2
+
+_UNIT_QUANT = Decimal(1).scaleb(-UNIT_DIGITS)
+_CENTS = Decimal("0.01")
+
+
+class PricingError(ValueError):
+    """Entrada inválida para o motor (nível desconhecido, número inválido...)."""
+
+
+def to_units(value, field_name):
+    """Converte um número para inteiro em unidades de 10^-4 (ROUND_HALF_UP)."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value * UNIT_SCALE
+    if isinstance(value, bool):
+        raise PricingError(f"Invalid decimal value for '{field_name}': {value!r}")
+    try:
+        dec = value if isinstance(value, Decimal) else Decimal(str(value))
+        if not dec.is_finite():
+            raise InvalidOperation
+        return int(dec.quantize(_UNIT_QUANT, rounding=ROUND_HALF_UP).scaleb(UNIT_DIGITS))
+    except (InvalidOperation, TypeError, ValueError):
+        raise PricingError(f"Invalid decimal value for '{field_name}': {value!r}")
+
+
+def _round_div(n, d):
+    """n / d arredondado para o inteiro mais próximo, meio para longe do zero."""
+    q, r = divmod(abs(n), d)
+    if 2 * r >= d:
+        q += 1
+    return q if n >= 0 else -q
+
+
+def cents_to_decimal(cents):
+    return Decimal(cents).scaleb(-CENTS_DIGITS)
+
+
+def decimal_to_cents(value):
+    return int(Decimal(str(value)).quantize(_CENTS, rounding=ROUND_HALF_UP).scaleb(CENTS_DIGITS))
+
+
+# Divisores para levar cada produto (em potências de 10^-4) a centavos
+_TO_CENTS_3 = 10 ** (3 * UNIT_DIGITS - CENTS_DIGITS)   # q * c * m
+_TO_CENTS_4 = 10 ** (4 * UNIT_DIGITS - CENTS_DIGITS)   # (...) * (1 + tax)
+_TO_CENTS_5 = 10 ** (5 * UNIT_DIGITS - CENTS_DIGITS)   # (...) * (1 + margem)
+
+
+Coefficients = namedtuple("Coefficients", [
+    "material_multiplier",   # M
+    "daily_rate",            # R
+    "tax_factor",            # 1 + tax_rate
+    "material_tax_coef",     # M * (1 + tax)
+    "labor_tax_coef",        # R * (1 + tax)
+    "tax_rate",              # Decimal, apenas para exibição
+])
+
+
+class Quote(namedtuple("Quote", [
+    "material_cost", "labor_cost", "total_cost_before_tax", "total_cost", "selling_price",
+    "tax_rate", "margin",
+])):
+    """Resultado em centavos (int); tax_rate e margin em Decimal."""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            "material_cost": self.material_cost / 100,
+            "labor_cost": self.labor_cost / 100,
+            "total_cost_before_tax": self.total_cost_before_tax / 100,
+            "tax_rate_applied": float(self.tax_rate),
+            "total_cost": self.total_cost / 100,
+            "margin_applied": float(self.margin),
+            "selling_price": self.selling_price / 100,
+        }
+
+
+class PricingEngine:
+    """Tabelas de coeficientes compiladas a partir de um snapshot PricingRules."""
+
+    def __init__(self, rules):
+        self.version = rules.version
+        self.default_margin = rules.margin_ranges["min"]
+        self.default_margin_factor = UNIT_SCALE + to_units(self.default_margin, "margin_ranges.min")
+        self.employee_levels = frozenset(rules.employee_rates)
+        self.difficulty_levels = frozenset(rules.difficulty_factors)
+
+        rates = {level: to_units(rate, f"employee_rates.{level}")
+                 for level, rate in rules.employee_rates.items()}
+        table = {}
+        for nivel, factor in rules.difficulty_factors.items():
+            m = to_units(factor["material_multiplier"], f"difficulty_factors.{nivel}.material_multiplier")
+            t1 = UNIT_SCALE + to_units(factor["tax_rate"], f"difficulty_factors.{nivel}.tax_rate")
+            for level, r in rates.items():
+                table[(nivel, level)] = Coefficients(m, r, t1, m * t1, r * t1, factor["tax_rate"])
+        self.table = table
+
+    def coefficients(self, difficulty_level, employee_level):
+        try:
+            return self.table[(difficulty_level, employee_level)]
+        except KeyError:
+            if employee_level not in self.employee_levels:
+                raise PricingError(f"Invalid employee level: {employee_level}")
+            raise PricingError(f"Difficulty data not found for level: {difficulty_level}")
+
+    def margin_factor(self, margin):
+        if margin is None:
+            return self.default_margin_factor
+        return UNIT_SCALE + to_units(margin, "margin")
+
+    def quote(self, difficulty_level, employee_level, unit_cost, quantity,
+              estimated_days, num_envelopers, margin=None):
+        coef = self.coefficients(difficulty_level, employee_level)
+        return self.quote_units(
+            coef,
+            to_units(unit_cost, "custo_unitario_base"),
+            to_units(quantity, "quantity"),
+            to_units(estimated_days, "estimated_days"),
+            to_units(num_envelopers, "num_envelopers"),
+            self.margin_factor(margin),
+            self.default_margin if margin is None else Decimal(str(margin)),
+        )
+
+    @staticmethod
+    def quote_units(coef, cost, quantity, days, envelopers, margin_factor, margin):
+        """Caminho quente: todas as entradas já em unidades inteiras de 10^-4."""
+        qc = quantity * cost
+        de = days * envelopers
+        material = qc * coef.material_multiplier
+        labor = de * coef.daily_rate
+        total = qc * coef.material_tax_coef + de * coef.labor_tax_coef
+        return Quote(
+            _round_div(material, _TO_CENTS_3),
+            _round_div(labor, _TO_CENTS_3),
+            _round_div(material + labor, _TO_CENTS_3),
+            _round_div(total, _TO_CENTS_4),
+            _round_div(total * margin_factor, _TO_CENTS_5),
+            coef.tax_rate,
+            margin,
+        )
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+_MAX_ENGINES = 32
+
+
+def get_engine(rules):
+    """Retorna o motor compilado para a versão das regras (compila uma vez por versão)."""
+    engine = _engines.get(rules.version)
+    if engine is None:
+        engine = PricingEngine(rules)
+        with _engines_lock:
+            if len(_engines) >= _MAX_ENGINES:
+                _engines.clear()
+            _engines[rules.version] = engine
+    return engine
@@ -0,0 +1,209 @@
+# src/services/pricing_rules.py
+"""
+Regras de precificação carregadas uma vez por worker.
+
+O JSON (src/extracted_pricing_data.json) é lido, validado e convertido em um
+snapshot imutável com hash de versão. A cada chamada de get_pricing_rules()
+verificamos no máximo uma vez por intervalo (PRICING_RULES_RELOAD_INTERVAL,
+em segundos) se o arquivo mudou (mtime/tamanho); se mudou e o conteúdo novo é
+válido, o snapshot é trocado atomicamente. Se o arquivo novo for inválido,
+o último snapshot bom continua em uso.
+"""
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from types import MappingProxyType
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DATA_PATH = (Path(__file__).resolve().parents[1] / "extracted_pricing_data.json")
+RELOAD_INTERVAL = float(os.getenv("PRICING_RULES_RELOAD_INTERVAL", "2"))
+
+
+class PricingRulesError(RuntimeError):
+    """Regras ausentes ou inválidas (e nenhum snapshot anterior disponível)."""
+
+
+def _decimal(value, field_name):
+    if isinstance(value, bool):
+        raise PricingRulesError(f"Invalid decimal value for '{field_name}': {value!r}")
+    try:
+        result = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        raise PricingRulesError(f"Invalid decimal value for '{field_name}': {value!r}")
+    if not result.is_finite():
+        raise PricingRulesError(f"Invalid decimal value for '{field_name}': {value!r}")
+    return result
+
+
+class PricingRules:
+    """
+    Snapshot imutável das regras.
+    - data: dict original (somente leitura)
+    - employee_rates: {nivel_funcionario: Decimal}
+    - difficulty_factors: {nivel: {"material_multiplier": Decimal, "tax_rate": Decimal}}
+    - margin_ranges: {"min"/"default"/"max": Decimal}
+    - version: hash curto do conteúdo
+    """
+
+    __slots__ = ("data", "employee_rates", "difficulty_factors", "margin_ranges",
+                 "version", "source", "loaded_at")
+
+    def __init__(self, data, version, source="file"):
+        if not isinstance(data, dict):
+            raise PricingRulesError("pricing rules must be a JSON object")
+
+        rates = data.get("employee_rates")
+        if not isinstance(rates, dict) or not rates:
+            raise PricingRulesError("'employee_rates' must be a non-empty object")
+        employee_rates = {
+            str(level): _decimal(rate, f"employee_rates.{level}")
+            for level, rate in rates.items()
+        }
+
+        factors = data.get("difficulty_factors")
+        if not isinstance(factors, dict) or not factors:
+            raise PricingRulesError("'difficulty_factors' must be a non-empty object")
+        difficulty_factors = {}
+        for level, factor in factors.items():
+            if not isinstance(factor, dict):
+                raise PricingRulesError(f"'difficulty_factors.{level}' must be an object")
+            difficulty_factors[str(level)] = MappingProxyType({
+                "material_multiplier": _decimal(factor.get("material_multiplier", "1"),
+                                                f"difficulty_factors.{level}.material_multiplier"),
+                "tax_rate": _decimal(factor.get("tax_rate", "0"),
+                                     f"difficulty_factors.{level}.tax_rate"),
+            })
+
+        ranges = data.get("margin_ranges", {})
+        if not isinstance(ranges, dict):
+            raise PricingRulesError("'margin_ranges' must be an object")
+        margin_ranges = {k: _decimal(v, f"margin_ranges.{k}") for k, v in ranges.items()}
+        margin_ranges.setdefault("min", Decimal("0"))
+
+        set_ = object.__setattr__
+        set_(self, "data", MappingProxyType(data))
+        set_(self, "employee_rates", MappingProxyType(employee_rates))
+        set_(self, "difficulty_factors", MappingProxyType(difficulty_factors))
+        set_(self, "margin_ranges", MappingProxyType(margin_ranges))
+        set_(self, "version", version)
+        set_(self, "source", source)
+        set_(self, "loaded_at", time.time())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PricingRules is immutable")
+
+    def __repr__(self):
+        return f"<PricingRules {self.source}:{self.version}>"
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "employee_rates": {k: float(v) for k, v in self.employee_rates.items()},
+            "difficulty_factors": {
+                k: {kk: float(vv) for kk, vv in v.items()}
+                for k, v in self.difficulty_factors.items()
+            },
+            "margin_ranges": {k: float(v) for k, v in self.margin_ranges.items()},
+        }
+
+
+def content_version(raw_bytes):
+    return hashlib.sha256(raw_bytes).hexdigest()[:12]
+
+
+class _FileRulesStore:
+    """Mantém o snapshot do arquivo e o recarrega quando o arquivo muda."""
+
+    def __init__(self, path, interval):
+        self.path = Path(path)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._error = None
+        self._stat_key = None
+        self._next_check = 0.0
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._next_check:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or time.monotonic() >= self._next_check:
+                self._refresh()
+            if self._snapshot is None:
+                raise PricingRulesError(self._error or f"failed to load {self.path.name}")
+            return self._snapshot
+
+    def reload(self):
+        """Força a releitura do arquivo (ignora o intervalo e o mtime)."""
+        with self._lock:
+            self._stat_key = None
+            self._refresh()
+            if self._snapshot is None:
+                raise PricingRulesError(self._error or f"failed to load {self.path.name}")
+            return self._snapshot
+
+    def _refresh(self):
+        self._next_check = time.monotonic() + self.interval
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            self._fail(f"file not found: {self.path.name}")
+            return
+        except OSError as e:
+            self._fail(f"failed to load {self.path.name}: {e}")
+            return
+
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key == self._stat_key and self._snapshot is not None:
+            return
+
+        try:
+            raw = self.path.read_bytes()
+            version = content_version(raw)
+            if self._snapshot is not None and self._snapshot.version == version:
+                self._stat_key = stat_key
+                return
+            snapshot = PricingRules(json.loads(raw.decode("utf-8")), version)
+        except json.JSONDecodeError as e:
+            self._fail(f"invalid JSON in {self.path.name}: {e}")
+            return
+        except PricingRulesError as e:
+            self._fail(f"invalid rules in {self.path.name}: {e}")
+            return
+        except Exception as e:
+            self._fail(f"failed to load {self.path.name}: {e}")
+            return
+
+        self._stat_key = stat_key
+        self._snapshot = snapshot
+        self._error = None
+        logger.info("pricing rules loaded (version %s)", version)
+
+    def _fail(self, message):
+        self._error = message
+        if self._snapshot is not None:
+            logger.warning("%s; keeping pricing rules version %s", message, self._snapshot.version)
+
+
+_store = _FileRulesStore(DATA_PATH, RELOAD_INTERVAL)
+
+
+def get_pricing_rules():
+    """
+    Retorna o snapshot de regras em uso (sem I/O na maior parte das chamadas).
+    Levanta PricingRulesError se nunca foi possível carregar regras válidas.
+    """
+    return _store.get()
+
+
+def reload_pricing_rules():
+    return _store.reload()
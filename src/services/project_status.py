@@ -0,0 +1,84 @@
+# src/services/project_status.py
+"""
+Mudança de status de vários projetos em uma requisição (ex.: envio dos
+orçamentos do fim do mês).
+
+Um SELECT (com FOR UPDATE no PostgreSQL) valida os projetos e traz só as
+colunas usadas pelos agregados; um único UPDATE ... WHERE id IN aplica o novo
+status aos que mudam, e os deltas de franchise_stats/franchise_monthly_stats
+são somados por franquia (e mês) na mesma transação.
+"""
+from sqlalchemy import select, update
+
+from src.models.project import Project
+from src.services import franchise_stats
+
+MAX_BULK_PROJECTS = 1000
+
+
+class BulkStatusError(ValueError):
+    pass
+
+
+def _selection(ids, franchise_id, current_status, client_id):
+    stmt = select(
+        Project.id, Project.id_franqueado, Project.status,
+        Project.preco_venda_sugerido, Project.data_criacao,
+    )
+    if ids is not None:
+        stmt = stmt.where(Project.id.in_(ids))
+    if franchise_id:
+        stmt = stmt.where(Project.id_franqueado == franchise_id)
+    if current_status:
+        stmt = stmt.where(Project.status == current_status)
+    if client_id:
+        stmt = stmt.where(Project.id_cliente == client_id)
+    return stmt
+
+
+def bulk_update_status(session, new_status, ids=None, franchise_id=None, current_status=None, client_id=None):
+    """
+    Aplica `new_status` aos projetos em `ids` ou, sem ids, aos que casam com o
+    filtro (franchise_id obrigatório). Não faz commit. Retorna o resultado por id:
+    'updated' (com o status anterior), 'unchanged' ou 'not_found'.
+    """
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+            raise BulkStatusError("'ids' must be a list of project ids")
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise BulkStatusError("'ids' must not be empty")
+        if len(ids) > MAX_BULK_PROJECTS:
+            raise BulkStatusError(f"At most {MAX_BULK_PROJECTS} projects per request")
+    elif not franchise_id:
+        raise BulkStatusError("Provide 'ids' or a filter with 'franchisee_id'")
+
+    stmt = _selection(ids, franchise_id, current_status, client_id).with_for_update()
+    if ids is None:
+        stmt = stmt.order_by(Project.data_criacao, Project.id).limit(MAX_BULK_PROJECTS + 1)
+    rows = session.execute(stmt).all()
+    if ids is None and len(rows) > MAX_BULK_PROJECTS:
+        raise BulkStatusError(f"Filter matches more than {MAX_BULK_PROJECTS} projects; narrow it or send ids")
+
+    found = {row.id: row for row in rows}
+    changing = [row for row in rows if row.status != new_status]
+    if changing:
+        franchise_stats.record_status_changes(session, changing, new_status)
+        session.execute(
+            update(Project)
+            .where(Project.id.in_([row.id for row in changing]))
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+
+    results = []
+    for project_id in (ids if ids is not None else list(found)):
+        row = found.get(project_id)
+        if row is None:
+            results.append({"id": project_id, "outcome": "not_found"})
+        elif row.status == new_status:
+            results.append({"id": project_id, "outcome": "unchanged", "status": new_status})
+        else:
+            results.append({"id": project_id, "outcome": "updated", "previous_status": row.status,
+                            "status": new_status})
+    return results
@@ -0,0 +1,36 @@
+# src/services/query_stats.py
+"""Contagem de statements SQL executados (por thread) para medir endpoints."""
+import threading
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """
+    Context manager que conta os statements enviados ao banco pela thread atual.
+    Um executemany conta como um statement.
+
+        with QueryCounter(db.engine) as counter:
+            ...
+        counter.count
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self._thread_id = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
@@ -0,0 +1,80 @@
+# src/services/quote_cache.py
+"""
+Cache LRU (por worker) de resultados de /calculate-price.
+
+A chave é um hash de todas as entradas que influenciam a resposta, incluindo as
+versões delas (custo + data de atualização do material, a linha do fator de
+dificuldade, versão das regras).
+Quando qualquer entrada muda de versão a chave muda junto: entradas antigas
+simplesmente deixam de ser encontradas e saem pela política LRU.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+
+class QuoteCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(*parts):
+        raw = json.dumps(parts, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+quote_cache = QuoteCache(int(os.getenv("QUOTE_CACHE_SIZE", "4096")))
+
+
+def material_version(material):
+    """Versão do custo do material: muda quando custo ou data_atualizacao mudam."""
+    updated = material.data_atualizacao.isoformat() if material.data_atualizacao else ""
+    return f"{material.custo_unitario_base}@{updated}"
+
+
+def difficulty_version(difficulty):
+    """Versão do fator de dificuldade: a resposta traz a linha inteira (to_dict) e a tabela não tem data de atualização."""
+    return f"{difficulty.id}:{difficulty.nivel}:{difficulty.fator_multiplicador_mao_obra}:{difficulty.descricao or ''}"
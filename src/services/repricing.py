@@ -0,0 +1,160 @@
+# src/services/repricing.py
+"""
+Recalcula projetos em rascunho quando o custo de um material ou as regras mudam.
+
+Dependências: um projeto 'Rascunho' depende dos materiais e níveis de
+dificuldade dos seus itens (project_items → materials / difficulty_factors).
+O recálculo é feito em SQL, por conjunto:
+    1) UPDATE project_items ... FROM materials, difficulty_factors, projects
+       apenas para os itens afetados, com os coeficientes das regras em CASE;
+    2) UPDATE projects SET totais = (SELECT SUM(...)) para os projetos afetados,
+       somando a diferença de receita a franchise_stats;
+na mesma transação. Itens antigos sem as entradas de mão de obra
+(nivel_funcionario / dias_estimados / num_envelopadores) não podem ser
+recalculados e são apenas contados como ignorados.
+"""
+from sqlalchemy import and_, case, func, literal, or_, select, update
+
+from src.models.user import db
+from src.models.material import Material
+from src.models.difficulty import DifficultyFactor
+from src.models.project import Project, ProjectItem
+from src.services import franchise_stats
+
+DRAFT_STATUS = "Rascunho"
+
+
+def _item_filters(material_ids=None, difficulty_levels=None, franchise_id=None):
+    filters = [
+        ProjectItem.id_projeto == Project.id,
+        ProjectItem.id_material == Material.id,
+        ProjectItem.id_dificuldade == DifficultyFactor.id,
+        Project.status == DRAFT_STATUS,
+    ]
+    if material_ids:
+        filters.append(ProjectItem.id_material.in_(material_ids))
+    if difficulty_levels:
+        filters.append(DifficultyFactor.nivel.in_(difficulty_levels))
+    if franchise_id:
+        filters.append(Project.id_franqueado == franchise_id)
+    return filters
+
+
+def _repriceable(rules):
+    return and_(
+        ProjectItem.nivel_funcionario.in_(list(rules.employee_rates)),
+        DifficultyFactor.nivel.in_(list(rules.difficulty_factors)),
+        ProjectItem.dias_estimados.isnot(None),
+        ProjectItem.num_envelopadores.isnot(None),
+    )
+
+
+def _not_repriceable(rules):
+    # explícito (e não ~_repriceable) para não perder as linhas com NULL
+    return or_(
+        ProjectItem.nivel_funcionario.is_(None),
+        ProjectItem.nivel_funcionario.not_in(list(rules.employee_rates)),
+        DifficultyFactor.nivel.not_in(list(rules.difficulty_factors)),
+        ProjectItem.dias_estimados.is_(None),
+        ProjectItem.num_envelopadores.is_(None),
+    )
+
+
+def affected_projects(material_ids=None, difficulty_levels=None, franchise_id=None):
+    """(id do projeto, id_franqueado) dos rascunhos que dependem dos materiais / níveis informados."""
+    stmt = (
+        select(Project.id, Project.id_franqueado)
+        .where(*_item_filters(material_ids, difficulty_levels, franchise_id))
+        .distinct()
+    )
+    return [tuple(row) for row in db.session.execute(stmt)]
+
+
+def reprice_drafts(resolve_rules, material_ids=None, difficulty_levels=None, franchise_id=None, dry_run=False):
+    """
+    Recalcula itens e totais dos rascunhos afetados. Sem material_ids nem
+    difficulty_levels, recalcula todos os rascunhos (ex.: mudança de regras).
+    resolve_rules(id_franqueado) devolve as regras de cada franquia; franquias
+    com a mesma versão de regras são recalculadas no mesmo UPDATE.
+    Não faz commit; quem chama decide.
+    """
+    affected = affected_projects(material_ids, difficulty_levels, franchise_id)
+    groups = {}
+    for project_id, project_franchise in affected:
+        rules = resolve_rules(project_franchise)
+        group = groups.setdefault(rules.version, (rules, set(), []))
+        group[1].add(project_franchise)
+        group[2].append(project_id)
+
+    summary = {
+        "rules_versions": sorted(groups),
+        "affected_projects": len(affected),
+        "project_ids": [project_id for project_id, _ in affected],
+        "updated_items": 0,
+        "skipped_items": 0,
+        "dry_run": bool(dry_run),
+    }
+    for rules, franchises, project_ids in groups.values():
+        filters = _item_filters(material_ids, difficulty_levels, franchise_id)
+        filters.append(Project.id_franqueado.in_(franchises))
+        updated, skipped = _reprice_group(rules, filters, project_ids, dry_run)
+        summary["updated_items"] += updated
+        summary["skipped_items"] += skipped
+    return summary
+
+
+def _reprice_group(rules, filters, project_ids, dry_run):
+    repriceable = _repriceable(rules)
+    skipped = db.session.execute(
+        select(func.count(ProjectItem.id)).where(*filters, _not_repriceable(rules))
+    ).scalar_one()
+    if dry_run:
+        updated = db.session.execute(
+            select(func.count(ProjectItem.id)).where(*filters, repriceable)
+        ).scalar_one()
+        return updated, skipped
+
+    multiplier = case(
+        {level: literal(f["material_multiplier"]) for level, f in rules.difficulty_factors.items()},
+        value=DifficultyFactor.nivel,
+    )
+    tax_factor = case(
+        {level: literal(1 + f["tax_rate"]) for level, f in rules.difficulty_factors.items()},
+        value=DifficultyFactor.nivel,
+    )
+    daily_rate = case(
+        {level: literal(rate) for level, rate in rules.employee_rates.items()},
+        value=ProjectItem.nivel_funcionario,
+    )
+    cost = (
+        ProjectItem.quantidade * Material.custo_unitario_base * multiplier
+        + daily_rate * ProjectItem.dias_estimados * ProjectItem.num_envelopadores
+    ) * tax_factor
+
+    result = db.session.execute(
+        update(ProjectItem)
+        .where(*filters, repriceable)
+        .values(
+            custo_item=func.round(cost, 2),
+            preco_venda_item=func.round(cost * (1 + Project.margem_lucro_aplicada), 2),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    updated = result.rowcount
+
+    item_totals = select(func.coalesce(func.sum(ProjectItem.custo_item), 0)) \
+        .where(ProjectItem.id_projeto == Project.id).scalar_subquery()
+    price_totals = select(func.coalesce(func.sum(ProjectItem.preco_venda_item), 0)) \
+        .where(ProjectItem.id_projeto == Project.id).scalar_subquery()
+    revenue_before = franchise_stats.revenue_by_franchise(db.session, project_ids)
+    db.session.execute(
+        update(Project)
+        .where(Project.id.in_(project_ids))
+        .values(custo_total_estimado=item_totals, preco_venda_sugerido=price_totals)
+        .execution_options(synchronize_session=False)
+    )
+    # receita dos rascunhos no dashboard (franchise_stats.receita_rascunho)
+    franchise_stats.record_revenue_change(
+        db.session, DRAFT_STATUS, revenue_before, franchise_stats.revenue_by_franchise(db.session, project_ids),
+    )
+    return updated, skipped
@@ -0,0 +1,324 @@
+# src/services/response_cache.py
+"""
+Cache de respostas (por worker) para endpoints muito lidos e pouco alterados
+(/materials, /difficulty-factors, /dashboard/stats).
+
+Cada entrada é registrada com as tabelas das quais depende, opcionalmente por
+franquia. Eventos da Session do SQLAlchemy anotam o que cada transação tocou
+(objetos ORM inseridos/alterados/removidos, DML executado pela sessão e as
+marcações explícitas via `touch`) e, no after_commit, só as entradas afetadas
+são removidas; rollback descarta as anotações.
+
+Entre workers: depois do commit, o worker que escreveu incrementa a versão de
+cada (tabela, franquia) tocada em response_cache_versions (UPSERT numa conexão
+própria, sem segurar lock na transação da escrita). Cada requisição lê as
+versões das quais a entrada depende ANTES de usar o cache (uma query pela
+chave primária); a entrada guarda as versões lidas antes de gerar a resposta e
+só é servida se elas não mudaram. Assim os demais workers param de servir a
+resposta antiga na primeira requisição após o commit. RESPONSE_CACHE_SHARED=0
+desliga a verificação (um único worker). RESPONSE_CACHE_TTL (padrão 60 s)
+continua como rede de segurança para escritas feitas fora da aplicação.
+"""
+from collections import OrderedDict
+from functools import wraps
+import logging
+import os
+import threading
+import time
+
+from flask import Response, request
+from sqlalchemy import and_, event, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from src.models.user import db
+from src.models.cache_version import ResponseCacheVersion
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_SHARED = os.getenv("RESPONSE_CACHE_SHARED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+_TOUCHED_KEY = "response_cache_touched"
+ALL_FRANCHISES = None
+TABLE_WIDE = ""   # linha de versão: alteração da tabela toda
+ANY_CHANGE = "*"  # linha de versão: qualquer alteração na tabela
+
+
+class _EndpointStats:
+    __slots__ = ("hits", "misses", "invalidations", "expirations", "stale")
+
+    def __init__(self):
+        self.hits = self.misses = self.invalidations = self.expirations = self.stale = 0
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+            "stale": self.stale,  # descartadas porque outro worker alterou os dados
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class ResponseCache:
+    def __init__(self, ttl, max_size, shared=True):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.shared = shared
+        self._entries = OrderedDict()  # key -> (expires_at, endpoint, status, mimetype, body, tags, versions)
+        self._by_table = {}            # tabela -> franquia (ou None = tabela toda) -> {keys}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _endpoint_stats(self, endpoint):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = _EndpointStats()
+        return stats
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        for table, franchise_id in entry[5]:
+            keys = self._by_table.get(table, {}).get(franchise_id)
+            if keys is not None:
+                keys.discard(key)
+        return entry
+
+    def get(self, key, endpoint, versions=None):
+        """Entrada válida para `versions` (as versões compartilhadas lidas agora), ou None."""
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                stats.expirations += 1
+                entry = None
+            elif entry is not None and entry[6] != versions:
+                self._drop(key)
+                stats.stale += 1
+                entry = None
+            if entry is None:
+                stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            stats.hits += 1
+            return entry
+
+    def put(self, key, endpoint, status, mimetype, body, tags, versions=None):
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, endpoint, status, mimetype, body, tags, versions)
+            for table, franchise_id in tags:
+                self._by_table.setdefault(table, {}).setdefault(franchise_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, touched):
+        """
+        `touched` = {(tabela, franquia)}. Franquia None invalida a tabela inteira;
+        uma franquia específica invalida as entradas dela e as que dependem da tabela toda.
+        """
+        with self._lock:
+            keys = set()
+            for table, franchise_id in touched:
+                by_franchise = self._by_table.get(table)
+                if not by_franchise:
+                    continue
+                if franchise_id is ALL_FRANCHISES:
+                    for franchise_keys in by_franchise.values():
+                        keys |= franchise_keys
+                else:
+                    keys |= by_franchise.get(franchise_id, set())
+                    keys |= by_franchise.get(ALL_FRANCHISES, set())
+            for key in keys:
+                entry = self._drop(key)
+                if entry is not None:
+                    self._endpoint_stats(entry[1]).invalidations += 1
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "shared_versions": self.shared,
+                "endpoints": {name: s.to_dict() for name, s in sorted(self._stats.items())},
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_SHARED)
+_cached_tables = set()  # tabelas das quais alguma rota em cache depende
+
+
+# ----------------------------- versões compartilhadas -----------------------------
+
+def _dependency_rows(tags):
+    """Linhas de versão que invalidam entradas com estas tags."""
+    rows = set()
+    for table, franchise_id in tags:
+        if franchise_id is ALL_FRANCHISES:
+            rows.add((table, ANY_CHANGE))
+        else:
+            rows.update(((table, str(franchise_id)), (table, TABLE_WIDE)))
+    return sorted(rows)
+
+
+def _changed_rows(touched):
+    """Linhas de versão a incrementar para as (tabela, franquia) alteradas."""
+    rows = set()
+    for table, franchise_id in touched:
+        if table in _cached_tables:
+            scope = TABLE_WIDE if franchise_id is ALL_FRANCHISES else str(franchise_id)
+            rows.update(((table, ANY_CHANGE), (table, scope)))
+    return sorted(rows)  # ordem fixa: UPSERTs concorrentes não entram em deadlock
+
+
+def read_versions(connection, rows):
+    """Versões atuais das linhas (0 para as que ainda não existem), na ordem de `rows`."""
+    table = ResponseCacheVersion.__table__
+    found = dict(
+        ((name, scope), version)
+        for name, scope, version in connection.execute(
+            select(table.c.tabela, table.c.id_franqueado, table.c.versao).where(
+                or_(*(and_(table.c.tabela == name, table.c.id_franqueado == scope) for name, scope in rows))
+            )
+        )
+    )
+    return tuple(found.get(row, 0) for row in rows)
+
+
+def bump_versions(connection, rows):
+    """versao = versao + 1 em cada linha (criando as que faltam)."""
+    table = ResponseCacheVersion.__table__
+    dialect_name = connection.dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        connection.execute(
+            dialect_insert(table)
+            .values([{"tabela": name, "id_franqueado": scope, "versao": 1} for name, scope in rows])
+            .on_conflict_do_update(index_elements=[table.c.tabela, table.c.id_franqueado],
+                                   set_={"versao": table.c.versao + 1})
+        )
+        return
+    # outros bancos: UPDATE e, se a linha ainda não existe, INSERT
+    for name, scope in rows:
+        result = connection.execute(
+            update(table).where(table.c.tabela == name, table.c.id_franqueado == scope)
+            .values(versao=table.c.versao + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(tabela=name, id_franqueado=scope, versao=1))
+
+
+def _current_versions(tags):
+    """Versões compartilhadas das quais as tags dependem; None sem verificação compartilhada."""
+    if not response_cache.shared:
+        return None
+    with db.engine.connect() as connection:
+        return read_versions(connection, _dependency_rows(tags))
+
+
+def _publish(bind, touched):
+    rows = _changed_rows(touched)
+    if not rows:
+        return
+    try:
+        with bind.begin() as connection:
+            bump_versions(connection, rows)
+    except Exception as e:
+        # a escrita já foi commitada: os outros workers ficam com a resposta antiga até o TTL
+        logger.warning("could not publish response cache versions: %s", e)
+
+
+def cached_response(endpoint, tables, franchise_arg=None):
+    """
+    Decorator de rota GET: guarda respostas 200 por (endpoint, query string).
+    Com `franchise_arg`, a dependência das `tables` é registrada só para a franquia
+    informada nesse parâmetro (invalidação por franquia).
+    """
+    _cached_tables.update(tables)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (endpoint, tuple(sorted(request.args.items(multi=True))), tuple(sorted(kwargs.items())))
+            franchise_id = request.args.get(franchise_arg) if franchise_arg else ALL_FRANCHISES
+            tags = tuple((table, franchise_id) for table in tables)
+            try:
+                versions = _current_versions(tags)  # antes da view: o que ela ler é no mínimo desta versão
+            except Exception as e:
+                logger.warning("could not read response cache versions, bypassing the cache: %s", e)
+                return view(*args, **kwargs)
+
+            entry = response_cache.get(key, endpoint, versions)
+            if entry is not None:
+                response = Response(entry[4], status=entry[2], mimetype=entry[3])
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = view(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                response_cache.put(key, endpoint, 200, response.mimetype, response.get_data(), tags, versions)
+                response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+
+# ----------------------------- invalidação pela Session -----------------------------
+
+def touch(session, table, franchise_id=ALL_FRANCHISES):
+    """Marca (tabela, franquia) como alterada na transação atual (para DML sem objeto ORM)."""
+    session.info.setdefault(_TOUCHED_KEY, set()).add((table, franchise_id))
+
+
+def _touch_instance(session, instance):
+    table = getattr(instance, "__tablename__", None)
+    if table:
+        touch(session, table, getattr(instance, "id_franqueado", ALL_FRANCHISES))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_flushed(session, flush_context, instances):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        _touch_instance(session, instance)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_dml(orm_execute_state):
+    # INSERT/UPDATE/DELETE em lote não passam pelo flush. A franquia vem da execution option
+    # "response_cache_franchise"; sem ela, vale a tabela toda.
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        name = getattr(table, "name", None)
+        if name:
+            franchise_id = orm_execute_state.execution_options.get("response_cache_franchise", ALL_FRANCHISES)
+            touch(orm_execute_state.session, name, franchise_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    touched = session.info.pop(_TOUCHED_KEY, None)
+    if touched:
+        response_cache.invalidate(touched)
+        if response_cache.shared:
+            _publish(session.get_bind(), touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_TOUCHED_KEY, None)
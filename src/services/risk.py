@@ -0,0 +1,105 @@
+# src/services/risk.py
+"""
+Precificação com risco (Monte Carlo) para estimativas incertas.
+
+Quantidade e dias estimados de cada item podem ser informados como
+distribuição triangular {"min", "likely", "max"}. Amostramos N cenários de uma
+vez (vetorizado com NumPy, um vetor de N posições por item) e aplicamos a mesma
+fórmula do motor de preços. Com a distribuição do custo calculamos P50/P90 e a
+margem que, aplicada ao custo "provável", cobre o custo em pelo menos a
+probabilidade alvo dos cenários.
+"""
+import numpy as np
+
+from src.services.scenarios import ScenarioError, parse_float
+
+DEFAULT_SAMPLES = 100_000
+MAX_SAMPLES = 500_000
+
+
+class Estimate:
+    """Valor pontual ou distribuição triangular (min, likely, max)."""
+
+    __slots__ = ("low", "likely", "high")
+
+    def __init__(self, spec, field_name):
+        if isinstance(spec, dict):
+            likely = parse_float(spec.get("likely", spec.get("min")), f"{field_name}.likely")
+            low = parse_float(spec.get("min", likely), f"{field_name}.min")
+            high = parse_float(spec.get("max", likely), f"{field_name}.max")
+        else:
+            low = likely = high = parse_float(spec, field_name)
+        if low < 0 or not (low <= likely <= high):
+            raise ScenarioError(f"'{field_name}' must satisfy 0 <= min <= likely <= max")
+        self.low, self.likely, self.high = low, likely, high
+
+    def sample(self, rng, size):
+        if self.low == self.high:
+            return np.full(size, self.likely)
+        return rng.triangular(self.low, self.likely, self.high, size)
+
+
+class RiskItem:
+    __slots__ = ("unit_cost", "quantity", "estimated_days", "num_envelopers",
+                 "difficulty_level", "employee_level")
+
+    def __init__(self, unit_cost, quantity, estimated_days, num_envelopers, difficulty_level, employee_level):
+        self.unit_cost = parse_float(unit_cost, "custo_unitario_base")
+        self.quantity = Estimate(quantity, "quantity")
+        self.estimated_days = Estimate(estimated_days, "estimated_days")
+        self.num_envelopers = parse_float(num_envelopers, "num_envelopers")
+        self.difficulty_level = difficulty_level
+        self.employee_level = employee_level
+
+
+def simulate(rules, items, samples=DEFAULT_SAMPLES, target_probability=0.9, margin=None, seed=None):
+    if not items:
+        raise ScenarioError("At least one item is required")
+    samples = int(parse_float(samples, "samples"))
+    if samples < 1000 or samples > MAX_SAMPLES:
+        raise ScenarioError(f"'samples' must be between 1000 and {MAX_SAMPLES}")
+    target_probability = parse_float(target_probability, "target_probability")
+    if not 0 < target_probability < 1:
+        raise ScenarioError("'target_probability' must be between 0 and 1")
+    margin = float(rules.margin_ranges["min"] if margin is None else margin)
+
+    rng = np.random.default_rng(seed)
+    cost = np.zeros(samples)
+    base_cost = 0.0
+    for item in items:
+        factor = rules.difficulty_factors.get(item.difficulty_level)
+        if factor is None:
+            raise ScenarioError(f"Difficulty data not found for level: {item.difficulty_level}")
+        rate = rules.employee_rates.get(item.employee_level)
+        if rate is None:
+            raise ScenarioError(f"Invalid employee level: {item.employee_level}")
+        tax_factor = 1.0 + float(factor["tax_rate"])
+        material_coef = item.unit_cost * float(factor["material_multiplier"]) * tax_factor
+        labor_coef = float(rate) * item.num_envelopers * tax_factor
+
+        cost += material_coef * item.quantity.sample(rng, samples)
+        cost += labor_coef * item.estimated_days.sample(rng, samples)
+        base_cost += material_coef * item.quantity.likely + labor_coef * item.estimated_days.likely
+
+    p10, p50, p90, p_target = np.quantile(cost, [0.10, 0.50, 0.90, target_probability])
+    if base_cost > 0:
+        required_margin = max(float(p_target) / base_cost - 1.0, 0.0)
+    else:
+        required_margin = 0.0
+    selling_price = base_cost * (1.0 + margin)
+
+    return {
+        "samples": samples,
+        "base_cost": round(base_cost, 2),
+        "mean_cost": round(float(cost.mean()), 2),
+        "std_cost": round(float(cost.std()), 2),
+        "p10_cost": round(float(p10), 2),
+        "p50_cost": round(float(p50), 2),
+        "p90_cost": round(float(p90), 2),
+        "target_probability": target_probability,
+        "required_margin": round(required_margin, 4),
+        "required_selling_price": round(base_cost * (1.0 + required_margin), 2),
+        "margin_applied": margin,
+        "selling_price": round(selling_price, 2),
+        "probability_of_profit": round(float(np.mean(cost < selling_price)), 4),
+    }
@@ -0,0 +1,154 @@
+# src/services/rule_sets.py
+"""
+Regras de precificação no banco: conjuntos com vigência (vigente_desde /
+vigente_ate), globais ou por franquia.
+
+Cada worker mantém um snapshot imutável de TODOS os conjuntos já compilados
+(PricingRules). A resolução franquia → regras vigentes é feita em memória, sem
+query. Só consultamos o contador pricing_rules_version, no máximo uma vez a
+cada PRICING_RULES_DB_CHECK_INTERVAL segundos; quando ele muda o snapshot é
+recarregado. Sem conjunto vigente no banco, vale o JSON (pricing_rules.py).
+"""
+from datetime import datetime
+import logging
+import os
+import threading
+import time
+
+from flask import has_app_context
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from src.models.user import db
+from src.models.pricing_rule import PricingRuleSet, PricingRulesVersion
+from src.services.pricing_rules import PricingRules, PricingRulesError, get_pricing_rules
+
+logger = logging.getLogger(__name__)
+
+DB_CHECK_INTERVAL = float(os.getenv("PRICING_RULES_DB_CHECK_INTERVAL", "5"))
+VERSION_ROW_ID = 1
+
+
+class _CompiledSet:
+    __slots__ = ("id", "franchise_id", "starts", "ends", "rules")
+
+    def __init__(self, rule_set, counter):
+        self.id = rule_set.id
+        self.franchise_id = rule_set.id_franqueado
+        self.starts = rule_set.vigente_desde
+        self.ends = rule_set.vigente_ate
+        self.rules = PricingRules(rule_set.to_rules_data(), f"db-{rule_set.id[:8]}.{counter}", source="db")
+
+    def active_at(self, at):
+        return self.starts <= at and (self.ends is None or at < self.ends)
+
+
+class _DbRulesStore:
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._counter = None
+        self._by_franchise = {}
+        self._next_check = 0.0
+
+    def invalidate(self):
+        self._next_check = 0.0
+
+    def resolve(self, franchise_id, at=None):
+        """Regras vigentes no banco para a franquia (ou globais); None se não houver."""
+        if time.monotonic() >= self._next_check:
+            self._refresh()
+        by_franchise = self._by_franchise
+        if not by_franchise:
+            return None
+        at = at or datetime.utcnow()
+        for key in ((franchise_id, None) if franchise_id else (None,)):
+            best = None
+            for candidate in by_franchise.get(key, ()):
+                if candidate.active_at(at) and (best is None or candidate.starts > best.starts):
+                    best = candidate
+            if best is not None:
+                return best.rules
+        return None
+
+    def _refresh(self):
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.interval
+            try:
+                with db.engine.connect() as conn:
+                    counter = conn.execute(
+                        select(PricingRulesVersion.versao).where(PricingRulesVersion.id == VERSION_ROW_ID)
+                    ).scalar()
+                if counter == self._counter and self._counter is not None:
+                    return
+                with Session(db.engine) as session:
+                    rule_sets = session.scalars(
+                        select(PricingRuleSet).options(
+                            selectinload(PricingRuleSet.employee_rates),
+                            selectinload(PricingRuleSet.difficulty_rules),
+                        )
+                    ).all()
+                    by_franchise = {}
+                    for rule_set in rule_sets:
+                        try:
+                            compiled = _CompiledSet(rule_set, counter or 0)
+                        except PricingRulesError as e:
+                            logger.warning("ignoring pricing rule set %s: %s", rule_set.id, e)
+                            continue
+                        by_franchise.setdefault(compiled.franchise_id, []).append(compiled)
+            except Exception as e:
+                # tabela ainda não migrada / banco fora: continua com o snapshot atual (ou o JSON)
+                logger.warning("could not refresh pricing rule sets: %s", e)
+                return
+            self._by_franchise = by_franchise
+            self._counter = counter
+            logger.info("pricing rule sets loaded (version %s, %d sets)", counter, len(rule_sets))
+
+
+_store = _DbRulesStore(DB_CHECK_INTERVAL)
+
+
+def resolve_pricing_rules(franchise_id=None, at=None):
+    """
+    Regras para cotar: conjunto vigente da franquia > conjunto global vigente >
+    arquivo JSON. Sem I/O no caminho comum.
+    """
+    if has_app_context():
+        rules = _store.resolve(franchise_id, at)
+        if rules is not None:
+            return rules
+    return get_pricing_rules()
+
+
+def bump_rules_version(session):
+    """
+    Incrementa o contador (na transação de quem chama) para os workers recarregarem.
+    UPSERT atômico: dois bumps concorrentes sem a linha (bancos anteriores à
+    migração 0013) não tentam os dois o INSERT.
+    """
+    table = PricingRulesVersion.__table__
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        session.execute(
+            dialect_insert(table)
+            .values(id=VERSION_ROW_ID, versao=1)
+            .on_conflict_do_update(index_elements=[table.c.id], set_={"versao": table.c.versao + 1})
+        )
+        return
+    # outros bancos: a linha vem da migração 0013, então o UPDATE basta; INSERT só sem ela
+    result = session.execute(
+        update(table).where(table.c.id == VERSION_ROW_ID).values(versao=table.c.versao + 1)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table).values(id=VERSION_ROW_ID, versao=1))
+
+
+def invalidate_local_snapshot():
+    """Após commit de alteração de regras: este worker verifica na próxima cotação."""
+    _store.invalidate()
@@ -0,0 +1,209 @@
+# src/services/scenarios.py
+"""
+Varredura de cenários ("what-if") vetorizada com NumPy.
+
+Para um conjunto de itens já resolvidos (custo unitário, quantidade, nível de
+dificuldade) avalia o produto cartesiano de margem × nível de funcionário ×
+dias × envelopadores de uma vez só. A fórmula é separável:
+
+    total(l, d, e)   = A + diaria[l] * L(d, e)
+        A            = Σ_i q_i * c_i * m_i * (1 + t_i)
+        L(d, e)      = Σ_i (1 + t_i) * dias_i(d) * envelopadores_i(e)
+    venda(g, l, d, e) = total(l, d, e) * (1 + g)
+
+então o custo é O(itens + pontos da grade). Os valores são float64 arredondados
+para centavos na saída; servem para explorar cenários — a cotação oficial
+continua vindo de /calculate-price (aritmética exata).
+"""
+import numpy as np
+
+MAX_SCENARIO_POINTS = 100_000
+MAX_AXIS_VALUES = 1_000
+
+
+class ScenarioError(ValueError):
+    """Grade ou itens inválidos."""
+
+
+def parse_float(value, field_name):
+    """Número finito vindo do JSON (bool não conta); ScenarioError com o nome do campo."""
+    if isinstance(value, bool):
+        raise ScenarioError(f"Invalid number for '{field_name}': {value!r}")
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        raise ScenarioError(f"Invalid number for '{field_name}': {value!r}")
+    if not np.isfinite(result):
+        raise ScenarioError(f"Invalid number for '{field_name}': {value!r}")
+    return result
+
+
+def parse_axis(spec, field_name):
+    """
+    Aceita um número, uma lista de números ou {"min", "max", "step"}
+    (ou {"min", "max", "count"}). Retorna um np.ndarray 1-D.
+    """
+    if isinstance(spec, dict):
+        lo = parse_float(spec.get("min"), f"{field_name}.min")
+        hi = parse_float(spec.get("max"), f"{field_name}.max")
+        if hi < lo:
+            raise ScenarioError(f"'{field_name}.max' must be >= '{field_name}.min'")
+        if "count" in spec:
+            count = int(parse_float(spec["count"], f"{field_name}.count"))
+            if count < 1 or count > MAX_AXIS_VALUES:
+                raise ScenarioError(f"'{field_name}.count' must be between 1 and {MAX_AXIS_VALUES}")
+            return np.linspace(lo, hi, count)
+        step = parse_float(spec.get("step"), f"{field_name}.step")
+        if step <= 0:
+            raise ScenarioError(f"'{field_name}.step' must be > 0")
+        count = int(np.floor((hi - lo) / step + 1e-9)) + 1
+        if count > MAX_AXIS_VALUES:
+            raise ScenarioError(f"'{field_name}' has too many values (max {MAX_AXIS_VALUES})")
+        return np.round(lo + step * np.arange(count), 10)
+    if isinstance(spec, list):
+        if not spec:
+            raise ScenarioError(f"'{field_name}' must not be empty")
+        if len(spec) > MAX_AXIS_VALUES:
+            raise ScenarioError(f"'{field_name}' has too many values (max {MAX_AXIS_VALUES})")
+        return np.array([parse_float(v, field_name) for v in spec], dtype=np.float64)
+    return np.array([parse_float(spec, field_name)], dtype=np.float64)
+
+
+class ScenarioItem:
+    __slots__ = ("unit_cost", "quantity", "difficulty_level", "estimated_days", "num_envelopers")
+
+    def __init__(self, unit_cost, quantity, difficulty_level, estimated_days=None, num_envelopers=None):
+        self.unit_cost = parse_float(unit_cost, "custo_unitario_base")
+        self.quantity = parse_float(quantity, "quantity")
+        self.difficulty_level = difficulty_level
+        self.estimated_days = None if estimated_days is None else parse_float(estimated_days, "estimated_days")
+        self.num_envelopers = None if num_envelopers is None else parse_float(num_envelopers, "num_envelopers")
+
+
+def _labor_axis(items, values, attr):
+    """Matriz (itens × valores): o eixo informado substitui o valor de cada item."""
+    if values is not None:
+        return values, np.broadcast_to(values, (len(items), len(values)))
+    own = []
+    for item in items:
+        value = getattr(item, attr)
+        if value is None:
+            raise ScenarioError(f"'{attr}' must be given per item or as a grid axis")
+        own.append(value)
+    return None, np.array(own, dtype=np.float64)[:, None]
+
+
+def sweep(rules, items, margins=None, employee_levels=None, estimated_days=None, num_envelopers=None):
+    """
+    Avalia a grade completa. Retorna dict com os eixos e os arrays
+    total_cost (l, d, e) e selling_price (g, l, d, e).
+    """
+    if not items:
+        raise ScenarioError("At least one item is required")
+
+    if margins is None:
+        margins = parse_axis({
+            "min": rules.margin_ranges["min"],
+            "max": rules.margin_ranges.get("max", rules.margin_ranges["min"]),
+            "step": "0.01",
+        }, "margins")
+    if employee_levels is None:
+        employee_levels = list(rules.employee_rates)
+    for level in employee_levels:
+        if level not in rules.employee_rates:
+            raise ScenarioError(f"Invalid employee level: {level}")
+
+    n_points = len(margins) * len(employee_levels) \
+        * (len(estimated_days) if estimated_days is not None else 1) \
+        * (len(num_envelopers) if num_envelopers is not None else 1)
+    if n_points > MAX_SCENARIO_POINTS:
+        raise ScenarioError(f"Scenario grid too large: {n_points} points (max {MAX_SCENARIO_POINTS})")
+
+    tax_factor = np.empty(len(items))
+    material = np.empty(len(items))
+    for i, item in enumerate(items):
+        factor = rules.difficulty_factors.get(item.difficulty_level)
+        if factor is None:
+            raise ScenarioError(f"Difficulty data not found for level: {item.difficulty_level}")
+        tax_factor[i] = 1.0 + float(factor["tax_rate"])
+        material[i] = item.quantity * item.unit_cost * float(factor["material_multiplier"])
+
+    days_axis, days = _labor_axis(items, estimated_days, "estimated_days")
+    crew_axis, crew = _labor_axis(items, num_envelopers, "num_envelopers")
+
+    fixed = float(material @ tax_factor)                                  # A
+    labor_units = np.einsum("i,id,ie->de", tax_factor, days, crew)        # L(d, e)
+    rates = np.array([float(rules.employee_rates[level]) for level in employee_levels])
+    total_cost = fixed + rates[:, None, None] * labor_units[None, :, :]  # (l, d, e)
+    selling_price = total_cost[None] * (1.0 + margins)[:, None, None, None]
+
+    return {
+        "margins": margins,
+        "employee_levels": employee_levels,
+        "estimated_days": days_axis,
+        "num_envelopers": crew_axis,
+        "total_cost": total_cost,
+        "selling_price": selling_price,
+    }
+
+
+def pareto_mask(price, profit):
+    """Pontos não dominados: menor preço de venda para cada nível de lucro."""
+    order = np.lexsort((-profit, price))
+    sorted_profit = profit[order]
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(sorted_profit)[:-1]))
+    mask = np.zeros(len(price), dtype=bool)
+    mask[order[sorted_profit > best_before]] = True
+    return mask
+
+
+def flatten(result, output="surface", max_selling_price=None, min_profit=None):
+    """Achata a grade em pontos (filtrados / fronteira de Pareto) e um resumo."""
+    if output not in ("surface", "pareto"):
+        raise ScenarioError("'output' must be 'surface' or 'pareto'")
+    selling = result["selling_price"]
+    total = np.broadcast_to(result["total_cost"][None], selling.shape)
+    profit = selling - total
+
+    idx = np.indices(selling.shape).reshape(4, -1)
+    selling_flat = selling.ravel()
+    total_flat = total.ravel()
+    profit_flat = profit.ravel()
+
+    mask = np.ones(selling_flat.shape, dtype=bool)
+    if max_selling_price is not None:
+        mask &= selling_flat <= parse_float(max_selling_price, "max_selling_price")
+    if min_profit is not None:
+        mask &= profit_flat >= parse_float(min_profit, "min_profit")
+    keep = np.flatnonzero(mask)
+    if output == "pareto" and keep.size:
+        keep = keep[pareto_mask(selling_flat[keep], profit_flat[keep])]
+        keep = keep[np.argsort(selling_flat[keep], kind="stable")]
+
+    margins = result["margins"]
+    levels = result["employee_levels"]
+    days = result["estimated_days"]
+    crew = result["num_envelopers"]
+    selling_r = np.round(selling_flat[keep], 2).tolist()
+    total_r = np.round(total_flat[keep], 2).tolist()
+    profit_r = np.round(profit_flat[keep], 2).tolist()
+    points = []
+    for n, (g, l, d, e) in enumerate(idx[:, keep].T.tolist()):
+        points.append({
+            "margin": float(margins[g]),
+            "employee_level": levels[l],
+            "estimated_days": None if days is None else float(days[d]),
+            "num_envelopers": None if crew is None else float(crew[e]),
+            "total_cost": total_r[n],
+            "selling_price": selling_r[n],
+            "profit": profit_r[n],
+        })
+
+    summary = {"grid_points": int(selling_flat.size), "matching_points": int(mask.sum())}
+    if keep.size:
+        summary.update({
+            "min_selling_price": round(float(selling_flat[keep].min()), 2),
+            "max_selling_price": round(float(selling_flat[keep].max()), 2),
+            "max_profit": round(float(profit_flat[keep].max()), 2),
+        })
+    return points, summary
@@ -0,0 +1,276 @@
+# src/services/single_flight.py
+"""
+Coalescência ("single flight") de chamadas idênticas ao LLM.
+
+Quando vários usuários abrem o assistente da mesma franquia ao mesmo tempo, o
+mesmo prompt (mesma completion_key) ia várias vezes ao upstream em paralelo.
+Aqui só a primeira chamada de cada chave vai ao upstream; as demais esperam e
+recebem o mesmo texto (ou a mesma exceção):
+
+- entre threads do processo: dicionário chave -> chamada em andamento;
+- entre corotinas do app assíncrono (src/asgi_ai.py): o mesmo, com asyncio.Future;
+- entre workers da máquina: um arquivo de lock por chave em AI_SINGLE_FLIGHT_DIR
+  (fcntl.flock). Quem encontra o lock ocupado espera o dono soltar e relê o
+  resultado com `lookup` (o cache em disco de completion_cache.py, que é o canal
+  entre processos). Sem `lookup`, sem fcntl (Windows) ou com
+  AI_SINGLE_FLIGHT_DIR vazio, a coalescência fica só dentro do processo.
+
+O prazo de espera acompanha o endpoint (fila do gateway + conexão + leitura,
+ver wait_timeout_for); AI_SINGLE_FLIGHT_TIMEOUT fixa um valor único. O dono
+espera no máximo esse prazo pelo lock de arquivo antes de chamar; quem espera
+o dono no processo tem o dobro (lock + chamada). Se o prazo acabar ou o dono for
+cancelado, a chamada é abandonada e os que esperavam voltam a disputar a chave:
+um deles vira o novo dono e os demais esperam por ele.
+"""
+import asyncio
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: só coalescência dentro do processo
+    fcntl = None
+
+from src.services.ai_gateway import AI_CONNECT_TIMEOUT, AI_QUEUE_TIMEOUT, read_timeout
+from src.services.completion_cache import AI_CACHE_PATH
+
+AI_SINGLE_FLIGHT_DIR = os.getenv(
+    "AI_SINGLE_FLIGHT_DIR", os.path.join(os.path.dirname(AI_CACHE_PATH), "ai_inflight")
+)
+AI_SINGLE_FLIGHT_TIMEOUT = float(os.getenv("AI_SINGLE_FLIGHT_TIMEOUT") or 0) or None
+POLL_INTERVAL = 0.05
+
+
+def wait_timeout_for(endpoint):
+    """Quanto uma chamada do endpoint pode levar: vaga no semáforo + conexão + leitura."""
+    if AI_SINGLE_FLIGHT_TIMEOUT:
+        return AI_SINGLE_FLIGHT_TIMEOUT
+    return AI_QUEUE_TIMEOUT + AI_CONNECT_TIMEOUT + read_timeout(endpoint)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _FileLock:
+    """
+    flock exclusivo em <dir>/<chave>.lock; o dono apaga o arquivo antes de soltar.
+    Quem obtém o flock de um arquivo já apagado (ou substituído) não é dono: o
+    inode aberto é comparado com o do caminho atual e, se diferirem, o arquivo é
+    reaberto e a tentativa se repete. `contended` indica que outro dono foi visto
+    (o resultado dele pode já estar no cache).
+    """
+
+    def __init__(self, directory, key):
+        self.path = os.path.join(directory, f"{key}.lock")
+        self.fd = None
+        self.contended = False
+
+    def try_acquire(self):
+        while True:
+            if self.fd is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+            try:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.contended = True
+                return False
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(self.fd).st_ino:
+                return True
+            # o dono anterior terminou e apagou este arquivo: reabre o caminho atual
+            self.contended = True
+            os.close(self.fd)
+            self.fd = None
+
+    def release(self, owner):
+        if self.fd is None:
+            return
+        if owner:
+            # apagado com o flock ainda preso: quem pegar o inode antigo percebe e reabre
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        os.close(self.fd)  # solta o flock
+        self.fd = None
+
+
+class SingleFlight:
+    def __init__(self, lock_dir=AI_SINGLE_FLIGHT_DIR, wait_timeout=None):
+        self.lock_dir = lock_dir
+        self.wait_timeout = wait_timeout  # None: por endpoint (wait_timeout_for)
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "shared": 0, "cross_process_waits": 0, "cross_process_shared": 0,
+                       "wait_timeouts": 0, "abandoned": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _timeout(self, endpoint):
+        return self.wait_timeout or wait_timeout_for(endpoint)
+
+    def _cross_process(self, lookup):
+        return lookup is not None and fcntl is not None and bool(self.lock_dir)
+
+    def _abandon(self, calls, key, call):
+        """Tira a chamada vencida/cancelada da tabela (se ainda for ela) para eleger outro dono."""
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+                self._stats["abandoned"] += 1
+
+    # ------------------------------- threads --------------------------------
+
+    def do(self, key, fn, lookup=None, endpoint=None):
+        """
+        fn() para o primeiro chamador de `key`; os concorrentes recebem o mesmo
+        resultado. `lookup()` relê o resultado gravado por outro worker (None se não houver).
+        """
+        timeout = self._timeout(endpoint)
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._stats["leaders"] += 1
+                else:
+                    self._stats["shared"] += 1
+
+            if leader:
+                return self._lead(key, call, fn, lookup, timeout)
+            if call.done.wait(2 * timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            self._count("wait_timeouts")
+            self._abandon(self._calls, key, call)
+
+    def _lead(self, key, call, fn, lookup, timeout):
+        try:
+            call.result = self._run(key, fn, lookup, timeout)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def _run(self, key, fn, lookup, timeout):
+        if not self._cross_process(lookup):
+            return fn()
+        file_lock = _FileLock(self.lock_dir, key)
+        owner = False
+        try:
+            owner = file_lock.try_acquire()
+            if not owner:
+                self._count("cross_process_waits")
+                deadline = time.monotonic() + timeout
+                while not owner and time.monotonic() < deadline:
+                    time.sleep(POLL_INTERVAL)
+                    owner = file_lock.try_acquire()
+                if not owner:
+                    self._count("wait_timeouts")
+                    return fn()
+            if file_lock.contended:
+                shared = lookup()
+                if shared is not None:
+                    self._count("cross_process_shared")
+                    return shared
+            return fn()
+        finally:
+            file_lock.release(owner)
+
+    # ------------------------------- asyncio --------------------------------
+
+    async def do_async(self, key, fn, lookup=None, endpoint=None):
+        """Versão para corotinas: `fn` é uma função async; `lookup` (síncrono) roda em thread."""
+        timeout = self._timeout(endpoint)
+        while True:
+            future = self._async_calls.get(key)
+            if future is None:
+                return await self._lead_async(key, fn, lookup, timeout)
+            self._count("shared")
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), 2 * timeout)
+            except asyncio.TimeoutError:
+                self._count("wait_timeouts")
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # o dono foi cancelado (cliente desconectou): nova disputa pela chave
+            self._abandon(self._async_calls, key, future)
+
+    async def _lead_async(self, key, fn, lookup, timeout):
+        future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        self._count("leaders")
+        try:
+            result = await self._run_async(key, fn, lookup, timeout)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # evita "exception was never retrieved" quando ninguém esperava
+            raise
+        else:
+            if not future.done():
+                future.set_result(result)
+            return result
+        finally:
+            if self._async_calls.get(key) is future:
+                del self._async_calls[key]
+
+    async def _run_async(self, key, fn, lookup, timeout):
+        if not self._cross_process(lookup):
+            return await fn()
+        file_lock = _FileLock(self.lock_dir, key)
+        owner = False
+        try:
+            owner = file_lock.try_acquire()
+            if not owner:
+                self._count("cross_process_waits")
+                deadline = time.monotonic() + timeout
+                while not owner and time.monotonic() < deadline:
+                    await asyncio.sleep(POLL_INTERVAL)
+                    owner = file_lock.try_acquire()
+                if not owner:
+                    self._count("wait_timeouts")
+                    return await fn()
+            if file_lock.contended:
+                shared = await asyncio.to_thread(lookup)
+                if shared is not None:
+                    self._count("cross_process_shared")
+                    return shared
+            return await fn()
+        finally:
+            file_lock.release(owner)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls) + len(self._async_calls)
+            return dict(
+                self._stats,
+                in_flight=in_flight,
+                cross_process=fcntl is not None and bool(self.lock_dir),
+                lock_dir=self.lock_dir,
+                wait_timeout_seconds=self.wait_timeout or AI_SINGLE_FLIGHT_TIMEOUT,
+            )
+
+
+single_flight = SingleFlight()
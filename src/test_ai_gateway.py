@@ -0,0 +1,111 @@
+"""
+AI gateway retry rules (src/services/ai_gateway.py): which SDK errors are
+retried, Retry-After and backoff limits, and, against the stub upstream in
+src/ai_stub_server.py, retries on 5xx, no repeat after a read timeout and one
+pooled connection.
+"""
+
+import os
+
+import httpx
+import openai
+
+from src.ai_stub_server import start_stub
+from src.services.ai_gateway import (
+    AI_RETRY_MAX_BACKOFF, AIGateway, AITimeoutError, AIUpstreamError, is_retryable, retry_delay,
+)
+
+REQUEST = httpx.Request("POST", "http://upstream.test/v1/chat/completions")
+MESSAGES = [{"role": "user", "content": "Qual tinta usar?"}]
+
+
+def _timeout_error(cause):
+    error = openai.APITimeoutError(request=REQUEST)
+    error.__cause__ = cause
+    return error
+
+
+def _status_error(cls, status, headers=None):
+    response = httpx.Response(status, request=REQUEST, headers=headers or {})
+    return cls("upstream", response=response, body=None)
+
+
+def _stub_gateway(**stub_options):
+    server, state = start_stub(**stub_options)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    return server, state, AIGateway(max_retries=2)
+
+
+def test_read_timeout_is_not_retried():
+    assert not is_retryable(_timeout_error(httpx.ReadTimeout("read", request=REQUEST)))
+
+
+def test_connect_failures_are_retried():
+    assert is_retryable(_timeout_error(httpx.ConnectTimeout("connect", request=REQUEST)))
+    assert is_retryable(openai.APIConnectionError(request=REQUEST))
+
+
+def test_rate_limit_and_5xx_are_retried_but_4xx_is_not():
+    assert is_retryable(_status_error(openai.RateLimitError, 429))
+    assert is_retryable(_status_error(openai.InternalServerError, 500))
+    assert is_retryable(_status_error(openai.InternalServerError, 503))
+    assert not is_retryable(_status_error(openai.BadRequestError, 400))
+    assert not is_retryable(_status_error(openai.AuthenticationError, 401))
+
+
+def test_retry_delay_honours_retry_after_up_to_the_cap():
+    assert retry_delay(_status_error(openai.RateLimitError, 429, {"retry-after": "1.5"}), 0) == min(1.5, AI_RETRY_MAX_BACKOFF)
+    assert retry_delay(_status_error(openai.RateLimitError, 429, {"retry-after": "3600"}), 0) == AI_RETRY_MAX_BACKOFF
+
+
+def test_retry_delay_backs_off_with_jitter_without_retry_after():
+    error = _status_error(openai.InternalServerError, 500)
+    for attempt in range(6):
+        delays = [retry_delay(error, attempt) for _ in range(50)]
+        assert all(0 <= d <= AI_RETRY_MAX_BACKOFF for d in delays), delays
+    assert len({retry_delay(error, 3) for _ in range(10)}) > 1, "no jitter"
+
+
+def test_gateway_retries_5xx_then_gives_up():
+    server, state, gateway = _stub_gateway(fail_rate=1.0)
+    try:
+        try:
+            gateway.chat_complete(MESSAGES, endpoint="virtual-assistant")
+            assert False, "expected AIUpstreamError"
+        except AIUpstreamError as e:
+            assert e.status_code == 502
+        assert state.snapshot()["requests"] == 3, state.snapshot()
+        assert gateway.stats()["retries"] == 2
+    finally:
+        gateway.reset()
+        server.shutdown()
+
+
+def test_gateway_does_not_repeat_a_read_timeout():
+    server, state, gateway = _stub_gateway(delay=0.5)
+    os.environ["AI_READ_TIMEOUT_TEST_TIMEOUT"] = "0.1"
+    try:
+        try:
+            gateway.chat_complete(MESSAGES, endpoint="test-timeout")
+            assert False, "expected AITimeoutError"
+        except AITimeoutError as e:
+            assert e.status_code == 504
+        assert state.snapshot()["requests"] == 1, state.snapshot()
+        assert gateway.stats()["retries"] == 0
+    finally:
+        os.environ.pop("AI_READ_TIMEOUT_TEST_TIMEOUT")
+        gateway.reset()
+        server.shutdown()
+
+
+def test_gateway_reuses_one_connection():
+    server, state, gateway = _stub_gateway()
+    try:
+        for _ in range(5):
+            assert gateway.chat_complete(MESSAGES, endpoint="virtual-assistant").startswith("Resposta do stub")
+        assert state.snapshot()["connections"] == 1, state.snapshot()
+    finally:
+        gateway.reset()
+        server.shutdown()
+
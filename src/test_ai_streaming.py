@@ -0,0 +1,98 @@
+"""
+SSE routes (/api/ai/virtual-assistant/stream and
+/api/ai/generate-project-description/stream) against the stub upstream in
+src/ai_stub_server.py: token events add up to the final `done` text, complete
+answers are cached, a client that disconnects mid-stream frees the gateway
+slot without caching, and failures before the first byte are HTTP statuses.
+"""
+
+import json
+
+import pytest
+
+from src.ai_stub_server import start_stub
+from src.routes import ai_assistant
+from src.services.ai_gateway import AIGateway
+from src.services.completion_cache import CompletionCache
+
+QUESTION = {"question": "Qual vinil usar na cozinha?"}
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    server, state = start_stub()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    gateway = AIGateway(max_concurrency=1, queue_timeout=0.2, max_retries=0)
+    cache = CompletionCache(path=str(tmp_path / "completions.db"))
+    monkeypatch.setattr(ai_assistant, "ai_gateway", gateway)
+    monkeypatch.setattr(ai_assistant, "completion_cache", cache)
+    yield state, gateway, cache
+    gateway.reset()
+    server.shutdown()
+
+
+def _events(body):
+    events = []
+    for block in body.decode("utf-8").split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def _cached_entries(cache):
+    return cache.stats()["entries"]
+
+
+def test_tokens_add_up_to_the_answer_and_it_is_cached(client, stub):
+    state, gateway, cache = stub
+    response = client.post("/api/ai/virtual-assistant/stream", json=QUESTION)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["X-Accel-Buffering"] == "no"
+    events = _events(response.data)
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1 and events[-1][0] == "done"
+    assert "".join(tokens).strip() == events[-1][1]["text"]
+    assert events[-1][1]["text"].startswith("Resposta do stub para:")
+
+    again = _events(client.post("/api/ai/virtual-assistant/stream", json=QUESTION).data)
+    assert again == [("token", {"text": "".join(tokens)}), events[-1]]
+    blocking = client.post("/api/ai/virtual-assistant", json=QUESTION).json
+    assert blocking["response"] == events[-1][1]["text"]
+    assert state.snapshot()["streams"] == 1 and state.snapshot()["completions"] == 0
+    assert _cached_entries(cache) == 1 and gateway.stats()["in_flight"] == 0
+
+
+def test_disconnect_mid_stream_frees_the_slot_and_caches_nothing(client, stub):
+    state, gateway, cache = stub
+    payload = {"materials": [{"name": "Vinil", "quantity": 3, "unit": "m²"}]}
+    response = client.post("/api/ai/generate-project-description/stream", json=payload, buffered=False)
+    assert response.status_code == 200
+    first = next(response.response)
+    assert first.startswith(b"event: token")
+    assert gateway.stats()["in_flight"] == 1
+    response.close()
+
+    assert gateway.stats()["in_flight"] == 0
+    assert _cached_entries(cache) == 0
+    # the single gateway slot is free again: a new stream opens instead of a 503
+    complete = _events(client.post("/api/ai/generate-project-description/stream", json=payload).data)
+    assert complete[-1][0] == "done" and state.snapshot()["streams"] == 2
+
+
+def test_failures_before_the_first_byte_are_http_statuses(client, stub, monkeypatch):
+    state, gateway, _ = stub
+    assert client.post("/api/ai/virtual-assistant/stream", json={}).status_code == 400
+
+    state.fail_rate = 1.0
+    response = client.post("/api/ai/virtual-assistant/stream", json=QUESTION)
+    assert response.status_code == 502 and response.mimetype == "application/json", response.data
+    assert gateway.stats()["in_flight"] == 0
+
+    state.fail_rate = 0.0
+    monkeypatch.delenv("OPENAI_API_KEY")
+    gateway.reset()
+    response = client.post("/api/ai/virtual-assistant/stream", json={"question": "Outra pergunta"})
+    assert response.status_code == 501, response.json
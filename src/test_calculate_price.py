@@ -0,0 +1,112 @@
+"""
+/api/calculate-price and /api/calculate-price/batch: malformed ids are rejected
+per item (the batch keeps pricing the valid items), the batch prices match the
+single-item endpoint, the quote cache never serves a stale difficulty row, and
+creating or deleting a franchise rule set changes that franchise's quotes.
+"""
+
+import json
+import pathlib
+
+from src.models.user import db
+from src.models.difficulty import DifficultyFactor
+from src.models.pricing_rule import PricingRulesVersion
+from src.services.rule_sets import VERSION_ROW_ID
+
+RULES_FILE = pathlib.Path(__file__).resolve().parent / "extracted_pricing_data.json"
+
+
+def _item(seeded, material=0, difficulty=0, **overrides):
+    item = {
+        "material_id": seeded["materials"][material],
+        "difficulty_id": seeded["difficulties"][difficulty],
+        "quantity": 10,
+        "employee_level": "mid",
+        "estimated_days": 2,
+        "num_envelopers": 2,
+    }
+    item.update(overrides)
+    return item
+
+
+def test_batch_reports_bad_items_and_prices_the_rest(client, seeded):
+    items = [
+        _item(seeded),
+        _item(seeded, material_id=[1]),
+        _item(seeded, difficulty_id={"id": 1}),
+        _item(seeded, material_id=7),
+        _item(seeded, material_id="missing"),
+        "not an object",
+        _item(seeded, 1, 2),
+    ]
+    response = client.post("/api/calculate-price/batch", json={"items": items})
+    assert response.status_code == 200, response.json
+    body = response.json
+    errors = {r["index"]: r["error"] for r in body["items"] if "error" in r}
+    assert errors == {
+        1: "'material_id' must be a string",
+        2: "'difficulty_id' must be a string",
+        3: "'material_id' must be a string",
+        4: "Material not found: missing",
+        5: "Item must be an object",
+    }
+    assert (body["item_count"], body["error_count"]) == (2, 5)
+
+    priced = [r for r in body["items"] if "error" not in r]
+    assert [r["index"] for r in priced] == [0, 6]
+    for result in priced:
+        single = client.post("/api/calculate-price", json=items[result["index"]]).json
+        assert result["selling_price"] == single["selling_price"]
+    assert body["totals"]["selling_price"] == round(sum(r["selling_price"] for r in priced), 2)
+
+
+def test_unhashable_ids_are_a_client_error_on_every_endpoint(client, seeded):
+    bad = _item(seeded, material_id=[1])
+    assert client.post("/api/calculate-price", json=bad).status_code == 400
+    for url in ("/api/calculate-price/scenarios", "/api/calculate-price/risk"):
+        response = client.post(url, json={"items": [bad]})
+        assert response.status_code == 400, (url, response.json)
+        assert response.json["error"] == "'material_id' must be a string"
+    project = {"nome_projeto": "P", "id_cliente": seeded["clients"][0], "id_franqueado": seeded["franchise_id"],
+               "items": [_item(seeded, difficulty_id=[seeded["difficulties"][0]])]}
+    assert client.post("/api/projects", json=project).status_code == 400
+
+
+def test_quote_cache_key_follows_the_difficulty_row(app, client, seeded):
+    item = _item(seeded)
+    first = client.post("/api/calculate-price", json=item).json
+    assert client.post("/api/calculate-price", json=item).json["cache_hit"] is True
+
+    with app.app_context():
+        db.session.get(DifficultyFactor, seeded["difficulties"][0]).descricao = "Superfície irregular"
+        db.session.commit()
+    quote = client.post("/api/calculate-price", json=item).json
+    assert quote["cache_hit"] is False
+    assert quote["difficulty"]["descricao"] == "Superfície irregular"
+    assert quote["selling_price"] == first["selling_price"]
+
+
+def test_rule_set_create_and_delete_change_the_franchise_quote(app, client, seeded):
+    item = _item(seeded)
+    franchise_item = dict(item, franchisee_id=seeded["franchise_id"])
+    base = client.post("/api/calculate-price", json=franchise_item).json
+
+    rules = json.loads(RULES_FILE.read_text())
+    rules["employee_rates"] = {level: rate * 2 for level, rate in rules["employee_rates"].items()}
+    response = client.post("/api/pricing-rules/sets", json=dict(
+        rules, nome="Tabela dobrada", id_franqueado=seeded["franchise_id"], vigente_desde="2020-01-01T00:00:00",
+    ))
+    assert response.status_code == 201, response.json
+    rule_set_id = response.json["rule_set"]["id"]
+
+    doubled = client.post("/api/calculate-price", json=franchise_item).json
+    assert doubled["cache_hit"] is False and doubled["rules_version"] != base["rules_version"]
+    assert doubled["labor_cost"] == 2 * base["labor_cost"]
+    other = client.post("/api/calculate-price", json=dict(item, franchisee_id="other-franchise")).json
+    assert (other["rules_version"], other["selling_price"]) == (base["rules_version"], base["selling_price"])
+
+    assert client.delete(f"/api/pricing-rules/sets/{rule_set_id}").status_code == 200
+    restored = client.post("/api/calculate-price", json=franchise_item).json
+    assert (restored["rules_version"], restored["selling_price"]) == (base["rules_version"], base["selling_price"])
+    with app.app_context():
+        assert db.session.get(PricingRulesVersion, VERSION_ROW_ID).versao == 2
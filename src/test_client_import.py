@@ -0,0 +1,70 @@
+"""
+/api/clients/import: bad and duplicate rows are reported by line while the
+valid rows are written in batches (with the franchise client counter), the
+delimiter and header aliases are detected, and unreadable files are a 400.
+"""
+
+import io
+
+from src.models.user import db
+from src.models.client import Client
+from src.services import franchise_stats
+
+
+def _import(client, franchise_id, body, **params):
+    return client.post("/api/clients/import", query_string=dict(params, franchisee_id=franchise_id),
+                       data=body.encode("utf-8") if isinstance(body, str) else body, content_type="text/csv")
+
+
+def test_bad_rows_are_reported_and_the_rest_imported_in_batches(app, client, seeded):
+    franchise_id = seeded["franchise_id"]
+    existing = client.get(f"/api/clients/{seeded['clients'][0]}").json
+    csv_body = "\n".join([
+        "Name;E-mail;Celular;Endereço;Ignorada",
+        "Ana Souza;ana@exemplo.com;(11) 91234-0001;Rua A, 1;x",
+        ";sem-nome@exemplo.com;;;",
+        "Bruno Lima;bruno@exemplo;;;",
+        "Carla Dias;CARLA@exemplo.com;;;",
+        "Carla Repetida;carla@exemplo.com;;;",
+        "Daniel Rocha;daniel@exemplo.com;11 91234 0001;;",
+        f"Cliente Existente;{existing['email'].upper()};;;",
+        f"{'E' * 201};longo@exemplo.com;;;",
+        "Eva Nunes;;(21) 3000-0000;;",
+        "Fábio Reis;fabio@exemplo.com;;;",
+    ])
+    response = _import(client, franchise_id, csv_body, batch_size=2)
+    assert response.status_code == 200, response.json
+    report = response.json
+    assert {k: report[k] for k in ("rows", "imported", "invalid", "duplicates", "batches")} == {
+        "rows": 10, "imported": 4, "invalid": 3, "duplicates": 3, "batches": 2,
+    }
+    assert {e["line"]: e["errors"] for e in report["errors"]} == {
+        3: ["nome is required"],
+        4: ["invalid email"],
+        6: ["duplicate email/telefone (file or existing client)"],
+        7: ["duplicate email/telefone (file or existing client)"],
+        8: ["duplicate email/telefone (file or existing client)"],
+        9: ["nome longer than 200 characters"],
+    }
+
+    with app.app_context():
+        imported = {c.nome: c for c in Client.query.filter(Client.id.notin_(seeded["clients"]))}
+        assert set(imported) == {"Ana Souza", "Carla Dias", "Eva Nunes", "Fábio Reis"}
+        assert (imported["Ana Souza"].telefone, imported["Ana Souza"].endereco) == ("(11) 91234-0001", "Rua A, 1")
+        counters = franchise_stats.get_stats(db.session, franchise_id).total_clientes
+        assert counters == Client.query.filter_by(id_franqueado=franchise_id).count()
+
+
+def test_unreadable_files_are_rejected(client, seeded):
+    franchise_id = seeded["franchise_id"]
+    response = _import(client, franchise_id, "email,telefone\na@exemplo.com,1\n")
+    assert (response.status_code, response.json["error"]) == (400, "CSV header must include a 'nome' column")
+    response = _import(client, franchise_id, "nome\nJos\xe9\n".encode("latin-1"))
+    assert response.status_code == 400 and "utf-8-sig" in response.json["error"]
+    assert _import(client, franchise_id, "nome\nA\n", batch_size=0).status_code == 400
+    assert _import(client, None, "nome\nA\n").status_code == 400
+
+    upload = client.post("/api/clients/import", data={
+        "franchisee_id": franchise_id, "file": (io.BytesIO(b"nome\tphone\nGil\t555\n"), "clientes.tsv"),
+    }, content_type="multipart/form-data")
+    assert upload.status_code == 200 and upload.json["imported"] == 1, upload.json
@@ -0,0 +1,107 @@
+"""
+Client search on SQLite with the FTS5 index of migrations 0007 and 0011 applied
+to the test database: accent-insensitive prefixes, digits and mid-word
+fragments through the trigram table, typo tolerance, trigger upkeep, and
+results that survive a VACUUM (the index is keyed by clients_fts_docs.docid,
+not by the clients rowid).
+"""
+
+import importlib.util
+import pathlib
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.client import Client
+from src.services import client_search
+
+VERSIONS = pathlib.Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+
+def _migration(filename):
+    spec = importlib.util.spec_from_file_location(filename[:-3], VERSIONS / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(filenames, direction):
+    context = MigrationContext.configure(db.session.connection())
+    with Operations.context(context):
+        for filename in filenames:
+            getattr(_migration(filename), direction)()
+    db.session.commit()
+
+
+@pytest.fixture
+def indexed(app, seeded, monkeypatch):
+    monkeypatch.setattr(client_search, "_backends", {})
+    with app.app_context():
+        db.session.add_all([
+            Client(id_franqueado=seeded["franchise_id"], nome="João Silva", email="joao@exemplo.com",
+                   telefone="(11) 9999-0000"),
+            Client(id_franqueado=seeded["franchise_id"], nome="Mariana Costa", email="mari@exemplo.com",
+                   telefone="(21) 3456-7890"),
+            Client(id_franqueado="other-franchise", nome="João Silveira", email="js@exemplo.com",
+                   telefone="(11) 9999-0001"),
+        ])
+        db.session.commit()
+        _run(["0007_client_search_index.py", "0011_client_search_docids_trigram.py"], "upgrade")
+    yield seeded["franchise_id"]
+    with app.app_context():  # drop_all does not know the FTS tables and triggers
+        _run(["0011_client_search_docids_trigram.py", "0007_client_search_index.py"], "downgrade")
+
+
+def _search(client, franchise_id, q):
+    response = client.get("/api/clients/search", query_string={"franchisee_id": franchise_id, "q": q})
+    assert response.status_code == 200, response.json
+    assert response.json["backend"] == "fts5"
+    return [(item["nome"], item["score"]) for item in response.json["items"]]
+
+
+def _names(client, franchise_id, q):
+    return [name for name, _ in _search(client, franchise_id, q)]
+
+
+def test_prefixes_ignore_accents_and_stay_in_the_franchise(client, indexed):
+    assert _names(client, indexed, "joao sil") == ["João Silva"]
+    assert _search(client, indexed, "MARI")[0] == ("Mariana Costa", 1.0)
+
+
+def test_digits_and_fragments_match_inside_words(client, indexed):
+    assert _names(client, indexed, "99990") == ["João Silva"]
+    assert _names(client, indexed, "9999-0000") == ["João Silva"]
+    assert _names(client, indexed, "ilva") == ["João Silva"]
+    assert _names(client, indexed, "ariana cos") == ["Mariana Costa"]
+
+
+def test_typos_are_tolerated(client, indexed):
+    results = _search(client, indexed, "Joao Slva")
+    assert results[0][0] == "João Silva" and 0.7 <= results[0][1] < 1.0
+    assert _names(client, indexed, "marina costa") == ["Mariana Costa"]
+    assert _names(client, indexed, "xyzw") == []
+
+
+def test_triggers_keep_the_index_and_vacuum_does_not_break_it(app, client, indexed):
+    with app.app_context():
+        for c in Client.query.filter(Client.id_franqueado == indexed).all():
+            if c.nome != "João Silva":
+                db.session.delete(c)
+        db.session.add(Client(id_franqueado=indexed, nome="Ana Beatriz", telefone="(31) 5555-1234"))
+        db.session.commit()
+        silva = Client.query.filter_by(nome="João Silva").one()
+        silva.telefone = "(11) 8888-7777"
+        db.session.commit()
+        db.session.execute(text("VACUUM"))
+
+    assert _names(client, indexed, "99990") == []
+    assert _names(client, indexed, "88887") == ["João Silva"]
+    assert _names(client, indexed, "beatriz") == ["Ana Beatriz"]
+    assert _names(client, indexed, "mariana") == []
+
+    result = app.test_cli_runner().invoke(args=["crm", "rebuild-search-index"])
+    assert result.output.strip() == "clients_fts: 3 cliente(s) indexado(s)", result.output
+    assert _names(client, indexed, "55551") == ["Ana Beatriz"]
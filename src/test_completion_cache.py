@@ -0,0 +1,78 @@
+"""
+LLM completion cache (src/services/completion_cache.py), one SQLite file per
+test: prompt normalization in the key, TTL expiry, LRU eviction at max_entries,
+per-endpoint counters and disabled endpoints.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from src.services.completion_cache import CompletionCache, completion_key
+
+
+def _cache(**options):
+    directory = tempfile.mkdtemp()
+    return CompletionCache(path=os.path.join(directory, "cache.db"), **options), directory
+
+
+def test_key_ignores_indentation_and_role_case():
+    a = [{"role": "User", "content": "\n    Pergunta:  qual tinta?\n    "}]
+    b = [{"role": "user", "content": "Pergunta: qual tinta?"}]
+    assert completion_key(a, "gpt-4o-mini", 0.7, 500) == completion_key(b, "gpt-4o-mini", 0.7, 500)
+    assert completion_key(a, "gpt-4o-mini", 0.7, 500) != completion_key(a, "gpt-4o-mini", 0.2, 500)
+    assert completion_key(a, "gpt-4o-mini", 0.7, 500) != completion_key(a, "gpt-4o", 0.7, 500)
+
+
+def test_entries_expire_after_ttl():
+    cache, directory = _cache(ttl=0.2, max_entries=10)
+    try:
+        cache.put("k", "texto", "gpt-4o-mini", "virtual-assistant")
+        assert cache.get("k", "virtual-assistant") == "texto"
+        time.sleep(0.3)
+        assert cache.get("k", "virtual-assistant") is None
+        assert cache.stats()["entries"] == 0
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_least_recently_used_entries_are_evicted_at_max_entries():
+    cache, directory = _cache(ttl=3600, max_entries=3)
+    try:
+        for key in ("a", "b", "c"):
+            cache.put(key, f"texto {key}", "gpt-4o-mini")
+            time.sleep(0.01)
+        assert cache.get("a") == "texto a"  # "a" passa a ser o mais recente
+        time.sleep(0.01)
+        cache.put("d", "texto d", "gpt-4o-mini")
+        assert cache.stats()["entries"] == 3
+        assert cache.get("b") is None
+        assert [cache.get(key) for key in ("a", "c", "d")] == ["texto a", "texto c", "texto d"]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_counters_are_kept_per_endpoint():
+    cache, directory = _cache(ttl=3600, max_entries=10)
+    try:
+        cache.get("k", "suggest-materials")
+        cache.put("k", "texto", "gpt-4o-mini", "suggest-materials")
+        cache.get("k", "suggest-materials")
+        cache.get("k", "suggest-materials")
+        stats = cache.stats()["endpoints"]["suggest-materials"]
+        assert (stats["hits"], stats["misses"]) == (2, 1), stats
+        assert stats["hit_rate"] == round(2 / 3, 4)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_disabled_endpoints_and_zero_size_skip_the_cache():
+    cache, directory = _cache(max_entries=10, disabled_endpoints={"virtual-assistant"})
+    try:
+        assert not cache.enabled_for("virtual-assistant")
+        assert cache.enabled_for("suggest-materials")
+        assert not CompletionCache(path=cache.path, max_entries=0).enabled_for("suggest-materials")
+    finally:
+        shutil.rmtree(directory)
+
@@ -0,0 +1,211 @@
+"""
+Dashboard counters (src/services/franchise_stats.py): the incremental updates
+made by the write routes must end up where `reconcile` (a full recount from
+clients/projects) would put them, and /api/dashboard/stats derives its
+indicators from a single read of them. The monthly rollups kept by the same
+writes agree with `backfill_monthly`, which rebuilds them from the projects,
+including after PUT /api/projects/status changes many projects at once.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from src.models.user import db
+from src.models.client import Client
+from src.models.material import Material
+from src.models.project import Project
+from src.models.franchise_stats import FranchiseMonthlyStats, FranchiseStats
+from src.services import franchise_stats
+from src.services.query_stats import QueryCounter
+
+
+def _item(seeded, material=0, quantity=10):
+    return {
+        "material_id": seeded["materials"][material],
+        "difficulty_id": seeded["difficulties"][0],
+        "quantity": quantity,
+        "employee_level": "mid",
+        "estimated_days": 2,
+        "num_envelopers": 2,
+    }
+
+
+def _create(client, seeded, *items):
+    response = client.post("/api/projects", json={
+        "nome_projeto": "Projeto", "id_cliente": seeded["clients"][0], "id_franqueado": seeded["franchise_id"],
+        "items": list(items),
+    })
+    assert response.status_code == 201, response.json
+    return response.json["project"]["id"]
+
+
+def _set_status(client, project_id, status):
+    response = client.put(f"/api/projects/{project_id}/status", json={"status": status})
+    assert response.status_code == 200, response.json
+
+
+def _counters(app):
+    with app.app_context():
+        return {
+            row.id_franqueado: {k: v for k, v in row.to_dict().items() if k != "data_atualizacao"}
+            for row in FranchiseStats.query
+        }
+
+
+def _reconciled(app):
+    with app.app_context():
+        franchise_stats.reconcile(db.session)
+        db.session.commit()
+    return _counters(app)
+
+
+def test_counters_match_reconcile_after_every_write(app, client, seeded):
+    franchise_id = seeded["franchise_id"]
+    response = client.post("/api/clients", json={"nome": "Cliente Novo", "id_franqueado": franchise_id})
+    assert response.status_code == 201
+    approved = _create(client, seeded, _item(seeded), _item(seeded, 1, 3))
+    sent = _create(client, seeded, _item(seeded, 2))
+    draft = _create(client, seeded, _item(seeded, 0, 4))
+    deleted = _create(client, seeded, _item(seeded, 3))
+    _set_status(client, approved, "Aprovado")
+    _set_status(client, sent, "Enviado")
+    _set_status(client, sent, "Rejeitado")
+    assert client.delete(f"/api/projects/{deleted}").status_code == 200
+    with app.app_context():
+        db.session.get(Material, seeded["materials"][0]).custo_unitario_base = Decimal("31.40")
+        db.session.commit()
+    summary = client.post("/api/repricing/drafts", json={"material_ids": [seeded["materials"][0]]}).json
+    assert summary["project_ids"] == [draft]
+
+    counters = _counters(app)
+    assert counters == _reconciled(app)
+    stats = counters[franchise_id]
+    assert (stats["total_clientes"], stats["projetos_rascunho"], stats["projetos_aprovado"],
+            stats["projetos_rejeitado"]) == (3, 1, 1, 1)
+
+    dashboard = client.get(f"/api/dashboard/stats?franchisee_id={franchise_id}").json
+    assert dashboard["revenue_by_status"] == {
+        "Rascunho": stats["receita_rascunho"],
+        "Enviado": 0.0,
+        "Aprovado": stats["receita_aprovada"],
+        "Rejeitado": stats["receita_rejeitado"],
+    }
+    assert dashboard["total_revenue"] == stats["receita_aprovada"] > 0
+    assert dashboard["projects_by_status"] == {"Rascunho": 1, "Enviado": 0, "Aprovado": 1, "Rejeitado": 1}
+
+
+def test_dashboard_indicators_from_one_counter_read(app, client, seeded):
+    franchise_id = seeded["franchise_id"]
+    empty = client.get("/api/dashboard/stats?franchisee_id=no-such-franchise").json
+    assert (empty["total_projects"], empty["approval_rate"], empty["average_ticket"]) == (0, 0.0, 0.0)
+
+    approved = [_create(client, seeded, _item(seeded, i, 5 + i)) for i in range(3)]
+    rejected = _create(client, seeded, _item(seeded, 1))
+    _create(client, seeded, _item(seeded, 2))
+    for project_id in approved:
+        _set_status(client, project_id, "Aprovado")
+    _set_status(client, rejected, "Rejeitado")
+
+    with app.app_context():
+        with QueryCounter(db.engine) as counter:
+            dashboard = client.get(f"/api/dashboard/stats?franchisee_id={franchise_id}").json
+        projects = Project.query.filter_by(id_franqueado=franchise_id).all()
+        total_clients = Client.query.filter_by(id_franqueado=franchise_id).count()
+    # response-cache version check + the franchise_stats row; never a scan of projects/clients
+    assert counter.count <= 2, counter.statements
+    assert not any("FROM projects" in sql or "FROM clients" in sql for sql in counter.statements), counter.statements
+
+    revenue = sum(p.preco_venda_sugerido for p in projects if p.status == "Aprovado")
+    assert dashboard["total_projects"] == len(projects) == 5
+    assert dashboard["approved_projects_count"] == 3
+    assert dashboard["total_revenue"] == float(revenue)
+    assert dashboard["approval_rate"] == 60.0
+    assert dashboard["average_ticket"] == float((revenue / 3).quantize(Decimal("0.01")))
+    assert dashboard["projects_per_client"] == round(5 / total_clients, 1)
+
+
+def _monthly(app):
+    with app.app_context():
+        return {(row.id_franqueado, row.mes): row.to_dict() for row in FranchiseMonthlyStats.query}
+
+
+def test_monthly_rollups_match_the_backfill(app, client, seeded):
+    franchise_id = seeded["franchise_id"]
+    approved = _create(client, seeded, _item(seeded))
+    rejected = _create(client, seeded, _item(seeded, 1))
+    _create(client, seeded, _item(seeded, 2))
+    _set_status(client, approved, "Aprovado")
+    _set_status(client, rejected, "Enviado")
+    _set_status(client, rejected, "Rejeitado")
+    current = franchise_stats.month_start(None)
+    incremental = _monthly(app)
+    assert incremental[(franchise_id, current)]["project_count"] == 3
+
+    # histórico anterior aos contadores (sem passar pelas rotas) e uma linha órfã
+    three_ago, five_ago = franchise_stats._next_month(current, -3), franchise_stats._next_month(current, -5)
+    with app.app_context():
+        db.session.execute(Project.__table__.insert(), [
+            {"id_franqueado": franchise_id, "id_cliente": seeded["clients"][0], "nome_projeto": "Antigo",
+             "status": status, "margem_lucro_aplicada": Decimal(margin), "preco_venda_sugerido": Decimal(price),
+             "data_criacao": datetime.combine(month, datetime.min.time()) + timedelta(days=3)}
+            for month, status, margin, price in [
+                (five_ago, "Aprovado", "0.30", "1000.00"), (five_ago, "Aprovado", "0.20", "500.00"),
+                (five_ago, "Rejeitado", "0.40", "900.00"), (three_ago, "Rascunho", "0.25", "700.00"),
+            ]
+        ])
+        db.session.add(FranchiseMonthlyStats(id_franqueado=franchise_id, mes=date(2001, 1, 1), total_projetos=9))
+        db.session.commit()
+        windows, rows = franchise_stats.backfill_monthly(db.session, franchise_id, batch_months=2)
+    assert (windows, rows) == (3, 3)
+
+    backfilled = _monthly(app)
+    assert set(backfilled) == {(franchise_id, m) for m in (five_ago, three_ago, current)}
+    assert backfilled[(franchise_id, current)] == incremental[(franchise_id, current)]
+    assert backfilled[(franchise_id, five_ago)] == {
+        "month": five_ago.strftime("%Y-%m"), "project_count": 3, "approved_count": 2, "rejected_count": 1,
+        "approved_revenue": 1500.0, "average_margin": 0.3, "average_ticket": 750.0, "approval_rate": 66.7,
+    }
+
+    response = client.get("/api/dashboard/timeseries", query_string={
+        "franchisee_id": franchise_id, "start": five_ago.strftime("%Y-%m"), "end": current.strftime("%Y-%m"),
+    })
+    assert response.status_code == 200, response.json
+    months = response.json["months"]
+    assert [m["project_count"] for m in months] == [3, 0, 1, 0, 0, 3]
+    assert months[1]["approval_rate"] is None and months[2]["average_margin"] == 0.25
+
+
+def test_bulk_status_outcomes_and_counter_deltas(app, client, seeded):
+    franchise_id = seeded["franchise_id"]
+    drafts = [_create(client, seeded, _item(seeded, i % 3, 4 + i)) for i in range(4)]
+    sent = _create(client, seeded, _item(seeded, 1))
+    _set_status(client, sent, "Enviado")
+
+    response = client.put("/api/projects/status", json={
+        "status": "Enviado", "ids": [drafts[0], sent, "missing", drafts[1], drafts[0]],
+    })
+    assert response.status_code == 200, response.json
+    body = response.json
+    assert (body["updated"], body["unchanged"], body["not_found"]) == (2, 1, 1)
+    assert [(r["id"], r["outcome"], r.get("previous_status")) for r in body["results"]] == [
+        (drafts[0], "updated", "Rascunho"), (sent, "unchanged", None),
+        ("missing", "not_found", None), (drafts[1], "updated", "Rascunho"),
+    ]
+
+    response = client.put("/api/projects/status", json={
+        "status": "Aprovado", "filter": {"franchisee_id": franchise_id, "status": "Enviado"},
+    })
+    assert (response.json["updated"], response.json["unchanged"]) == (3, 0), response.json
+    assert {r["id"] for r in response.json["results"]} == {drafts[0], drafts[1], sent}
+
+    for payload in ({"status": "Aprovado"}, {"status": "Aprovado", "ids": []}, {"status": "Aprovado", "ids": [1]},
+                    {"status": "Perdido", "ids": [drafts[2]]}):
+        assert client.put("/api/projects/status", json=payload).status_code == 400, payload
+
+    stats = _counters(app)[franchise_id]
+    assert (stats["projetos_rascunho"], stats["projetos_enviado"], stats["projetos_aprovado"]) == (2, 0, 3)
+    monthly = _monthly(app)
+    assert _counters(app) == _reconciled(app)
+    with app.app_context():
+        franchise_stats.backfill_monthly(db.session, franchise_id)
+    assert _monthly(app) == monthly
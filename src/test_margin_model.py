@@ -0,0 +1,94 @@
+"""
+Margin optimizer (src/services/margin_model.py): with a decided-project history
+drawn from a known approval curve, the recommended margin must land on the
+curve's expected-profit maximum; refits warm-start from the previous model
+re-expressed in the new standardization and reach the cold-start fit.
+"""
+
+import numpy as np
+import pytest
+
+from src.models.user import db
+from src.models.client import Client
+from src.models.project import Project
+from src.services import margin_model
+from src.services.pricing_rules import PricingRules
+
+RULES = PricingRules({
+    "employee_rates": {"mid": 250.0},
+    "difficulty_factors": {"1": {"material_multiplier": 2.3, "tax_rate": 0.07}},
+    "margin_ranges": {"min": 0.20, "default": 0.30, "max": 0.45},
+}, "test")
+FRANCHISE = "franchise-curve"
+# P(aprovar | margem) = sigmoid(6 - 20 * margem): 50% a 30%, 88% a 20%, 12% a 40%
+INTERCEPT, SLOPE = 6.0, -20.0
+COSTS = (800.0, 1250.0)
+
+
+def _approval(margins):
+    return 1.0 / (1.0 + np.exp(-(INTERCEPT + SLOPE * np.asarray(margins))))
+
+
+def _history(app, margins=np.round(np.arange(0.15, 0.46, 0.01), 2), per_margin=200):
+    """Projetos decididos cuja taxa de aprovação por margem segue a curva (sem ruído de amostragem)."""
+    with app.app_context():
+        client = Client(id_franqueado=FRANCHISE, nome="Cliente")
+        db.session.add(client)
+        db.session.flush()
+        rows = []
+        for margin, probability in zip(margins, _approval(margins)):
+            approved = int(round(probability * per_margin))
+            for i in range(per_margin):
+                rows.append({
+                    "id_franqueado": FRANCHISE, "id_cliente": client.id, "nome_projeto": "Histórico",
+                    "status": "Aprovado" if i < approved else "Rejeitado",
+                    "margem_lucro_aplicada": float(margin), "custo_total_estimado": COSTS[i % 2],
+                })
+        db.session.execute(Project.__table__.insert(), rows)
+        db.session.commit()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = margin_model.MarginModelCache()
+    monkeypatch.setattr(margin_model, "model_cache", fresh)
+    return fresh
+
+
+def test_recommended_margin_is_the_expected_profit_maximum_of_the_curve(app, cache):
+    _history(app)
+    grid = np.arange(0.20, 0.45 + 1e-9, 0.0001)
+    expected = grid[np.argmax(_approval(grid) * grid)]  # ~0.235
+
+    with app.app_context():
+        result = margin_model.optimize_margin(RULES, FRANCHISE, 1000)
+    assert result["method"] == "logistic" and result["model"]["scope"] == "franchise"
+    assert abs(result["recommended_margin"] - expected) <= 0.01, (result["recommended_margin"], expected)
+    assert result["approval_probability"] == pytest.approx(float(_approval(expected)), abs=0.03)
+    assert result["model"]["margin_coefficient"] == pytest.approx(SLOPE, rel=0.1)
+
+
+def test_restandardize_keeps_the_model_predictions():
+    rng = np.random.default_rng(7)
+    coef = np.array([0.4, -1.3, 0.2])
+    mean, scale = np.array([0.3, 6.9]), np.array([0.08, 0.25])
+    new_mean, new_scale = np.array([0.27, 7.1]), np.array([0.05, 0.4])
+    margins, costs = rng.uniform(0.2, 0.45, 50), rng.uniform(500, 2000, 50)
+
+    moved = margin_model.restandardize(coef, mean, scale, new_mean, new_scale)
+    before = margin_model._design(margins, costs, mean, scale) @ coef
+    after = margin_model._design(margins, costs, new_mean, new_scale) @ moved
+    np.testing.assert_allclose(after, before, rtol=1e-12, atol=1e-12)
+
+
+def test_refit_warm_start_reaches_the_cold_fit(app, cache):
+    _history(app, margins=np.round(np.arange(0.20, 0.31, 0.01), 2), per_margin=40)
+    with app.app_context():
+        first = cache.get(FRANCHISE)
+    _history(app, margins=np.round(np.arange(0.31, 0.46, 0.01), 2), per_margin=40)  # shifts mean and scale
+    with app.app_context():
+        warm = cache.get(FRANCHISE)
+        cold = margin_model.MarginModelCache().get(FRANCHISE)
+    assert cache.fits == 2 and not np.allclose(warm.mean, first.mean)
+    np.testing.assert_allclose(warm.coef, cold.coef, rtol=1e-6, atol=1e-8)
+    assert warm.iterations < cold.iterations  # raw old coefficients in the new standardization: no gain
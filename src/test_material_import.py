@@ -0,0 +1,107 @@
+"""
+/api/materials/import (src/services/material_import.py): the supplier sheet
+goes through the staging table into one upsert by material name, the report
+lists only the new and changed materials, `reprice` recalculates the drafts
+that use a material whose cost changed, and dry runs or sheets without valid
+rows leave everything as it was.
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.user import db
+from src.models.material import Material, MaterialImportStaging
+from src.models.project import Project
+from src.services import rule_sets
+
+
+def _import(client, body, **params):
+    return client.post("/api/materials/import", query_string=params, data=body.encode("utf-8"),
+                       content_type="text/csv")
+
+
+def _materials(app):
+    with app.app_context():
+        return {m.nome: (m.id, m.custo_unitario_base, m.unidade_medida, m.descricao) for m in Material.query}
+
+
+def _draft(client, seeded, material):
+    response = client.post("/api/projects", json={
+        "nome_projeto": "Projeto", "id_cliente": seeded["clients"][0], "id_franqueado": seeded["franchise_id"],
+        "items": [{"material_id": seeded["materials"][material], "difficulty_id": seeded["difficulties"][0],
+                   "quantity": 10, "employee_level": "mid", "estimated_days": 2, "num_envelopers": 2}],
+    })
+    assert response.status_code == 201, response.json
+    return response.json["project"]
+
+
+@pytest.fixture
+def loaded_rule_sets(monkeypatch):
+    # Snapshot loaded by the first quote and kept, as between the production checks: a
+    # refresh opens its own connection, which on the shared in-memory test database
+    # would end the import's transaction.
+    monkeypatch.setattr(rule_sets, "_store", rule_sets._DbRulesStore(3600))
+
+
+def test_sheet_upserts_by_name_and_reprices_affected_drafts(app, client, seeded, loaded_rule_sets):
+    before = _materials(app)
+    names = {material_id: name for name, (material_id, *_) in before.items()}
+    changed, unchanged = names[seeded["materials"][0]], names[seeded["materials"][1]]
+    old_cost = before[changed][1]
+    uses_changed = _draft(client, seeded, 0)
+    uses_unchanged = _draft(client, seeded, 1)
+
+    sheet = "\n".join([
+        "Produto;Preço;Unidade;Descrição",
+        f"{changed};R$ {old_cost + Decimal('10.50')};;",
+        f"{unchanged};{before[unchanged][1]};;",
+        "Vinil Novo;1.234,56;rolo;Lançamento",
+        "Sem Preço;abc;;",
+        f"{changed};1,00;;",
+    ])
+    response = _import(client, sheet, reprice="true")
+    assert response.status_code == 200, response.json
+    report = response.json
+    assert {k: report[k] for k in ("rows", "staged", "inserted", "updated", "unchanged", "invalid")} == {
+        "rows": 5, "staged": 3, "inserted": 1, "updated": 1, "unchanged": 1, "invalid": 2,
+    }
+    assert [e["line"] for e in report["errors"]] == [5, 6]
+    assert [(c["nome"], c["action"], c["delta"]) for c in report["changes"]] == [
+        (changed, "updated", 10.5), ("Vinil Novo", "inserted", None),
+    ]
+    assert report["repricing"]["project_ids"] == [uses_changed["id"]]
+
+    after = _materials(app)
+    assert after[changed][:3] == (before[changed][0], old_cost + Decimal("10.50"), before[changed][2])
+    assert after[unchanged] == before[unchanged]
+    assert after["Vinil Novo"][1:] == (Decimal("1234.56"), "rolo", "Lançamento")
+    with app.app_context():
+        assert MaterialImportStaging.query.count() == 0
+        repriced = db.session.get(Project, uses_changed["id"])
+        assert repriced.custo_total_estimado > Decimal(str(uses_changed["custo_total_estimado"]))
+        assert db.session.get(Project, uses_unchanged["id"]).preco_venda_sugerido == \
+            Decimal(str(uses_unchanged["preco_venda_sugerido"]))
+
+    quote = client.post("/api/calculate-price", json={
+        "material_id": seeded["materials"][0], "difficulty_id": seeded["difficulties"][0], "quantity": 10,
+        "employee_level": "mid", "estimated_days": 2, "num_envelopers": 2, "margin": 0.2,
+    }).json
+    assert quote["cache_hit"] is False
+    assert Decimal(str(quote["selling_price"])) == repriced.preco_venda_sugerido
+
+
+def test_dry_run_and_sheets_without_valid_rows_change_nothing(app, client, seeded):
+    before = _materials(app)
+    name = next(iter(before))
+    dry_run = _import(client, f"nome,custo\n{name},999\nNovo,5\n", dry_run="1").json
+    assert (dry_run["dry_run"], dry_run["inserted"], dry_run["updated"]) == (True, 1, 1)
+    assert _materials(app) == before
+
+    response = _import(client, "nome,custo\n,5\nX,-1\n")
+    assert (response.status_code, response.json["error"]) == (400, "No valid rows in file")
+    response = _import(client, "nome,unidade\nX,m\n")
+    assert (response.status_code, response.json["error"]) == (400, "CSV header must include custo_unitario_base")
+    assert _materials(app) == before
+    with app.app_context():
+        assert MaterialImportStaging.query.count() == 0
@@ -0,0 +1,108 @@
+"""
+Differential tests for src/services/pricing_engine.py: every quote must equal
+the original Decimal formula from routes/pricing.py quantized to centavos
+(ROUND_HALF_UP), including odd rates and multipliers, and bad inputs must raise
+PricingError.
+"""
+
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+from src.services.pricing_rules import PricingRules
+from src.services.pricing_engine import PricingEngine, PricingError, decimal_to_cents
+
+RULES_DATA = {
+    "employee_rates": {"junior": 150.0, "mid": 250.0, "senior": 400.0, "odd": "187.35"},
+    "difficulty_factors": {
+        "1": {"material_multiplier": 2.3, "tax_rate": 0.07},
+        "2": {"material_multiplier": 2.5, "tax_rate": 0.07},
+        "3": {"material_multiplier": 2.8, "tax_rate": 0.12},
+        "4": {"material_multiplier": 3.3, "tax_rate": 0.12},
+        "x": {"material_multiplier": "1.2345", "tax_rate": "0.0925"},
+    },
+    "margin_ranges": {"min": 0.20, "default": 0.30, "max": 0.45},
+}
+
+CENTS = Decimal("0.01")
+
+
+def legacy_decimal_price(difficulty_level, employee_level, unit_cost, quantity, days, envelopers, margin):
+    """The formula as it was written in calculate_price/create_project."""
+    factor = RULES_DATA["difficulty_factors"][difficulty_level]
+    material_multiplier = Decimal(str(factor["material_multiplier"]))
+    tax_rate = Decimal(str(factor["tax_rate"]))
+    daily_rate = Decimal(str(RULES_DATA["employee_rates"][employee_level]))
+
+    material_cost = Decimal(str(quantity)) * Decimal(str(unit_cost)) * material_multiplier
+    labor_cost = daily_rate * Decimal(str(days)) * Decimal(str(envelopers))
+    total_cost_before_tax = material_cost + labor_cost
+    total_cost = total_cost_before_tax * (Decimal("1") + tax_rate)
+    selling_price = total_cost * (Decimal("1") + Decimal(str(margin)))
+    return [
+        int(v.quantize(CENTS, rounding=ROUND_HALF_UP).scaleb(2))
+        for v in (material_cost, labor_cost, total_cost_before_tax, total_cost, selling_price)
+    ]
+
+
+def _engine():
+    return PricingEngine(PricingRules(RULES_DATA, "test"))
+
+
+def _random_decimal(rng, max_int, places):
+    return Decimal(rng.randint(0, max_int * 10 ** places)).scaleb(-places)
+
+
+def test_engine_matches_decimal_path_on_random_inputs():
+    engine = _engine()
+    rng = random.Random(1234)
+    levels = list(RULES_DATA["difficulty_factors"])
+    employees = list(RULES_DATA["employee_rates"])
+    for _ in range(20000):
+        args = (
+            rng.choice(levels),
+            rng.choice(employees),
+            _random_decimal(rng, 500, 2),   # custo_unitario_base Numeric(10,2)
+            _random_decimal(rng, 300, rng.randint(0, 4)),
+            _random_decimal(rng, 30, rng.randint(0, 4)),
+            rng.randint(1, 8),
+            _random_decimal(rng, 1, rng.randint(0, 4)),
+        )
+        quote = engine.quote(*args)
+        got = [quote.material_cost, quote.labor_cost, quote.total_cost_before_tax,
+               quote.total_cost, quote.selling_price]
+        assert got == legacy_decimal_price(*args), args
+
+
+def test_engine_matches_decimal_path_on_rounding_ties():
+    engine = _engine()
+    # 0.005 exatos: meio centavo deve arredondar para cima
+    quote = engine.quote("1", "junior", "0.01", "0.5", 0, 0, 0)
+    assert quote.material_cost == decimal_to_cents(Decimal("0.01") * Decimal("0.5") * Decimal("2.3"))
+    args = ("x", "odd", "33.33", "1.1111", "0.3333", 3, "0.2345")
+    quote = engine.quote(*args)
+    assert [quote.material_cost, quote.labor_cost, quote.total_cost_before_tax, quote.total_cost,
+            quote.selling_price] == legacy_decimal_price(*args)
+
+
+def test_float_inputs_from_json_behave_like_their_decimal_strings():
+    engine = _engine()
+    assert engine.quote("2", "mid", 65.0, 10.1, 1.5, 2, 0.3) == engine.quote("2", "mid", "65.00", "10.1", "1.5", "2", "0.3")
+
+
+def test_default_margin_comes_from_rules():
+    engine = _engine()
+    quote = engine.quote("1", "mid", "25.00", 10, 2, 2)
+    assert quote.margin == Decimal("0.2")
+    assert quote.selling_price == legacy_decimal_price("1", "mid", "25.00", 10, 2, 2, "0.2")[4]
+
+
+def test_invalid_inputs_raise_pricing_error():
+    engine = _engine()
+    for args in (("9", "mid", 1, 1, 1, 1), ("1", "ceo", 1, 1, 1, 1), ("1", "mid", 1, "abc", 1, 1),
+                 ("1", "mid", 1, "NaN", 1, 1), ("1", "mid", 1, True, 1, 1)):
+        try:
+            engine.quote(*args)
+        except PricingError:
+            continue
+        raise AssertionError(f"expected PricingError for {args}")
+
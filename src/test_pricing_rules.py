@@ -0,0 +1,72 @@
+"""
+File pricing rules (src/services/pricing_rules.py): an edited rules file is
+picked up on the next check with a new content version, an invalid edit keeps
+the last good snapshot, and quotes follow the snapshot in use.
+"""
+
+import json
+import os
+import pathlib
+
+import pytest
+
+from src.services import pricing_rules
+from src.services.pricing_rules import PricingRulesError
+
+RULES_FILE = pathlib.Path(__file__).resolve().parent / "extracted_pricing_data.json"
+
+
+def _write(path, content, tick=[0]):
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    tick[0] += 1  # mtime moves even when two writes land in the same clock tick
+    os.utime(path, ns=(tick[0] * 10**9, tick[0] * 10**9))
+
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    _write(path, json.loads(RULES_FILE.read_text()))
+    store = pricing_rules._FileRulesStore(path, 0)
+    monkeypatch.setattr(pricing_rules, "_store", store)
+    return path
+
+
+def test_reload_picks_up_edits_and_keeps_the_last_good_snapshot(rules_file):
+    first = pricing_rules.get_pricing_rules()
+    assert pricing_rules.get_pricing_rules() is first
+
+    data = json.loads(rules_file.read_text())
+    data["employee_rates"]["mid"] = 999
+    _write(rules_file, data)
+    edited = pricing_rules.get_pricing_rules()
+    assert edited.version != first.version and edited.employee_rates["mid"] == 999
+
+    _write(rules_file, "{not json")
+    assert pricing_rules.get_pricing_rules() is edited
+    _write(rules_file, dict(data, employee_rates={}))
+    assert pricing_rules.get_pricing_rules() is edited
+    rules_file.unlink()
+    assert pricing_rules.get_pricing_rules() is edited
+    with pytest.raises(PricingRulesError):
+        pricing_rules._FileRulesStore(rules_file, 0).get()  # no good snapshot to fall back to
+
+
+def test_quotes_follow_the_rules_file(client, seeded, rules_file):
+    item = {
+        "material_id": seeded["materials"][0], "difficulty_id": seeded["difficulties"][0],
+        "quantity": 10, "employee_level": "mid", "estimated_days": 2, "num_envelopers": 2,
+    }
+    base = client.post("/api/calculate-price", json=item).json
+    assert base["rules_version"] == client.get("/api/pricing-rules").json["version"]
+
+    data = json.loads(rules_file.read_text())
+    data["employee_rates"]["mid"] *= 2
+    _write(rules_file, data)
+    doubled = client.post("/api/calculate-price", json=item).json
+    assert doubled["rules_version"] != base["rules_version"] and doubled["cache_hit"] is False
+    assert doubled["labor_cost"] == 2 * base["labor_cost"]
+
+    _write(rules_file, "[]")
+    response = client.post("/api/pricing-rules/reload")  # invalid file: reload keeps the last good snapshot
+    assert response.status_code == 200 and response.json["version"] == doubled["rules_version"]
+    assert client.post("/api/calculate-price", json=item).json["rules_version"] == doubled["rules_version"]
@@ -0,0 +1,141 @@
+"""
+SQL statement counts for GET /api/projects (with the embedded client, filters
+and keyset pages), PUT /api/projects/status and POST /api/projects, on an
+in-memory SQLite database: the count must not grow with the number of projects
+or items.
+"""
+
+import os
+
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+
+from src.main import app
+from src.models.user import db
+from src.models.client import Client
+from src.models.project import Project
+from src.services import franchise_stats
+from src.services.query_stats import QueryCounter
+
+FRANCHISEE_ID = "2dc82321-5f18-46f6-af0f-2b9a0f84e136"
+
+
+def _reset_and_seed(num_clients, num_projects):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        clients = [Client(nome=f"Cliente {i}", id_franqueado=FRANCHISEE_ID) for i in range(num_clients)]
+        db.session.add_all(clients)
+        db.session.flush()
+        db.session.add_all(
+            Project(id_franqueado=FRANCHISEE_ID, id_cliente=clients[i % num_clients].id, nome_projeto=f"Projeto {i}")
+            for i in range(num_projects)
+        )
+        db.session.commit()
+
+
+def _list_projects(query_string=""):
+    client = app.test_client()
+    with app.app_context():
+        with QueryCounter(db.engine) as counter:
+            response = client.get(f"/api/projects{query_string}")
+    assert response.status_code == 200, response.json
+    return response.json, counter.count
+
+
+def test_listing_projects_costs_constant_queries():
+    counts = []
+    for num_projects in (1, 10, 200):
+        _reset_and_seed(num_clients=min(num_projects, 25), num_projects=num_projects)
+        projects, count = _list_projects(f"?franchisee_id={FRANCHISEE_ID}")
+        assert len(projects) == num_projects
+        counts.append(count)
+    assert counts[0] == counts[-1], f"query count grows with projects: {counts}"
+    assert counts[0] <= 1, f"expected a single query, got {counts[0]}"
+
+
+def test_projects_embed_their_client():
+    _reset_and_seed(num_clients=3, num_projects=9)
+    projects, _ = _list_projects()
+    with app.app_context():
+        names = {c.id: c.nome for c in Client.query.all()}
+    for project in projects:
+        assert project["client"]["id"] == project["id_cliente"]
+        assert project["client"]["nome"] == names[project["id_cliente"]]
+
+
+def test_client_filter_keeps_constant_queries():
+    _reset_and_seed(num_clients=4, num_projects=40)
+    with app.app_context():
+        client_id = Client.query.first().id
+    projects, count = _list_projects(f"?client_id={client_id}")
+    assert len(projects) == 10
+    assert all(p["client"]["id"] == client_id for p in projects)
+    assert count <= 1, f"expected a single query, got {count}"
+
+
+def test_keyset_pages_cover_all_projects_with_constant_queries():
+    _reset_and_seed(num_clients=5, num_projects=120)
+    with app.app_context():
+        # metade dos projetos com a mesma data para exercitar o desempate por id
+        tie = Project.query.first().data_criacao
+        for project in Project.query.limit(60).all():
+            project.data_criacao = tie
+        db.session.commit()
+        expected = [p.id for p in Project.query.order_by(Project.data_criacao.desc(), Project.id.desc())]
+
+    seen, counts, cursor = [], [], None
+    while True:
+        page, count = _list_projects(f"?franchisee_id={FRANCHISEE_ID}&limit=50" + (f"&cursor={cursor}" if cursor else ""))
+        seen.extend(p["id"] for p in page["items"])
+        counts.append(count)
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == expected, "keyset pages skipped or repeated projects"
+    assert len(counts) == 3 and max(counts) <= 1, f"unexpected query counts per page: {counts}"
+
+
+def test_bulk_status_update_costs_constant_queries():
+    counts = []
+    for num_projects in (10, 200):
+        _reset_and_seed(num_clients=5, num_projects=num_projects)
+        with app.app_context():
+            franchise_stats.reconcile(db.session)
+            db.session.commit()
+            ids = [p.id for p in Project.query.all()]
+            client = app.test_client()
+            with QueryCounter(db.engine) as counter:
+                response = client.put("/api/projects/status", json={"status": "Enviado", "ids": ids + ["missing"]})
+            assert response.status_code == 200, response.json
+            assert response.json["updated"] == num_projects and response.json["not_found"] == 1
+            assert Project.query.filter_by(status="Enviado").count() == num_projects
+            stats = franchise_stats.get_stats(db.session, FRANCHISEE_ID)
+            assert (stats.projetos_rascunho, stats.projetos_enviado) == (0, num_projects)
+        counts.append(counter.count)
+    assert counts[0] == counts[-1], f"query count grows with projects: {counts}"
+
+
+
+def test_project_creation_costs_constant_queries(client, seeded):
+    counts = []
+    for num_items in (1, 200):
+        items = [{
+            "material_id": seeded["materials"][i % len(seeded["materials"])],
+            "difficulty_id": seeded["difficulties"][i % len(seeded["difficulties"])],
+            "quantity": 1 + i % 7, "employee_level": "mid", "estimated_days": 2, "num_envelopers": 2,
+        } for i in range(num_items)]
+        with app.app_context():
+            with QueryCounter(db.engine) as counter:
+                response = client.post("/api/projects", json={
+                    "nome_projeto": f"Projeto {num_items}", "id_cliente": seeded["clients"][0],
+                    "id_franqueado": seeded["franchise_id"], "items": items,
+                })
+        assert response.status_code == 201, response.json
+        assert response.json["item_count"] == num_items
+        assert response.json["query_count"] <= counter.count
+        counts.append(counter.count)
+
+        stored = client.get(f"/api/projects/{response.json['project']['id']}").json
+        assert len(stored["items"]) == num_items
+        assert round(sum(i["preco_venda_item"] for i in stored["items"]), 2) == stored["preco_venda_sugerido"]
+    assert counts[0] == counts[-1], f"query count grows with items: {counts}"
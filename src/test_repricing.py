@@ -0,0 +1,113 @@
+"""
+Draft repricing (src/services/repricing.py, POST /api/repricing/drafts and
+`flask pricing reprice-drafts`): repricing with nothing changed must leave
+every draft as created, a material cost change must reach only the drafts that
+use it and match a fresh quote, and items without labor inputs are skipped.
+"""
+
+from decimal import Decimal
+
+from src.models.user import db
+from src.models.material import Material
+from src.models.project import Project, ProjectItem
+
+
+def _item(seeded, material=0, difficulty=0, **overrides):
+    item = {
+        "material_id": seeded["materials"][material],
+        "difficulty_id": seeded["difficulties"][difficulty],
+        "quantity": "2.345",
+        "employee_level": "mid",
+        "estimated_days": "1.3333",
+        "num_envelopers": "1.5",
+    }
+    item.update(overrides)
+    return item
+
+
+def _create(client, seeded, items, **fields):
+    payload = dict(nome_projeto="Projeto", id_cliente=seeded["clients"][0], id_franqueado=seeded["franchise_id"],
+                   items=items, **fields)
+    response = client.post("/api/projects", json=payload)
+    assert response.status_code == 201, response.json
+    return response.json["project"]["id"]
+
+
+def _prices(app):
+    with app.app_context():
+        projects = {p.id: (p.custo_total_estimado, p.preco_venda_sugerido) for p in Project.query}
+        items = {i.id: (i.custo_item, i.preco_venda_item) for i in ProjectItem.query}
+    return projects, items
+
+
+def test_repricing_without_changes_keeps_every_draft(app, client, seeded):
+    odd_margin = _create(client, seeded, [_item(seeded), _item(seeded, 1, 2, quantity="7.125")], margem_lucro="0.255")
+    _create(client, seeded, [_item(seeded, 2, 1, estimated_days="0.6667", employee_level="senior")])
+    before = _prices(app)
+    with app.app_context():
+        assert db.session.get(Project, odd_margin).margem_lucro_aplicada == Decimal("0.26")
+    # the draft is quoted with the margin as stored (Numeric(5, 2)), which repricing reads back
+    stored = [_item(seeded, quantity="2.35"), _item(seeded, 1, 2, quantity="7.13")]
+    quote = client.post("/api/calculate-price/batch", json={"items": stored, "margem_lucro": "0.26"}).json["totals"]
+    assert before[0][odd_margin][1] == Decimal(str(quote["selling_price"]))
+
+    response = client.post("/api/repricing/drafts", json={"all": True})
+    assert response.status_code == 200, response.json
+    assert (response.json["affected_projects"], response.json["updated_items"]) == (2, 3)
+
+    after = _prices(app)
+    changed = [project_id for project_id in before[0] if before[0][project_id] != after[0][project_id]]
+    assert changed == [], changed
+    assert before[1] == after[1]
+
+
+def test_cost_change_reprices_only_drafts_using_the_material(app, client, seeded):
+    changed_material = seeded["materials"][0]
+    uses_it = _create(client, seeded, [_item(seeded, 0), _item(seeded, 1)])
+    other = _create(client, seeded, [_item(seeded, 1)])
+    approved = _create(client, seeded, [_item(seeded, 0)])
+    assert client.put(f"/api/projects/{approved}/status", json={"status": "Aprovado"}).status_code == 200
+    with app.app_context():
+        db.session.get(Material, changed_material).custo_unitario_base = Decimal("31.40")
+        db.session.commit()
+    before = _prices(app)
+
+    dry_run = client.post("/api/repricing/drafts", json={"material_ids": [changed_material], "dry_run": True}).json
+    assert (dry_run["project_ids"], dry_run["updated_items"], dry_run["dry_run"]) == ([uses_it], 1, True)
+    assert _prices(app) == before
+
+    summary = client.post("/api/repricing/drafts", json={"material_ids": [changed_material]}).json
+    assert (summary["project_ids"], summary["updated_items"], summary["skipped_items"]) == ([uses_it], 1, 0)
+
+    after = _prices(app)
+    assert after[0][other] == before[0][other]
+    assert after[0][approved] == before[0][approved]
+    stored = [_item(seeded, 0, quantity="2.35"), _item(seeded, 1, quantity="2.35")]  # quantity at the column scale
+    quote = client.post("/api/calculate-price/batch", json={"items": stored, "margem_lucro": "0.2"}).json["totals"]
+    assert after[0][uses_it] == (Decimal(str(quote["total_cost"])), Decimal(str(quote["selling_price"])))
+
+
+def test_items_without_labor_inputs_are_skipped(app, client, seeded):
+    project_id = _create(client, seeded, [_item(seeded)])
+    with app.app_context():
+        db.session.add(ProjectItem(id_projeto=project_id, id_material=seeded["materials"][0],
+                                   id_dificuldade=seeded["difficulties"][0], quantidade=3,
+                                   custo_item=Decimal("10.00"), preco_venda_item=Decimal("12.00")))
+        db.session.commit()
+
+    summary = client.post("/api/repricing/drafts", json={"all": True}).json
+    assert (summary["updated_items"], summary["skipped_items"]) == (1, 1)
+    with app.app_context():
+        legacy = ProjectItem.query.filter(ProjectItem.nivel_funcionario.is_(None)).one()
+        assert (legacy.custo_item, legacy.preco_venda_item) == (Decimal("10.00"), Decimal("12.00"))
+
+
+def test_route_and_cli_require_a_selection(app, client, seeded):
+    _create(client, seeded, [_item(seeded, 3)])
+    assert client.post("/api/repricing/drafts", json={}).status_code == 400
+
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=["pricing", "reprice-drafts"]).exit_code == 2
+    result = runner.invoke(args=["pricing", "reprice-drafts", "--material-id", seeded["materials"][3]])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("1 projeto(s), 1 item(ns) recalculado(s), 0 ignorado(s)"), result.output
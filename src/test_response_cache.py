@@ -0,0 +1,94 @@
+"""
+Response cache (src/services/response_cache.py) through the cached routes: MISS
+then HIT, entries dropped by a commit that touches their table but kept on
+rollback, per-franchise dashboard entries, and a commit made by another worker
+(only the shared versions change) taking effect on the next request.
+"""
+
+from decimal import Decimal
+
+from src.models.user import db
+from src.models.material import Material
+from src.services import franchise_stats
+from src.services.response_cache import response_cache
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.json
+    return response.headers["X-Cache"], response.json
+
+
+def _set_cost(app, material_id, cost, commit=True):
+    with app.app_context():
+        db.session.get(Material, material_id).custo_unitario_base = Decimal(cost)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+            db.session.rollback()
+
+
+def _cost(materials, material_id):
+    return next(m["custo_unitario_base"] for m in materials if m["id"] == material_id)
+
+
+def _counters(endpoint):
+    stats = response_cache.stats()["endpoints"].get(endpoint, {})
+    return stats.get("hits", 0), stats.get("misses", 0)
+
+
+def test_second_request_is_a_hit(client):
+    hits, misses = _counters("difficulty_factors")
+    assert _get(client, "/api/difficulty-factors")[0] == "MISS"
+    assert _get(client, "/api/difficulty-factors")[0] == "HIT"
+    assert _counters("difficulty_factors") == (hits + 1, misses + 1)
+
+
+def test_commit_invalidates_and_rollback_keeps_the_entry(app, client, seeded):
+    material_id = seeded["materials"][0]
+    assert _get(client, "/api/materials")[0] == "HIT"  # filled by the seeded fixture
+
+    _set_cost(app, material_id, "41.10", commit=False)
+    cache, materials = _get(client, "/api/materials")
+    assert cache == "HIT" and _cost(materials, material_id) == 25.0
+
+    _set_cost(app, material_id, "41.10")
+    cache, materials = _get(client, "/api/materials")
+    assert cache == "MISS" and _cost(materials, material_id) == 41.1
+    assert _get(client, "/api/difficulty-factors")[0] == "HIT"  # other tables keep their entries
+
+
+def test_commit_in_another_worker_is_seen_on_the_next_request(app, client, seeded, monkeypatch):
+    material_id = seeded["materials"][0]
+    assert _get(client, "/api/materials")[0] == "HIT"
+    stale = response_cache.stats()["endpoints"]["materials"]["stale"]
+
+    # another worker commits: only the shared versions change, this worker's entries stay in memory
+    monkeypatch.setattr(response_cache, "invalidate", lambda touched: 0)
+    _set_cost(app, material_id, "52.00")
+    assert response_cache.stats()["entries"] > 0
+
+    cache, materials = _get(client, "/api/materials")
+    assert cache == "MISS" and _cost(materials, material_id) == 52.0
+    assert response_cache.stats()["endpoints"]["materials"]["stale"] == stale + 1
+    assert _get(client, "/api/materials")[0] == "HIT"
+
+
+def test_dashboard_entries_follow_their_franchise(app, client, seeded, monkeypatch):
+    monkeypatch.setattr(response_cache, "invalidate", lambda touched: 0)  # shared versions only
+    franchise_id = seeded["franchise_id"]
+    url = f"/api/dashboard/stats?franchisee_id={franchise_id}"
+    cache, stats = _get(client, url)
+    assert cache == "MISS" and stats["total_clients"] == 2
+
+    with app.app_context():
+        franchise_stats.record_client(db.session, "other-franchise")
+        db.session.commit()
+    assert _get(client, url)[0] == "HIT"
+
+    with app.app_context():
+        franchise_stats.record_client(db.session, franchise_id)
+        db.session.commit()
+    cache, stats = _get(client, url)
+    assert cache == "MISS" and stats["total_clients"] == 3
@@ -0,0 +1,89 @@
+"""
+Monte Carlo risk pricing (src/services/risk.py) with fixed seeds: min = likely =
+max must give back the engine quote, a symmetric spread keeps P50 at the quote,
+and required_margin must price the target percentile.
+"""
+
+from src.services import risk
+from src.services.pricing_engine import PricingEngine
+from src.services.pricing_rules import PricingRules
+from src.services.scenarios import ScenarioError
+
+RULES_DATA = {
+    "employee_rates": {"junior": 150.0, "mid": 250.0, "senior": 400.0},
+    "difficulty_factors": {
+        "1": {"material_multiplier": 2.3, "tax_rate": 0.07},
+        "3": {"material_multiplier": 2.8, "tax_rate": 0.12},
+    },
+    "margin_ranges": {"min": 0.20, "default": 0.30, "max": 0.45},
+}
+# (custo unitário, quantidade, dias, envelopadores, nível de dificuldade, nível do funcionário)
+ITEMS = [("25.50", "12", "2", "2", "1", "mid"), ("80.00", "3.5", "1.5", "1", "3", "senior")]
+
+
+def _rules():
+    return PricingRules(RULES_DATA, "test")
+
+
+def _engine_total(margin="0.2"):
+    engine = PricingEngine(_rules())
+    quotes = [engine.quote(level, employee, cost, qty, days, crew, margin)
+              for cost, qty, days, crew, level, employee in ITEMS]
+    return sum(q.total_cost for q in quotes) / 100, sum(q.selling_price for q in quotes) / 100
+
+
+def _risk_items(quantity=None, days=None):
+    return [risk.RiskItem(cost, quantity(qty) if quantity else qty, days(d) if days else d, crew, level, employee)
+            for cost, qty, d, crew, level, employee in ITEMS]
+
+
+def test_point_estimates_reproduce_the_engine_quote():
+    same = lambda v: {"min": v, "likely": v, "max": v}
+    result = risk.simulate(_rules(), _risk_items(same, same), samples=10_000, seed=1)
+    total, selling = _engine_total()
+    tolerance = 0.01 * len(ITEMS)
+    for name in ("base_cost", "p10_cost", "p50_cost", "p90_cost", "mean_cost"):
+        assert abs(result[name] - total) <= tolerance, (name, result[name], total)
+    assert result["std_cost"] == 0
+    assert result["required_margin"] == 0
+    assert abs(result["selling_price"] - selling) <= tolerance
+    assert result["probability_of_profit"] == 1.0
+
+
+def test_symmetric_uncertainty_keeps_p50_near_the_quote():
+    spread = lambda v: {"min": float(v) * 0.8, "likely": float(v), "max": float(v) * 1.2}
+    result = risk.simulate(_rules(), _risk_items(spread, spread), samples=200_000, seed=42)
+    total, _ = _engine_total()
+    assert abs(result["p50_cost"] - total) / total < 0.005, (result["p50_cost"], total)
+    assert result["p10_cost"] < result["p50_cost"] < result["p90_cost"]
+
+
+def test_required_margin_covers_the_target_percentile():
+    skewed = lambda v: {"min": float(v), "likely": float(v), "max": float(v) * 2}
+    rules = _rules()
+    result = risk.simulate(rules, _risk_items(days=skewed), samples=100_000, target_probability=0.9, seed=7)
+    assert result["required_margin"] > 0
+    # margem exigida aplicada ao custo provável = P90 (alvo de 90%)
+    assert abs(result["required_selling_price"] - result["p90_cost"]) <= 0.02
+    assert abs(result["base_cost"] * (1 + result["required_margin"]) - result["p90_cost"]) <= 0.05
+
+    again = risk.simulate(rules, _risk_items(days=skewed), samples=100_000, target_probability=0.9, seed=7)
+    assert again == result, "same seed must give the same result"
+
+
+def test_invalid_estimates_and_parameters_raise_scenario_error():
+    cases = [
+        lambda: risk.RiskItem("10", {"min": 5, "likely": 4, "max": 6}, "1", "1", "1", "mid"),
+        lambda: risk.RiskItem("10", {"min": -1, "likely": 1, "max": 2}, "1", "1", "1", "mid"),
+        lambda: risk.simulate(_rules(), _risk_items(), samples=10),
+        lambda: risk.simulate(_rules(), _risk_items(), target_probability=1.5),
+        lambda: risk.simulate(_rules(), [risk.RiskItem("10", "1", "1", "1", "9", "mid")]),
+        lambda: risk.simulate(_rules(), []),
+    ]
+    for case in cases:
+        try:
+            case()
+        except ScenarioError:
+            continue
+        raise AssertionError("expected ScenarioError")
+
@@ -0,0 +1,128 @@
+"""
+Scenario sweep (src/services/scenarios.py): each grid cell against the sum of
+PricingEngine.quote for the same inputs, default margin axis, pareto_mask on a
+hand-built and a random set, MAX_SCENARIO_POINTS, and flatten's filters.
+"""
+
+import itertools
+
+import numpy as np
+
+from src.services import scenarios
+from src.services.pricing_engine import PricingEngine
+from src.services.pricing_rules import PricingRules
+from src.services.scenarios import ScenarioError, ScenarioItem
+
+RULES_DATA = {
+    "employee_rates": {"junior": 150.0, "mid": 250.0, "senior": 400.0},
+    "difficulty_factors": {
+        "1": {"material_multiplier": 2.3, "tax_rate": 0.07},
+        "3": {"material_multiplier": 2.8, "tax_rate": 0.12},
+    },
+    "margin_ranges": {"min": 0.20, "default": 0.30, "max": 0.45},
+}
+# (custo unitário, quantidade, nível de dificuldade, dias, envelopadores)
+ITEMS = [("25.50", "12", "1", "2", "2"), ("80.00", "3.5", "3", "1.5", "1"), ("9.90", "40", "1", "0.5", "3")]
+
+
+def _rules():
+    return PricingRules(RULES_DATA, "test")
+
+
+def _items():
+    return [ScenarioItem(cost, qty, level, days, crew) for cost, qty, level, days, crew in ITEMS]
+
+
+def _engine_totals(engine, level, days=None, crew=None, margin=0.2):
+    """Soma das cotações exatas (em reais) de cada item, com os eixos substituindo os valores do item."""
+    total = selling = 0
+    for cost, qty, difficulty, own_days, own_crew in ITEMS:
+        quote = engine.quote(difficulty, level, cost, qty,
+                             own_days if days is None else str(days), own_crew if crew is None else str(crew),
+                             str(margin))
+        total += quote.total_cost
+        selling += quote.selling_price
+    return total / 100, selling / 100
+
+
+def test_sweep_matches_the_engine_on_every_grid_cell():
+    rules = _rules()
+    engine = PricingEngine(rules)
+    margins = scenarios.parse_axis([0.2, 0.35], "margins")
+    days = scenarios.parse_axis({"min": 1, "max": 2.5, "step": 0.5}, "estimated_days")
+    crew = scenarios.parse_axis([1, 3], "num_envelopers")
+    result = scenarios.sweep(rules, _items(), margins=margins, estimated_days=days, num_envelopers=crew)
+    levels = result["employee_levels"]
+    assert result["selling_price"].shape == (2, 3, 4, 2)
+
+    tolerance = 0.01 * len(ITEMS)  # cada cotação exata arredonda para centavos
+    for (g, margin), (l, level), (d, day), (e, envelopers) in itertools.product(
+            enumerate(margins), enumerate(levels), enumerate(days), enumerate(crew)):
+        total, selling = _engine_totals(engine, level, day, envelopers, margin)
+        assert abs(result["total_cost"][l, d, e] - total) <= tolerance, (level, day, envelopers)
+        assert abs(result["selling_price"][g, l, d, e] - selling) <= tolerance, (margin, level, day, envelopers)
+
+
+def test_items_keep_their_own_labor_without_an_axis():
+    rules = _rules()
+    engine = PricingEngine(rules)
+    result = scenarios.sweep(rules, _items(), margins=scenarios.parse_axis(0.3, "margins"),
+                             employee_levels=["senior"])
+    assert result["estimated_days"] is None and result["num_envelopers"] is None
+    total, selling = _engine_totals(engine, "senior", margin=0.3)
+    assert abs(result["total_cost"][0, 0, 0] - total) <= 0.03
+    assert abs(result["selling_price"][0, 0, 0, 0] - selling) <= 0.03
+
+    try:
+        scenarios.sweep(rules, [ScenarioItem("1", "1", "1")])
+        raise AssertionError("expected ScenarioError without estimated_days")
+    except ScenarioError:
+        pass
+
+
+def test_default_margins_follow_the_rule_range():
+    result = scenarios.sweep(_rules(), _items())
+    assert np.allclose(result["margins"], np.arange(0.20, 0.4501, 0.01))
+
+
+def test_pareto_mask_keeps_only_non_dominated_points():
+    price = np.array([10.0, 12.0, 11.0, 9.0, 12.0])
+    profit = np.array([5.0, 6.0, 4.0, 1.0, 5.5])
+    assert scenarios.pareto_mask(price, profit).tolist() == [True, True, False, True, False]
+
+    rng = np.random.default_rng(7)
+    price, profit = rng.uniform(0, 100, 300), rng.uniform(0, 50, 300)  # sem empates
+    mask = scenarios.pareto_mask(price, profit)
+    for i in range(len(price)):
+        dominated = np.any((price < price[i]) & (profit > profit[i]))
+        assert mask[i] == (not dominated), i
+
+
+def test_grid_larger_than_the_limit_is_rejected():
+    axis = scenarios.parse_axis({"min": 0, "max": 999, "count": 1000}, "estimated_days")
+    try:
+        scenarios.sweep(_rules(), _items(), margins=scenarios.parse_axis([0.2, 0.3], "margins"),
+                        estimated_days=axis, num_envelopers=scenarios.parse_axis(list(range(1, 51)), "num_envelopers"))
+        raise AssertionError("expected ScenarioError for a grid over MAX_SCENARIO_POINTS")
+    except ScenarioError as e:
+        assert str(scenarios.MAX_SCENARIO_POINTS) in str(e)
+
+
+def test_flatten_filters_and_validates_thresholds():
+    result = scenarios.sweep(_rules(), _items())
+    points, summary = scenarios.flatten(result, max_selling_price="5000", min_profit=900)
+    assert points and summary["matching_points"] == len(points) < summary["grid_points"]
+    assert all(p["selling_price"] <= 5000 and p["profit"] >= 900 - 0.01 for p in points)
+
+    pareto, _ = scenarios.flatten(result, output="pareto")
+    prices = [p["selling_price"] for p in pareto]
+    assert prices == sorted(prices)
+    assert all(b["profit"] > a["profit"] for a, b in zip(pareto, pareto[1:]))
+
+    for bad in ({"max_selling_price": "abc"}, {"min_profit": [1]}, {"min_profit": True}, {"output": "cube"}):
+        try:
+            scenarios.flatten(result, **bad)
+            raise AssertionError(f"expected ScenarioError for {bad}")
+        except ScenarioError:
+            pass
+
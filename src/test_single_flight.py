@@ -0,0 +1,208 @@
+"""
+Single-flight coalescing (src/services/single_flight.py): one upstream call per
+key for threads, coroutines and SingleFlight instances sharing a lock directory,
+shared errors, a new leader after a timed-out or cancelled one, and the
+file-lock ownership rules.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from src.services.ai_gateway import AIUpstreamError
+from src.services.single_flight import SingleFlight, _FileLock, wait_timeout_for
+
+
+class Upstream:
+    """
+    Counts calls. A thread call first runs `hold(n)` (n = call number), which the
+    tests use to block until the other callers are queued behind it, so the
+    number of calls does not depend on thread scheduling.
+    """
+
+    def __init__(self, hold=None, error=None, delay=0.05):
+        self.hold = hold
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _count(self):
+        with self.lock:
+            self.calls += 1
+            return self.calls
+
+    def __call__(self):
+        call = self._count()
+        if self.hold:
+            self.hold(call)
+        if self.error:
+            raise self.error
+        return "texto"
+
+    async def call_async(self):
+        self._count()
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return "texto"
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "the other callers never queued up"
+        time.sleep(0.001)
+
+
+def _shared(flight, count):
+    """hold() that waits until `count` callers are queued on the call in flight."""
+    return lambda call: _wait_until(lambda: flight.stats()["shared"] >= count)
+
+
+def _in_threads(n, target):
+    results = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_threads_share_one_call():
+    flight = SingleFlight(lock_dir="")
+    upstream = Upstream(hold=_shared(flight, 9))
+    results = _in_threads(10, lambda i: flight.do("k", upstream))
+    assert results == ["texto"] * 10, results
+    assert upstream.calls == 1, upstream.calls
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_coroutines_share_one_call():
+    flight, upstream = SingleFlight(lock_dir=""), Upstream()
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async("k", upstream.call_async) for _ in range(10)])
+
+    assert asyncio.run(main()) == ["texto"] * 10
+    assert upstream.calls == 1, upstream.calls
+
+
+def test_errors_are_shared():
+    error = AIUpstreamError("upstream caiu")
+    flight = SingleFlight(lock_dir="")
+    upstream = Upstream(hold=_shared(flight, 7), error=error)
+    results = _in_threads(8, lambda i: flight.do("k", upstream))
+    assert all(r is error for r in results), results
+    assert upstream.calls == 1, upstream.calls
+
+    upstream = Upstream(error=error)
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async("k", upstream.call_async) for _ in range(8)],
+                                    return_exceptions=True)
+
+    assert all(r is error for r in asyncio.run(main()))
+    assert upstream.calls == 1, upstream.calls
+
+
+def test_timed_out_leader_leads_to_exactly_one_more_call():
+    waiters = 8
+    flight = SingleFlight(lock_dir="", wait_timeout=0.5)  # waiters give up after 2 x 0.5 s
+    release_leader = threading.Event()
+
+    def hold(call):
+        if call == 1:
+            release_leader.wait(10)  # the original leader outlives every waiter
+        else:
+            # the new leader waits until the others gave up on the first call and queued on its own
+            _wait_until(lambda: flight.stats()["shared"] >= 2 * waiters - 1)
+
+    upstream = Upstream(hold=hold)
+    leader = threading.Thread(target=flight.do, args=("k", upstream))
+    leader.start()
+    _wait_until(lambda: upstream.calls == 1)
+    results = _in_threads(waiters, lambda i: flight.do("k", upstream))
+    release_leader.set()
+    leader.join()
+
+    assert results == ["texto"] * waiters, results
+    assert upstream.calls == 2, upstream.calls
+    stats = flight.stats()
+    assert (stats["leaders"], stats["abandoned"], stats["wait_timeouts"]) == (2, 1, waiters), stats
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_async_leader_leads_to_exactly_one_more_call():
+    flight, upstream = SingleFlight(lock_dir=""), Upstream(delay=0.1)  # cancelled well before 0.1 s
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", upstream.call_async))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.ensure_future(flight.do_async("k", upstream.call_async)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        assert leader.cancelled()
+        return results
+
+    assert asyncio.run(main()) == ["texto"] * 5
+    assert upstream.calls == 2, upstream.calls
+
+
+def test_file_lock_has_one_owner_after_the_previous_owner_removes_the_file():
+    directory = tempfile.mkdtemp()
+    try:
+        a, b, c, d = (_FileLock(directory, "k") for _ in range(4))
+        assert a.try_acquire()
+        assert not b.try_acquire()          # b keeps the old file open
+        a.release(owner=True)               # unlink + close
+        assert c.try_acquire()              # new file
+        assert not b.try_acquire()          # stale inode: not an owner
+        assert not b.try_acquire()          # reopened the new file, held by c
+        assert not d.try_acquire()
+        c.release(owner=True)
+        assert b.try_acquire()
+        b.release(owner=True)
+        d.release(owner=False)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_workers_share_the_result_through_lookup():
+    directory = tempfile.mkdtemp()
+    try:
+        shared_cache = {}
+        workers = [SingleFlight(lock_dir=directory) for _ in range(4)]
+        # the owner answers only once the other three are waiting on the file lock
+        upstream = Upstream(hold=lambda call: _wait_until(
+            lambda: sum(w.stats()["cross_process_waits"] for w in workers) >= 3))
+
+        def call():
+            text = upstream()
+            shared_cache["k"] = text
+            return text
+
+        results = _in_threads(4, lambda i: workers[i].do("k", call, lookup=lambda: shared_cache.get("k")))
+        assert results == ["texto"] * 4, results
+        assert upstream.calls == 1, upstream.calls
+        assert os.listdir(directory) == []
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_wait_timeout_follows_the_endpoint_read_timeout():
+    assert wait_timeout_for("virtual-assistant") < wait_timeout_for("analyze-pricing-trends")
+    assert wait_timeout_for("analyze-pricing-trends") < 90
+